@@ -1,23 +1,216 @@
 #!/usr/bin/env python3
 
+# Cartridge ROM fingerprints: the trivial checksum that cart_rom.sv
+# computes (cart_id.sv identifies carts by it), CRC32 and SHA-1, from
+# one read of each file. Directories are scanned recursively.
+#
+# The checksum is a plain byte sum, and collides easily. Files with the
+# same ROM_SIZE_LOG2 and checksum but different contents would get the
+# same mapper from cart_id; they are listed at the end, marked with the
+# cart_id.sv entry they hit, if any. Exits 1 if there are any.
+#
+# Output: checksum crc32 sha1 file
+#
+# With -c, each image is instead checked for what would make cart_id
+# pick the wrong mapper, from hashes of its 8 KB chunks (taken in the
+# same pass):
+#   - padding: trailing all-$FF / all-$00 chunks past the data
+#   - mirror: the second half a copy of the first (overdump)
+#   - truncated: not a power of 2 (or 8 KB) in size; padded with $FF
+# and the canonical size and mapper are printed. -o DIR writes the
+# normalized images there.
+
+import argparse
+import hashlib
+import os
+import re
 import sys
+import zlib
+
+CHUNK = 8192
+BUFSIZE = 8 * CHUNK
+MAX_CHUNKS = 16                 # 128 KB, cart_rom.sv
+
+CART_ID = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       '../rtl/scv/cart_id.sv')
+RE_CASE_BLOCK = re.compile(r"case \(ROM_CKSUM\)(.*?)endcase", re.S)
+RE_CASE = re.compile(r"32'h([0-9a-fA-F]{8})[,:]\s*//\s*(.*)")
+RE_SET = re.compile(r"(\w+) = '1;")
+
+
+def chunk_hash(b):
+    return hashlib.blake2b(b, digest_size=16).digest()
+
+
+PAD_HASHES = {chunk_hash(bytes([v]) * CHUNK) for v in (0x00, 0xff)}
+
+
+def rtl_size_log2(size):
+    """cart_rom.sv SIZE_LOG2: set only if the last address is 2^n-1."""
+    last = (size - 1) & 0x1ffff
+    for n in range(13, 18):
+        if last == (1 << n) - 1:
+            return n
+    return 0
+
+
+def digests(f, buf, chunks=None, keep=None):
+    """Read f once; return (checksum, crc32, sha1). Appends (hash, sum)
+    of each 8 KB chunk to chunks (a short last chunk is padded with
+    $FF), and the data to keep, if given."""
+    mv = memoryview(buf)
+    csum = crc = 0
+    sha = hashlib.sha1()
+    # BufferedReader.readinto() fills buf unless at EOF, so chunks
+    # don't straddle reads.
+    while n := f.readinto(buf):
+        b = mv[:n]
+        csum += sum(b)
+        crc = zlib.crc32(b, crc)
+        sha.update(b)
+        if chunks is not None:
+            for i in range(0, n, CHUNK):
+                c = b[i:i + CHUNK]
+                if len(c) < CHUNK:
+                    c = bytes(c) + b'\xff' * (CHUNK - len(c))
+                chunks.append((chunk_hash(c), sum(c)))
+        if keep is not None:
+            keep.append(bytes(b))
+    return csum & 0xffffffff, crc, sha.hexdigest()
+
+
+def normalize(size, chunks):
+    """Canonical size (in chunks) and the issues found, from the chunk
+    hashes and sums. O(number of chunks)."""
+    issues = []
+    n = len(chunks)
+    if size % CHUNK:
+        issues.append(f'truncated to {size} bytes')
+
+    # Trailing padding, down to the power of 2 that holds the data
+    data = n
+    while data > 1 and chunks[data - 1][0] in PAD_HASHES:
+        data -= 1
+    canon = 1
+    while canon < data:
+        canon *= 2
+    if canon < n:
+        issues.append(f'padding {(n - canon) * CHUNK // 1024}K')
+    elif canon > n and not size % CHUNK:
+        issues.append(f'truncated to {size // 1024}K')
+
+    # Mirrored halves
+    mirror = 1
+    while canon > 1 and canon <= n and \
+            chunks[:canon // 2] == chunks[canon // 2:canon]:
+        canon //= 2
+        mirror *= 2
+    if mirror > 1:
+        issues.append(f'mirrored {mirror}x')
+
+    if canon > MAX_CHUNKS:
+        issues.append(f'larger than {MAX_CHUNKS * CHUNK // 1024}K')
+    return canon, issues
+
+
+def mapper(size_log2, csum, known):
+    """What cart_id.sv picks."""
+    name = {13: 'ROM8K', 14: 'ROM16K', 15: 'ROM32K', 16: 'ROM64K',
+            17: 'ROM128K'}.get(size_log2, 'ROM32K')
+    special = known.get(csum, (None, None))[1]
+    if special and special.startswith(name + '_'):
+        name = special
+    return name
+
+
+def files(args):
+    for a in args:
+        if os.path.isdir(a):
+            for root, dirs, names in os.walk(a, followlinks=True):
+                dirs.sort()
+                for name in sorted(names):
+                    yield os.path.join(root, name)
+        else:
+            yield a
+
+
+def cart_id_entries():
+    """ROM_CKSUM values that cart_id.sv matches:
+    {checksum: (comment, mapper it selects)}."""
+    try:
+        with open(CART_ID) as f:
+            text = f.read()
+    except OSError:
+        return {}
+    ret = {}
+    for block in RE_CASE_BLOCK.findall(text):
+        m = RE_SET.search(block)
+        sel = m[1].upper() if m else None
+        for v, c in RE_CASE.findall(block):
+            ret[int(v, 16)] = (c.strip(), sel)
+    return ret
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Fingerprint cartridge ROM images.')
+    ap.add_argument('input', nargs='+', help='ROM images or directories')
+    ap.add_argument('-c', '--check', action='store_true',
+                    help='check for padding, mirroring and truncation')
+    ap.add_argument('-o', '--outdir',
+                    help='with -c, write normalized images to OUTDIR')
+    args = ap.parse_args()
+    if args.outdir:
+        args.check = True
+        os.makedirs(args.outdir, exist_ok=True)
+
+    known = cart_id_entries()
+    buf = bytearray(BUFSIZE)
+    index = {}                  # (size_log2, checksum): {sha1: [file]}
+    for fn in files(args.input):
+        chunks = [] if args.check else None
+        keep = [] if args.outdir else None
+        with open(fn, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or (size % CHUNK != 0 and not args.check):
+                continue
+            csum, crc, sha1 = digests(f, buf, chunks, keep)
 
-fn = sys.argv[1]
+        key = (rtl_size_log2(size), csum)
+        index.setdefault(key, {}).setdefault(sha1, []).append(fn)
+        if not args.check:
+            print(f"{csum:08x} {crc:08x} {sha1} {fn}")
+            continue
 
-with open(fn, 'rb') as f:
-    data = f.read()
+        canon, issues = normalize(size, chunks)
+        pad = [(None, 0xff * CHUNK)] * max(canon - len(chunks), 0)
+        ncsum = sum(s for _, s in (chunks + pad)[:canon]) & 0xffffffff
+        m = mapper(rtl_size_log2(canon * CHUNK), ncsum, known)
+        print(f"{fn}: {canon * CHUNK // 1024}K {m}"
+              + (f" ({', '.join(issues)})" if issues else ""))
+        if keep is not None and canon <= MAX_CHUNKS:
+            data = b''.join(keep)[:canon * CHUNK]
+            data += b'\xff' * (canon * CHUNK - len(data))
+            with open(os.path.join(args.outdir, os.path.basename(fn)), 'wb') as f:
+                f.write(data)
 
-if len(data) % 8192 != 0:
-    sys.exit(0)
+    collisions = 0
+    for (size_log2, csum), by_sha in sorted(index.items()):
+        if len(by_sha) < 2:
+            continue
+        collisions += 1
+        hit = f" (cart_id: {known[csum][0]})" if csum in known else ""
+        print(f"collision: {csum:08x} size_log2 {size_log2}{hit}",
+              file=sys.stderr)
+        for sha1, fns in by_sha.items():
+            for fn in fns:
+                print(f"  {sha1[:12]} {fn}", file=sys.stderr)
+    return 1 if collisions else 0
 
-# Trivial checksum
-csum = 0
-for b in data:
-    csum += int(b)
 
-print(f"{csum:08x} {fn}")
+if __name__ == '__main__':
+    sys.exit(main())
 
 
 # Local Variables:
-# compile-command: "find -L rom -type f -print0 | xargs -0 -n 1 ./scan-rom.py"
+# compile-command: "./scan-rom.py rom"
 # End:
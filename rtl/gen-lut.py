@@ -0,0 +1,234 @@
+# Generator for constant function tables (e.g. cos.sv)
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Tabulates one period of a function at DEPTH points (x = 0..DEPTH-1,
+# sampled at 2*pi*(x + PHASE)/DEPTH), as WIDTH-bit offset-binary
+# outputs (0 = -1.0, 2^WIDTH-1 = +1.0).
+#
+# With --fold quarter, only one quadrant is stored, as WIDTH-1 bit
+# magnitudes, and the module mirrors / inverts it, as cos.sv does:
+# DEPTH/4 entries instead of DEPTH, for a few XOR gates. The mirror is
+# exact only for PHASE = 0.5 (sample points symmetric about each
+# quadrant's center).
+#
+# Output is a module with the table as an array literal (-f sv), or
+# loaded with $readmemh from a .hex image written next to it
+# (-f readmemh). The error of the module's output against the ideal
+# function is always reported.
+#
+#   python3 gen-lut.py -o cos.sv                # cos.sv, 256 x 7 bit
+#   python3 gen-lut.py -d 4096 -w 10 -o cos.sv  # finer, 1024 x 9 bit
+#   python3 gen-lut.py --compare cos.sv         # error report only
+
+import argparse
+import math
+import os
+import re
+import sys
+
+import numpy as np
+
+FUNCS = {
+    'cos': np.cos,
+    'sin': np.sin,
+}
+
+
+def rnd(v, mode):
+    if mode == 'nearest':
+        return np.floor(v + 0.5)
+    if mode == 'floor':
+        return np.floor(v)
+    if mode == 'ceil':
+        return np.ceil(v)
+    return np.trunc(v)
+
+
+class Lut:
+    def __init__(self, func, depth, width, fold, rounding, phase):
+        if depth < 4 or depth & (depth - 1):
+            raise ValueError(f'depth {depth} is not a power of 2')
+        self.func = func
+        self.depth = depth
+        self.abits = depth.bit_length() - 1
+        self.width = width
+        self.fold = fold
+        # Offset-binary full scale is [0, 2^w-1]; mid-scale is M.
+        self.mid = ((1 << width) - 1) / 2
+
+        if fold == 'quarter':
+            # Magnitudes for the 1st quadrant, where both cos and sin
+            # are non-negative. Output is 2^(w-1) + q or 2^(w-1)-1 - q,
+            # so the ideal q is M*|f| - 0.5.
+            n = depth // 4
+            th = 2 * np.pi * (np.arange(n) + phase) / depth
+            v = self.mid * FUNCS[func](th) - 0.5
+            self.table = np.clip(rnd(v, rounding), 0,
+                                 (1 << (width - 1)) - 1).astype(np.int64)
+        else:
+            th = 2 * np.pi * (np.arange(depth) + phase) / depth
+            v = self.mid * (1 + FUNCS[func](th))
+            self.table = np.clip(rnd(v, rounding), 0,
+                                 (1 << width) - 1).astype(np.int64)
+        self.ideal = self.mid * (1 + FUNCS[func](
+            2 * np.pi * (np.arange(depth) + phase) / depth))
+
+    @property
+    def name(self):
+        if self.fold == 'quarter':
+            return 'q' + self.func
+        return self.func + '_tbl'
+
+    @property
+    def entry_width(self):
+        return self.width - (self.fold == 'quarter')
+
+    def quadrant_bits(self, x):
+        """(mirror, negate) for input x: the same bits the module uses."""
+        q1 = (x >> (self.abits - 2)) & 1     # 2nd / 4th quadrant
+        q2 = (x >> (self.abits - 1)) & 1     # 3rd / 4th quadrant
+        if self.func == 'cos':
+            return q1, q1 ^ q2
+        return q1, q2
+
+    def output(self):
+        """Module output for every input, as the RTL computes it."""
+        x = np.arange(self.depth)
+        if self.fold != 'quarter':
+            return self.table[x]
+        n = self.depth // 4
+        mirror, neg = self.quadrant_bits(x)
+        idx = (x & (n - 1)) ^ (mirror * (n - 1))
+        mag = self.table[idx]
+        top = 1 << (self.width - 1)
+        return np.where(neg, top - 1 - mag, top + mag)
+
+    def errors(self):
+        err = self.output() - self.ideal
+        return {
+            'max': float(np.abs(err).max()),
+            'rms': float(np.sqrt(np.mean(err * err))),
+            'bias': float(err.mean()),
+        }
+
+    def write_sv(self, f, hexfn=None):
+        aw, w, ew = self.abits, self.width, self.entry_width
+        n = len(self.table)
+        f.write(f'// Generated by gen-lut.py: {self.func}, {self.depth} '
+                f'points, {w}-bit offset binary output\n\n')
+        f.write(f'module {self.func} (\n')
+        f.write(f'\tinput   [{aw-1}:0] x,\n')
+        f.write(f'\toutput  [{w-1}:0] y\n')
+        f.write(');\n\n')
+        if hexfn:
+            f.write(f'reg [{ew-1}:0] {self.name}[0:{n-1}];\n')
+            f.write(f'initial $readmemh("{hexfn}", {self.name});\n')
+        else:
+            f.write(f"wire [{ew-1}:0] {self.name}[0:{n-1}] = '{{\n")
+            lits = [f"{ew}'b{v:0{ew}b}" for v in self.table]
+            per = 8
+            for i in range(0, n, per):
+                last = i + per >= n
+                f.write('\t' + ', '.join(lits[i:i + per])
+                        + ('' if last else ', ') + '\n')
+            f.write('}; \n')
+        f.write('\n')
+        if self.fold != 'quarter':
+            f.write(f'assign y = {self.name}[x];\n')
+        else:
+            hi, lo = aw - 1, aw - 2
+            if self.func == 'cos':
+                f.write(f'wire ival = ^x[{hi}:{lo}];\n')
+            else:
+                f.write(f'wire ival = x[{hi}];\n')
+            f.write(f'assign y = {self.name}[x[{lo-1}:0] ^ {{{lo}{{x[{lo}]}}}}]'
+                    f' ^ {{~ival,{{{w-1}{{ival}}}}}};\n')
+        f.write('\nendmodule\n')
+
+    def write_hex(self, f):
+        digits = (self.entry_width + 3) // 4
+        for v in self.table:
+            f.write(f'{v:0{digits}x}\n')
+
+
+RE_LIT = re.compile(r"\b(\d+)'([bhd])([0-9a-fA-F_]+)")
+
+
+def read_table(fn):
+    """Entries of an array literal in a .sv file, or of a .hex image."""
+    with open(fn) as f:
+        text = f.read()
+    if fn.endswith('.hex'):
+        return np.array([int(t, 16) for t in text.split()])
+    base = {'b': 2, 'h': 16, 'd': 10}
+    return np.array([int(v.replace('_', ''), base[b])
+                     for _, b, v in RE_LIT.findall(text)])
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Generate a function table module.')
+    ap.add_argument('-F', '--func', choices=FUNCS, default='cos')
+    ap.add_argument('-d', '--depth', type=int, default=1024,
+                    help='points per period, a power of 2 (default: 1024)')
+    ap.add_argument('-w', '--width', type=int, default=8,
+                    help='output width, bits (default: 8)')
+    ap.add_argument('--fold', choices=('quarter', 'none'), default='quarter',
+                    help='store one quadrant, or the whole period')
+    ap.add_argument('-r', '--rounding', default='nearest',
+                    choices=('nearest', 'floor', 'ceil', 'trunc'))
+    ap.add_argument('-p', '--phase', type=float, default=0.5,
+                    help='sample offset, in points (default: 0.5)')
+    ap.add_argument('-f', '--format', choices=('sv', 'readmemh'), default='sv',
+                    help='table as array literal, or $readmemh image')
+    ap.add_argument('-o', '--output', help='output .sv (default: none)')
+    ap.add_argument('--compare', metavar='FILE',
+                    help='report differences from the table in FILE')
+    args = ap.parse_args()
+
+    try:
+        lut = Lut(args.func, args.depth, args.width, args.fold,
+                  args.rounding, args.phase)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    n = len(lut.table)
+    e = lut.errors()
+    print(f'{lut.name}: {n} x {lut.entry_width} bits = '
+          f'{n * lut.entry_width} bits '
+          f'({math.ceil(n * lut.entry_width / 10240)} M10K)')
+    print(f'error vs. ideal, LSB: max {e["max"]:.3f}  rms {e["rms"]:.3f}'
+          f'  bias {e["bias"]:+.3f}')
+
+    if args.compare:
+        old = read_table(args.compare)
+        if len(old) != n:
+            sys.exit(f'{args.compare}: {len(old)} entries, expected {n}')
+        diff = np.flatnonzero(old != lut.table)
+        print(f'{args.compare}: {len(diff)} of {n} entries differ')
+        for i in diff[:16]:
+            print(f'  [{i}] {old[i]} -> {lut.table[i]}')
+        if len(diff) > 16:
+            print('  ...')
+        saved = lut.table
+        lut.table = old
+        e = lut.errors()
+        lut.table = saved
+        print(f'{args.compare} error vs. ideal, LSB: max {e["max"]:.3f}'
+              f'  rms {e["rms"]:.3f}  bias {e["bias"]:+.3f}')
+
+    if args.output:
+        hexfn = None
+        if args.format == 'readmemh':
+            hexfn = os.path.splitext(args.output)[0] + '.hex'
+            with open(hexfn, 'w') as f:
+                lut.write_hex(f)
+            hexfn = os.path.basename(hexfn)
+        with open(args.output, 'w') as f:
+            lut.write_sv(f, hexfn)
+
+
+if __name__ == '__main__':
+    main()
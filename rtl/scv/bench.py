@@ -0,0 +1,268 @@
+# Benchmark the Python tools
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Each workload runs its script(s) in a child process, on fixed inputs:
+# the real ucode YAMLs, a 10x synthetic ucode table, a library of
+# synthetic render dumps, and a library of synthetic ROMs. Inputs are
+# generated once (seeded) under .bench/. Wall time and peak RSS go to a
+# JSON file, and can be compared against a saved baseline.
+#
+#   python3 bench.py --save-baseline base.json     # before a change
+#   python3 bench.py --baseline base.json          # after
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import runpy
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(os.path.dirname(ROOT))
+UPD7800 = os.path.join(ROOT, 'upd7800')
+RENDER2PNG = os.path.join(ROOT, 'epochtv1', 'tb', 'render2png.py')
+SCAN_ROM = os.path.join(REPO, 'doc', 'scan-rom.py')
+
+UCODE_FILES = ('gen-ucode.py', 'gen-urom.py', 'prof.py', 'ucode-fixed.yaml',
+               'ucode-gen.yaml')
+
+NFRAMES = 1000
+NROMS = 10000
+
+
+def run_script(path, *argv):
+    """Run a script as __main__ with the given arguments."""
+    sys.argv = [path, *argv]
+    # As python3 would, let it import modules beside it (prof.py).
+    saved = sys.path[:]
+    sys.path.insert(0, os.path.dirname(path))
+    try:
+        runpy.run_path(path, run_name='__main__')
+    except SystemExit as e:
+        # An exit status is a result (scan-rom.py: collisions found);
+        # a message is an error.
+        if e.code is not None and not isinstance(e.code, int):
+            raise
+    finally:
+        sys.path[:] = saved
+
+
+#####################################################################
+# Workloads: setup(dir, scale) makes inputs (untimed); run(dir) is timed.
+
+def setup_ucode(d, scale):
+    for fn in UCODE_FILES:
+        shutil.copy(os.path.join(UPD7800, fn), d)
+
+
+def run_gen_ucode(d):
+    run_script(os.path.join(d, 'gen-ucode.py'))
+
+
+def run_gen_urom(d):
+    run_script(os.path.join(d, 'gen-urom.py'))
+
+
+def setup_ucode_10x(d, scale):
+    import yaml
+    setup_ucode(d, scale)
+    fn = os.path.join(d, 'ucode-gen.yaml')
+    with open(fn) as f:
+        doc = yaml.load(f, Loader=yaml.Loader)
+    # Copies keep their columns but not their labels, so label
+    # references still resolve and enum widths still fit.
+    for tbl in doc.values():
+        rows = tbl['rows']
+        copies = [{k: v for k, v in r.items() if k != 'uaddr'}
+                  for r in rows] if 'at' not in rows[0] else rows
+        tbl['rows'] = rows + copies * 9
+    with open(fn, 'w') as f:
+        yaml.dump(doc, f, Dumper=yaml.Dumper)
+
+
+def setup_frames(d, scale):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    n = max(1, int(NFRAMES * scale))
+    # A few distinct frames, hard-linked to make up the library.
+    uniq = []
+    for i in range(min(n, 16)):
+        ind = rng.integers(0, 16, (232 // 8, 208 // 8)).repeat(8, 0).repeat(8, 1)
+        pal = rng.integers(0, 256, (16, 3), dtype=np.uint8)
+        rgb = pal[ind]
+        fn = os.path.join(d, f'u{i:02d}.hex')
+        with open(fn, 'w') as f:
+            for row in rgb:
+                f.write(row.tobytes().hex() + '\n')
+        uniq.append(fn)
+    os.mkdir(os.path.join(d, 'frames'))
+    os.mkdir(os.path.join(d, 'png'))
+    for i in range(n):
+        os.link(uniq[i % len(uniq)],
+                os.path.join(d, 'frames', f'render-{i:04d}.hex'))
+
+
+def run_render2png(d):
+    for fn in sorted(os.listdir(os.path.join(d, 'frames'))):
+        run_script(RENDER2PNG, os.path.join(d, 'frames', fn),
+                   os.path.join(d, 'png', fn[:-4] + '.png'))
+
+
+def setup_roms(d, scale):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    n = max(1, int(NROMS * scale))
+    sizes = rng.choice([0x2000, 0x4000, 0x8000, 0x8000, 0x10000, 0x20000], n)
+    pool = rng.integers(0, 256, 0x20000 + 0x1000, dtype=np.uint8).tobytes()
+    os.mkdir(os.path.join(d, 'rom'))
+    for i, sz in enumerate(sizes):
+        off = int(rng.integers(0, 0x1000))
+        with open(os.path.join(d, 'rom', f'game{i:05d}.bin'), 'wb') as f:
+            f.write(pool[off:off + int(sz)])
+
+
+def run_scan_rom(d):
+    run_script(SCAN_ROM, os.path.join(d, 'rom'))
+
+
+WORKLOADS = {
+    'gen-ucode': (setup_ucode, run_gen_ucode),
+    'gen-urom': (setup_ucode, run_gen_urom),
+    'gen-urom-10x': (setup_ucode_10x, run_gen_urom),
+    'render2png': (setup_frames, run_render2png),
+    'scan-rom': (setup_roms, run_scan_rom),
+}
+
+
+#####################################################################
+
+def peak_rss_mb():
+    # VmHWM starts afresh at exec, unlike ru_maxrss, which on Linux
+    # carries over the parent's peak across exec.
+    try:
+        with open('/proc/self/status') as f:
+            for l in f:
+                if l.startswith('VmHWM:'):
+                    return round(int(l.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def child(name, d):
+    _, run = WORKLOADS[name]
+    os.chdir(d)
+    with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null), \
+            contextlib.redirect_stderr(null):
+        t0 = time.perf_counter()
+        run(d)
+        t = time.perf_counter() - t0
+    print(json.dumps({'time': t, 'max_rss_mb': peak_rss_mb()}))
+
+
+def measure(name, d):
+    """Run a workload in a child; return its time and peak RSS."""
+    p = subprocess.run([sys.executable, os.path.abspath(__file__),
+                        '--child', name, d], stdout=subprocess.PIPE)
+    if p.returncode:
+        raise RuntimeError(f'{name}: exit code {p.returncode}')
+    res = json.loads(p.stdout.splitlines()[-1])
+    res['time'] = round(res['time'], 3)
+    return res
+
+
+def prepare(name, workdir, scale):
+    """Set up a workload's inputs once; reuse them on later runs."""
+    setup, _ = WORKLOADS[name]
+    d = os.path.join(workdir, f'{name}-x{scale:g}')
+    if not os.path.exists(os.path.join(d, '.ok')):
+        shutil.rmtree(d, ignore_errors=True)
+        os.makedirs(d)
+        setup(d, scale)
+        open(os.path.join(d, '.ok'), 'w').close()
+    return d
+
+
+def compare(results, baseline, tol):
+    bad = 0
+    for name, r in results.items():
+        b = baseline.get('results', {}).get(name)
+        if not b:
+            continue
+        for k in ('time', 'max_rss_mb'):
+            ratio = r[k] / b[k] if b[k] else 1.0
+            flag = ratio > 1 + tol
+            bad += flag
+            print(f'  {name:14} {k:10} {b[k]:9.3f} -> {r[k]:9.3f}'
+                  f'  {ratio:6.2f}x' + ('  WORSE' if flag else ''))
+    return bad
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3])
+        return
+
+    ap = argparse.ArgumentParser(description='Benchmark the Python tools.')
+    ap.add_argument('workloads', nargs='*', metavar='NAME',
+                    help='workloads to run (default: all): '
+                    + ', '.join(WORKLOADS))
+    ap.add_argument('-s', '--scale', type=float, default=1.0,
+                    help='scale the synthetic libraries (default: 1)')
+    ap.add_argument('-n', '--repeat', type=int, default=1,
+                    help='runs per workload; the fastest is kept')
+    ap.add_argument('-w', '--workdir', default=os.path.join(ROOT, '.bench'))
+    ap.add_argument('-o', '--output', help='write results JSON here')
+    ap.add_argument('--save-baseline', metavar='FILE',
+                    help='write results as a baseline')
+    ap.add_argument('--baseline', metavar='FILE',
+                    help='compare against a baseline')
+    ap.add_argument('--tolerance', type=float, default=0.2,
+                    help='allowed increase vs. baseline (default: 0.2)')
+    args = ap.parse_args()
+
+    names = args.workloads or list(WORKLOADS)
+    for n in names:
+        if n not in WORKLOADS:
+            ap.error(f'unknown workload {n}')
+
+    results = {}
+    for name in names:
+        d = prepare(name, args.workdir, args.scale)
+        runs = [measure(name, d) for _ in range(args.repeat)]
+        r = min(runs, key=lambda r: r['time'])
+        r['max_rss_mb'] = max(x['max_rss_mb'] for x in runs)
+        results[name] = r
+        print(f"{name:14} {r['time']:9.3f} s {r['max_rss_mb']:8.1f} MB")
+
+    doc = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'scale': args.scale,
+        'results': results,
+    }
+    for fn in (args.output, args.save_baseline):
+        if fn:
+            with open(fn, 'w') as f:
+                json.dump(doc, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != args.scale:
+            print(f"warning: baseline scale is {baseline.get('scale')}")
+        print('vs. baseline:')
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
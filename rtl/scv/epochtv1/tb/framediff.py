@@ -0,0 +1,109 @@
+# Compare rendered frames against golden frames
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Frames may be render.hex dumps (from render_tb / scv_tb) or PNGs
+# (from render2png.py). Frames are paired by file name, minus
+# extension, so frames/render-010.hex matches golden/render-010.png.
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from render2png import read_frame
+
+FRAME_EXTS = ('.hex', '.png')
+
+
+def list_frames(path):
+    if os.path.isfile(path):
+        return {os.path.splitext(os.path.basename(path))[0]: path}
+    ret = {}
+    for fn in sorted(os.listdir(path)):
+        stem, ext = os.path.splitext(fn)
+        if ext in FRAME_EXTS and stem not in ret:
+            ret[stem] = os.path.join(path, fn)
+    return ret
+
+
+def heatmap(golden, mismatch, err):
+    # Dimmed golden frame, mismatching pixels in red (brighter = larger
+    # error).
+    gray = golden.mean(axis=2, dtype=np.float32) * 0.3
+    img = np.repeat(gray[..., None], 3, axis=2).astype(np.uint8)
+    img[mismatch] = 0
+    img[mismatch, 0] = 128 + err[mismatch] // 2
+    return img
+
+
+def compare(job):
+    name, gfn, rfn, tol, hmdir = job
+    golden = read_frame(gfn)
+    result = read_frame(rfn)
+    if golden.shape != result.shape:
+        return name, -1, None, f'size {result.shape[1]}x{result.shape[0]}'
+
+    err = np.abs(golden.astype(np.int16) - result).max(axis=2)
+    mismatch = err > tol
+    count = int(np.count_nonzero(mismatch))
+    if count == 0:
+        return name, 0, None, None
+
+    ys = np.flatnonzero(mismatch.any(axis=1))
+    xs = np.flatnonzero(mismatch.any(axis=0))
+    bbox = (int(xs[0]), int(ys[0]), int(xs[-1]), int(ys[-1]))
+    if hmdir:
+        img = heatmap(golden, mismatch, err.astype(np.uint8))
+        Image.fromarray(img, 'RGB').save(os.path.join(hmdir, name + '.png'))
+    return name, count, bbox, None
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Compare frames against golden frames.')
+    ap.add_argument('golden', help='golden frame, or directory of frames')
+    ap.add_argument('result', help='frame to check, or directory of frames')
+    ap.add_argument('-t', '--tolerance', type=int, default=0,
+                    help='max. per-channel difference to ignore')
+    ap.add_argument('-m', '--heatmap', metavar='DIR',
+                    help='write a heat-map PNG per mismatching frame to DIR')
+    ap.add_argument('-j', '--jobs', type=int, default=None,
+                    help='worker processes (default: all cores)')
+    args = ap.parse_args()
+
+    golden = list_frames(args.golden)
+    result = list_frames(args.result)
+    if os.path.isfile(args.golden) and os.path.isfile(args.result):
+        result = {next(iter(golden)): args.result}
+
+    if args.heatmap:
+        os.makedirs(args.heatmap, exist_ok=True)
+
+    jobs = [(n, golden[n], result[n], args.tolerance, args.heatmap)
+            for n in golden if n in result]
+    missing = [n for n in golden if n not in result]
+    for n in missing:
+        print(f'{n}: missing')
+
+    bad = 0
+    with ProcessPoolExecutor(args.jobs) as ex:
+        for name, count, bbox, err in ex.map(compare, jobs, chunksize=8):
+            if err:
+                print(f'{name}: {err}')
+                bad += 1
+            elif count:
+                x0, y0, x1, y1 = bbox
+                print(f'{name}: {count} px differ in ({x0},{y0})-({x1},{y1})')
+                bad += 1
+
+    print(f'{len(jobs) - bad} of {len(golden)} frames match')
+    sys.exit(1 if bad or missing else 0)
+
+
+if __name__ == '__main__':
+    main()
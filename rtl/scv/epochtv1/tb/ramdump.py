@@ -0,0 +1,73 @@
+# EpochTV-1 RAM dump (as loaded by render_tb) layout and decoding
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# A dump is CPU $2000-$3403, in address order:
+#   $2000-$2FFF  VRAM (even addresses: chip A, odd: chip B)
+#   $3000-$31FF  BGM
+#   $3200-$33FF  OAM, 4 bytes per sprite (s_objattr, B0 first)
+#   $3400-$3403  R0-R3
+
+import numpy as np
+
+VRAM = slice(0x0000, 0x1000)
+BGM = slice(0x1000, 0x1200)
+OAM = slice(0x1200, 0x1400)
+REGS = slice(0x1400, 0x1404)
+SIZE = 0x1404
+
+# R0 bits
+R0_HIDE_HI_SPR = 1 << 2
+R0_SPR_EN = 1 << 4
+R0_SP_2CLRM = 1 << 5
+
+# spr_2clr_lut (epochtv1.sv): 2nd-half color of 2-color sprites, by
+# color, for sprites with oam_idx[6] = 0, 1.
+SPR_2CLR_LUT = np.array([
+    (0, 0), (15, 1), (12, 8), (13, 11), (10, 2), (11, 3), (8, 10), (9, 9),
+    (6, 4), (7, 5), (4, 12), (5, 13), (2, 6), (3, 7), (1, 14), (1, 15),
+], dtype=np.uint8)
+
+
+class Dump:
+    def __init__(self, data):
+        d = np.frombuffer(data, dtype=np.uint8)
+        if len(d) < SIZE:
+            raise ValueError(f'dump is {len(d)} bytes, expected {SIZE}')
+        self.vram = d[VRAM]
+        self.bgm = d[BGM]
+        self.oam = d[OAM]
+        self.regs = d[REGS]
+
+    @classmethod
+    def load(cls, fn):
+        with open(fn, 'rb') as f:
+            return cls(f.read())
+
+
+def oam_fields(oam):
+    """Decode OAM bytes into a dict of per-sprite field arrays."""
+    o = np.asarray(oam, dtype=np.uint8).reshape(-1, 4)
+    return {
+        'y': o[:, 0] >> 1,
+        'link_y': o[:, 0] & 1,
+        'start_line': o[:, 1] >> 4,
+        'color': o[:, 1] & 15,
+        'x': o[:, 2] >> 1,
+        'link_x': o[:, 2] & 1,
+        'split': o[:, 3] >> 7,
+        'tile': o[:, 3] & 0x7f,
+    }
+
+
+def sprite_patterns(vram):
+    """All 128 sprite patterns, as a (128, 16, 16) array of 0/1.
+
+    Row 2k of a pattern is the high nibbles of bytes 4k..4k+3, row 2k+1
+    the low nibbles, MSB leftmost (see doc/epochtv1.txt)."""
+    b = np.asarray(vram, dtype=np.uint8).reshape(128, 8, 4)
+    bits = np.unpackbits(b, axis=2).reshape(128, 8, 4, 2, 4)
+    # -> tile, row pair, nibble (hi/lo), byte, bit
+    return bits.transpose(0, 1, 3, 2, 4).reshape(128, 16, 16)
@@ -1,22 +1,203 @@
-import sys
-import re
-from PIL import Image, ImageColor, ImageDraw
-
-img = Image.new('RGB', (208, 232))
-d = ImageDraw.Draw(img)
-
-with open(sys.argv[1], "r") as fin:
-    y = 0
-    for line in fin.readlines():
-        for x in range(len(line)//6):
-            w = line[x*6:x*6+6]
-            if not re.match(r'[0-9a-fA-F]{6}', w):
-                continue
-            r = int(w[0:2], 16)
-            g = int(w[2:4], 16)
-            b = int(w[4:6], 16)
-            c = (r,g,b)
-            d.point((x, y), fill=c)
-        y = y + 1
-
-img.save(sys.argv[2])
+import argparse
+import os
+import time
+import numpy as np
+from PIL import Image
+
+# Render area (incl. overscan)
+WIDTH = 208
+HEIGHT = 232
+
+# ASCII -> hex digit value. Anything else (e.g. 'x' from undefined
+# RGB in simulation) maps to -1 and leaves the pixel black.
+hexval = np.full(256, -1, dtype=np.int16)
+for i, c in enumerate(b'0123456789abcdef'):
+    hexval[c] = i
+for i, c in enumerate(b'ABCDEF'):
+    hexval[c] = 10 + i
+
+# Color generator tables (palette_t), from epochtv1.sv
+PALETTES = {
+    'rgb': np.array([
+        (  0,   0, 160), (  0,   0,   0), (  0,   0, 245), (160,   0, 235),
+        (  0, 245,   0), (150, 235, 150), (  0, 235, 235), (  0, 160,   0),
+        (245,   0,   0), (235, 160,   0), (235,   0, 235), (235, 150, 150),
+        (235, 235,   0), (160, 160,   0), (150, 150, 150), (225, 225, 225),
+    ], dtype=np.uint8),
+    'rf': np.array([
+        (  0,  90, 156), (  0,   0,   0), ( 58, 148, 255), (  0,   0, 255),
+        ( 16, 214,   0), ( 66, 255,  16), (123, 230, 197), (  0, 173,   0),
+        (255,  41, 148), (255,  49,  16), (255,  58, 255), (239, 156, 255),
+        (255, 206,  33), ( 74, 123,  16), (165, 148, 165), (255, 255, 255),
+    ], dtype=np.uint8),
+}
+
+
+def decode_lines(lines, width=WIDTH):
+    """Decode render.hex lines (bytes) to an (len(lines), width, 3) array."""
+    n = width * 6
+    buf = b''.join(l.rstrip(b'\r\n')[:n].ljust(n, b'x') for l in lines)
+    d = hexval[np.frombuffer(buf, dtype=np.uint8)].reshape(-1, width, 6)
+    valid = (d >= 0).all(axis=2)
+    rgb = (d[..., 0::2] << 4) | d[..., 1::2]
+    rgb[~valid] = 0
+    return rgb.astype(np.uint8)
+
+
+def read_hex(fn):
+    """Read a render.hex file into a (HEIGHT, WIDTH, 3) frame."""
+    with open(fn, 'rb') as fin:
+        lines = fin.readlines()[:HEIGHT]
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    if lines:
+        frame[:len(lines)] = decode_lines(lines)
+    return frame
+
+
+def read_frame(fn):
+    """Read a frame from either a render.hex or an image file."""
+    if fn.endswith('.hex'):
+        return read_hex(fn)
+    with Image.open(fn) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def rgb_key(rgb):
+    return ((rgb[..., 0].astype(np.uint32) << 16)
+            | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2])
+
+
+# Per palette: sorted RGB keys, and the color index of each key
+_rev = {}
+for _name, _pal in PALETTES.items():
+    _k = rgb_key(_pal)
+    _o = np.argsort(_k)
+    _rev[_name] = (_k[_o], _o.astype(np.uint8))
+
+
+def to_index(frame, palette):
+    """Map an RGB frame to color indices. Returns (index frame, count of
+    pixels not in the palette); those pixels get index 1 (black)."""
+    keys, idx = _rev[palette]
+    k = rgb_key(frame)
+    i = np.searchsorted(keys, k).clip(max=len(keys) - 1)
+    hit = keys[i] == k
+    return np.where(hit, idx[i], 1).astype(np.uint8), int(np.count_nonzero(~hit))
+
+
+def detect_palette(frame):
+    """Return (palette name, index frame) for the best-matching palette."""
+    best = None
+    for name in PALETTES:
+        ind, miss = to_index(frame, name)
+        if best is None or miss < best[2]:
+            best = (name, ind, miss)
+        if not miss:
+            break
+    if best[2]:
+        print(f'warning: {best[2]} pixels not in palette {best[0]}')
+    return best[:2]
+
+
+def recolor(ind, palette):
+    """Index frame -> RGB frame."""
+    return PALETTES[palette][ind]
+
+
+def read_index(fn):
+    """Read a frame as (palette name or None, index frame)."""
+    if fn.endswith('.png'):
+        with Image.open(fn) as img:
+            if img.mode == 'P':
+                return None, np.asarray(img)
+    return detect_palette(read_frame(fn))
+
+
+def save_indexed(ind, palette, fn):
+    img = Image.fromarray(ind, 'P')
+    img.putpalette(PALETTES[palette].tobytes())
+    img.save(fn, bits=4)
+
+
+def save_png(frame, fn):
+    # Write-then-rename, so viewers never see a partial file.
+    tmp = fn + '.tmp.png'
+    Image.fromarray(frame, 'RGB').save(tmp)
+    os.replace(tmp, fn)
+
+
+def watch(fin, fout, interval):
+    """Follow a growing render.hex, re-writing fout as lines arrive.
+
+    Only new lines are decoded. The file shrinking or being replaced
+    (next frame / next sim run) starts a fresh frame."""
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    ino, pos, row, tail = None, 0, 0, b''
+    while True:
+        try:
+            st = os.stat(fin)
+        except FileNotFoundError:
+            time.sleep(interval)
+            continue
+        if st.st_ino != ino or st.st_size < pos:
+            if row:
+                print(f'{fin}: restarted')
+            frame[:] = 0
+            ino, pos, row, tail = st.st_ino, 0, 0, b''
+        if st.st_size > pos:
+            with open(fin, 'rb') as f:
+                f.seek(pos)
+                buf = f.read(st.st_size - pos)
+            pos += len(buf)
+            lines = (tail + buf).split(b'\n')
+            tail = lines.pop()
+            lines = lines[:HEIGHT - row]
+            if lines:
+                frame[row:row + len(lines)] = decode_lines(lines)
+                row += len(lines)
+                save_png(frame, fout)
+                print(f'{fin}: {row}/{HEIGHT} lines', end='\r', flush=True)
+        time.sleep(interval)
+
+
+def convert(fin, fout, palette, indexed):
+    if not (palette or indexed):
+        Image.fromarray(read_frame(fin), 'RGB').save(fout)
+        return
+    src, ind = read_index(fin)
+    palette = palette or src or 'rgb'
+    if indexed:
+        save_indexed(ind, palette, fout)
+    else:
+        Image.fromarray(recolor(ind, palette), 'RGB').save(fout)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Convert render.hex to PNG.')
+    ap.add_argument('input', nargs='+',
+                    help='render.hex or PNG frame(s)')
+    ap.add_argument('output',
+                    help='output PNG, or directory for multiple inputs')
+    ap.add_argument('-p', '--palette', choices=PALETTES,
+                    help='re-color frames with this palette')
+    ap.add_argument('--indexed', action='store_true',
+                    help='write 4-bit color-indexed PNGs')
+    ap.add_argument('-w', '--watch', action='store_true',
+                    help='follow hex as it is written, updating png')
+    ap.add_argument('-i', '--interval', type=float, default=0.5,
+                    help='--watch poll interval, seconds')
+    args = ap.parse_args()
+
+    if args.watch:
+        try:
+            watch(args.input[0], args.output, args.interval)
+        except KeyboardInterrupt:
+            print()
+    elif len(args.input) == 1 and not os.path.isdir(args.output):
+        convert(args.input[0], args.output, args.palette, args.indexed)
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        for fn in args.input:
+            stem = os.path.splitext(os.path.basename(fn))[0]
+            convert(fn, os.path.join(args.output, stem + '.png'),
+                    args.palette, args.indexed)
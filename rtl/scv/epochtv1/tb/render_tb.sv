@@ -201,6 +201,7 @@ always @(posedge clk) begin
     else if (pice) begin
       pice = 0;
       $fwrite(fpic, "\n");
+      $fflush(fpic);            // for render2png.py --watch
     end
   end
 end
@@ -0,0 +1,159 @@
+# Cut render_tb RAM dumps out of scv_tb snapshots or CPU memory images
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Inputs are either:
+#   - scv_tb.snap (scv_tb +snap_every=N): records of a 16-byte header
+#     ("SNAP", frame, base address, length; 32-bit LE) followed by that
+#     range of CPU address space
+#   - raw 64 KB CPU address space images (doc/notes.txt memory map),
+#     e.g. saved from an emulator's debugger
+# Each frame becomes a render_tb dump of $2000-$3403 (see ramdump.py),
+# named <stem>-<frame>-vram.bin. Inputs are mmap'ed and dumps written
+# straight from memoryview slices, without copying, unless a frame's
+# range is split across records.
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+import ramdump
+
+MAGIC = b'SNAP'
+HEADER = struct.Struct('<4sIII')
+BASE = 0x2000           # CPU address of a dump's first byte
+IMAGE_SIZE = 0x10000
+
+
+def records(mv):
+    """Yield (frame, base, data) for each snapshot record."""
+    pos = 0
+    while pos + HEADER.size <= len(mv):
+        magic, frame, base, length = HEADER.unpack_from(mv, pos)
+        if magic != MAGIC:
+            raise ValueError(f'bad record at offset {pos:#x}')
+        pos += HEADER.size
+        if pos + length > len(mv):
+            break               # truncated (simulation still running)
+        yield frame, base, mv[pos:pos + length]
+        pos += length
+
+
+def frames(mv):
+    """Group records by frame: {frame: [(base, data)]}."""
+    ret = {}
+    for frame, base, data in records(mv):
+        ret.setdefault(frame, []).append((base, data))
+    return ret
+
+
+def cut(chunks):
+    """The dump range from a frame's records: a slice of one record if
+    it covers the range, else a copy assembled from several."""
+    end = BASE + ramdump.SIZE
+    for base, data in chunks:
+        if base <= BASE and base + len(data) >= end:
+            return data[BASE - base:end - base]
+    buf = bytearray(ramdump.SIZE)
+    have = 0
+    for base, data in chunks:
+        lo, hi = max(base, BASE), min(base + len(data), end)
+        if lo < hi:
+            buf[lo - BASE:hi - BASE] = data[lo - base:hi - base]
+            have += hi - lo
+    if have < ramdump.SIZE:
+        return None
+    return buf
+
+
+def is_image(mv):
+    return len(mv) == IMAGE_SIZE and bytes(mv[:4]) != MAGIC
+
+
+def write_dumps(mv, stem, outdir, want):
+    """Write the dumps in mv; return (count, error)."""
+    try:
+        if is_image(mv):
+            todo = {None: cut([(0, mv)])}
+        else:
+            todo = {fr: cut(ch) for fr, ch in frames(mv).items()
+                    if want is None or fr in want}
+    except ValueError as e:
+        return 0, str(e)
+    n = 0
+    for fr, data in todo.items():
+        if data is None:
+            print(f'{stem}: frame {fr}: missing part of '
+                  f'${BASE:04X}-${BASE + ramdump.SIZE - 1:04X}',
+                  file=sys.stderr)
+            continue
+        name = stem if fr is None else f'{stem}-{fr:05d}'
+        with open(os.path.join(outdir, name + '-vram.bin'), 'wb') as f:
+            f.write(data)
+        n += 1
+    return n, None
+
+
+def process(fn, outdir, want):
+    stem = os.path.splitext(os.path.basename(fn))[0]
+    with open(fn, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, None
+        # All views of mm are gone once write_dumps() returns.
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return write_dumps(memoryview(mm), stem, outdir, want)
+
+
+def parse_frames(s):
+    """'10,20,30-40' -> set of frame numbers."""
+    ret = set()
+    for part in s.split(','):
+        lo, _, hi = part.partition('-')
+        ret.update(range(int(lo), int(hi or lo) + 1))
+    return ret
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Cut render_tb RAM dumps from snapshots.')
+    ap.add_argument('input', nargs='+',
+                    help='scv_tb.snap file(s) or 64 KB CPU memory images')
+    ap.add_argument('outdir', help='output directory')
+    ap.add_argument('-f', '--frames', type=parse_frames,
+                    help='only these frames, e.g. 100,200-210')
+    ap.add_argument('-l', '--list', action='store_true',
+                    help='list the frames in each snapshot file')
+    args = ap.parse_args()
+
+    if args.list:
+        # No output; every argument is an input.
+        for fn in args.input + [args.outdir]:
+            with open(fn, 'rb') as f:
+                data = memoryview(f.read())
+            if is_image(data):
+                print(f'{fn}: CPU memory image')
+                continue
+            try:
+                fr_ch = frames(data)
+            except ValueError as e:
+                sys.exit(f'{fn}: {e}')
+            for fr, ch in fr_ch.items():
+                rng = ' '.join(f'${b:04X}-${b + len(d) - 1:04X}' for b, d in ch)
+                print(f'{fn}: frame {fr}: {rng}')
+        return
+
+    os.makedirs(args.outdir, exist_ok=True)
+    total = 0
+    for fn in args.input:
+        n, err = process(fn, args.outdir, args.frames)
+        if err:
+            sys.exit(f'{fn}: {err}')
+        total += n
+    print(f'{total} dumps written to {args.outdir}')
+
+
+if __name__ == '__main__':
+    main()
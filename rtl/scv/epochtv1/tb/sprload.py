@@ -0,0 +1,252 @@
+# Per-scanline sprite load of EpochTV-1 RAM dumps
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Models epochtv1.sv's sprite / background OLB fill pipeline (sbofp) on
+# every rendered line of every dump (see ramdump.py), all dumps of a
+# batch at once. One state per CE:
+#   - BG: 34 states from col 0
+#   - EVAL: 1 state per sprite looked at
+#   - DRAW_L / DRAW_R / DRAW_L2 / DRAW_R2 (one VRAM fetch each) and
+#     2CLR_FLUSH, per visible sprite, as its size and 2-color mode need
+# The line has NUM_COLS states; a sprite whose states don't all fit is
+# lost. The draw state sequence for each kind of sprite is taken from
+# the state machine's transitions, including its quirks:
+#   - a split (half-width) 2-color sprite with link_x set never leaves
+#     2CLR_FLUSH, so no later sprite on that line is drawn ("stuck")
+#   - with R0 hiding sprites 64-127, a visible sprite 63 is followed by
+#     EVAL of 64, and so on while they are visible ("hide7 overrun")
+# CPU VRAM accesses stall the pipeline; they are not modeled.
+#
+# Dumps are grouped into games by name (snapdump.py's
+# <game>-<frame>-vram.bin), and the worst lines of each are reported.
+#
+#   python3 sprload.py snaps/ -o sprload.json
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+import ramdump
+
+NUM_COLS = 260
+BG_STATES = 34                  # col 0 .. sbofp_bgr_idx == 32
+ROWS = np.arange(14, 248)       # pre-render and render rows
+
+BATCH = 256                     # dumps per vectorized batch
+STUCK = 1 << 12                 # cost of a sprite that hangs the pipeline
+
+RE_GAME = re.compile(r'^(.*?)(?:-\d+)?(?:-vram)?$')
+
+
+def draw_states(split, link_x, link_y, c2):
+    """(states, VRAM fetches) to draw a visible sprite, after its EVAL,
+    following the sbofp transitions; states is None if it hangs."""
+    half_w = split
+    dbl_w = not (half_w or c2) and link_x
+    skip_dl = half_w and link_x
+    skip_dr = half_w and not link_x
+    skip_2clr = c2 and not (link_x or link_y)
+    halves2 = dbl_w or (c2 and not skip_2clr)
+
+    st = 'R' if skip_dl else 'L'
+    states = fetches = 1
+    while True:
+        if st == 'L' and not skip_dr:
+            st = 'R'
+        elif st in ('L', 'R') and c2 and not skip_2clr:
+            st = 'FLUSH'
+        elif st in ('L', 'R', 'FLUSH') and halves2 and not skip_dl:
+            st = 'L2'
+        elif st in ('R', 'L2') and halves2 and not skip_dr:
+            st = 'R2'
+        elif st in ('L', 'R', 'L2', 'R2'):
+            return states, fetches
+        else:
+            return None, fetches
+        states += 1
+        fetches += st != 'FLUSH'
+
+
+# Indexed by split << 3 | link_x << 2 | link_y << 1 | 2-color
+DRAW_LUT = np.zeros(16, dtype=np.int32)
+FETCH_LUT = np.zeros(16, dtype=np.int32)
+for _k in range(16):
+    _s, _f = draw_states(*(bool(_k >> b & 1) for b in (3, 2, 1, 0)))
+    DRAW_LUT[_k] = STUCK if _s is None else _s
+    FETCH_LUT[_k] = _f
+
+
+def game_of(fn):
+    return RE_GAME.match(os.path.splitext(os.path.basename(fn))[0])[1]
+
+
+def line_load(oam, regs):
+    """Per-line load of a batch of dumps.
+
+    oam: (N, 512) bytes, regs: (N, 4) bytes. Returns a dict of (N, rows)
+    arrays."""
+    f = ramdump.oam_fields(oam.reshape(-1))
+    f = {k: v.reshape(len(oam), 128).astype(np.int32) for k, v in f.items()}
+    r0 = regs[:, 0].astype(np.int32)
+    ena = (r0 & ramdump.R0_SPR_EN) != 0
+    hide7 = (r0 & ramdump.R0_HIDE_HI_SPR) != 0
+    idx = np.arange(128)
+    c2 = ((r0 & ramdump.R0_SP_2CLRM) != 0)[:, None] & ((idx & 32) != 0)
+
+    split = f['split'] != 0
+    lx = f['link_x'] != 0
+    ly = f['link_y'] != 0
+    half_h = split & ((f['tile'] & 64) != 0)
+    dbl_h = ~(half_h | c2) & ly
+    h = np.where(half_h, 7, np.where(dbl_h, 31, 15))
+    y0 = f['y'] * 2 + 1
+    row = ROWS[None, :, None]
+    vis = (((f['color'] != 0) & (f['y'] != 0) & ena[:, None])[:, None, :]
+           & (row >= (y0 + f['start_line'] * 2)[:, None, :])
+           & (row <= (y0 + h)[:, None, :]))
+
+    # Sprites that get an EVAL state
+    ev = np.broadcast_to(ena[:, None, None], vis.shape).copy()
+    chain = np.cumprod(vis[:, :, 63:127], axis=2).astype(bool)
+    h7 = hide7[:, None, None]
+    ev[:, :, 64:] &= ~h7 | chain
+    overrun = h7[:, :, 0] & chain[:, :, 0]
+
+    key = (split << 3 | lx << 2 | ly << 1 | c2)[:, None, :]
+    shown = ev & vis
+    cost = ev + shown * DRAW_LUT[key]
+    end = BG_STATES + np.cumsum(cost, axis=2)
+    lost = shown & (end > NUM_COLS)
+    return {
+        'sprites': shown.sum(axis=2),
+        'states': BG_STATES + np.minimum(cost.sum(axis=2), STUCK),
+        'fetches': (shown * FETCH_LUT[key]).sum(axis=2),
+        'lost': lost.sum(axis=2),
+        'stuck': (shown & (DRAW_LUT[key] == STUCK)).any(axis=2),
+        'overrun': overrun,
+    }
+
+
+def load_batch(fns):
+    oam = np.zeros((len(fns), 512), dtype=np.uint8)
+    regs = np.zeros((len(fns), 4), dtype=np.uint8)
+    for i, fn in enumerate(fns):
+        d = ramdump.Dump.load(fn)
+        oam[i] = d.oam
+        regs[i] = d.regs
+    return oam, regs
+
+
+class GameStats:
+    def __init__(self, top):
+        self.top = top
+        self.dumps = 0
+        self.lines = 0
+        self.max_sprites = 0
+        self.over = 0
+        self.lost = 0
+        self.stuck = 0
+        self.overrun = 0
+        self.sprite_hist = np.zeros(129, dtype=np.int64)
+        self.worst = []             # (states, fetches, sprites, lost, dump, row)
+
+    def add(self, fns, ll):
+        self.dumps += len(fns)
+        self.lines += ll['sprites'].size
+        self.max_sprites = max(self.max_sprites, int(ll['sprites'].max()))
+        self.over += int((ll['states'] > NUM_COLS).sum())
+        self.lost += int(ll['lost'].sum())
+        self.stuck += int(ll['stuck'].sum())
+        self.overrun += int(ll['overrun'].sum())
+        self.sprite_hist += np.bincount(ll['sprites'].ravel(), minlength=129)
+
+        # Worst lines of this batch, merged with the running list
+        flat = ll['states'].ravel()
+        for j in np.argsort(-flat, kind='stable')[:self.top]:
+            n, r = divmod(int(j), len(ROWS))
+            self.worst.append((int(flat[j]), int(ll['fetches'][n, r]),
+                               int(ll['sprites'][n, r]), int(ll['lost'][n, r]),
+                               fns[n], int(ROWS[r])))
+        self.worst.sort(key=lambda w: (-w[0], w[4], w[5]))
+        del self.worst[self.top:]
+
+    def report(self):
+        nz = np.flatnonzero(self.sprite_hist)
+        return {
+            'dumps': self.dumps,
+            'lines': self.lines,
+            'max_sprites_per_line': self.max_sprites,
+            'lines_over_budget': self.over,
+            'sprites_lost': self.lost,
+            'stuck_lines': self.stuck,
+            'hide7_overrun_lines': self.overrun,
+            'sprites_per_line': {int(i): int(self.sprite_hist[i]) for i in nz},
+            'worst_lines': [
+                {'states': s, 'fetches': f, 'sprites': n, 'lost': l,
+                 'dump': os.path.basename(d), 'row': r}
+                for s, f, n, l, d, r in self.worst
+            ],
+        }
+
+
+def inputs(paths):
+    for p in paths:
+        if os.path.isdir(p):
+            for fn in sorted(os.listdir(p)):
+                if fn.endswith('.bin'):
+                    yield os.path.join(p, fn)
+        else:
+            yield p
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Per-line sprite load of RAM dumps.')
+    ap.add_argument('input', nargs='+', help='RAM dumps, or directories of *.bin')
+    ap.add_argument('-o', '--output', help='write JSON report')
+    ap.add_argument('-n', '--top', type=int, default=5,
+                    help='worst lines to list per game (default: 5)')
+    args = ap.parse_args()
+
+    games = {}
+    for fn in inputs(args.input):
+        games.setdefault(game_of(fn), []).append(fn)
+    if not games:
+        sys.exit('no dumps')
+
+    rep = {}
+    for game, fns in sorted(games.items()):
+        gs = GameStats(args.top)
+        for i in range(0, len(fns), BATCH):
+            b = fns[i:i + BATCH]
+            try:
+                oam, regs = load_batch(b)
+            except ValueError as e:
+                sys.exit(f'{game}: {e}')
+            gs.add(b, line_load(oam, regs))
+        rep[game] = r = gs.report()
+
+        print(f"{game}: {r['dumps']} dumps, max {r['max_sprites_per_line']} "
+              f"sprites/line, {r['lines_over_budget']} lines over "
+              f"{NUM_COLS} states, {r['sprites_lost']} sprites lost"
+              + (f", {r['stuck_lines']} stuck" if r['stuck_lines'] else '')
+              + (f", {r['hide7_overrun_lines']} hide7 overrun"
+                 if r['hide7_overrun_lines'] else ''))
+        for w in r['worst_lines']:
+            print(f"  {w['dump']:32} row {w['row']:3}: {w['sprites']:3} sprites "
+                  f"{w['states']:5} states {w['fetches']:4} fetches"
+                  + (f" {w['lost']} lost" if w['lost'] else ''))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rep, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+# Sprite sheet extractor for EpochTV-1 RAM dumps
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Decodes all 128 sprite patterns in a RAM dump (see ramdump.py) and
+# writes a PNG with:
+#   - the patterns as normal (1-color) sprites
+#   - the patterns as 2-color pairs, tile over tile ^ PAIR (--pair)
+#   - an OAM overlay: each visible sprite drawn where the VDC would put
+#     it, composed as the VDC does (double/half size, 2-color mode),
+#     boxed and labeled with its index
+#   - a table of the visible sprites' attributes
+# Pattern cells used by a visible sprite are outlined in its color.
+#
+# Give a directory to process every *.bin in it, in parallel.
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import ramdump
+from render2png import PALETTES, WIDTH, HEIGHT
+
+# Sprite origin in the render area (render_tb frame)
+SPR_X0 = -23
+SPR_Y0 = -14
+
+PAIRS = {'x': 8, 'y': 1, 'xy': 9}
+
+BG = (40, 40, 40)
+GRID = (80, 80, 80)
+TEXT = (255, 255, 255)
+ON = (255, 255, 255)
+ON2 = (255, 160, 0)     # 2nd pattern of a 2-color pair
+
+PAD = 12
+
+
+def sprite_info(d):
+    """Per-sprite attributes, with the flags the VDC derives from them."""
+    f = ramdump.oam_fields(d.oam)
+    r0 = int(d.regs[0])
+    idx = np.arange(128)
+    f['2clr'] = ((r0 & ramdump.R0_SP_2CLRM) != 0) & ((idx & 32) != 0)
+    f['shown'] = ((f['color'] != 0) & (f['y'] != 0)
+                  & ((r0 & ramdump.R0_SPR_EN) != 0)
+                  & ~(((r0 & ramdump.R0_HIDE_HI_SPR) != 0) & (idx >= 64)))
+    return f
+
+
+def tiles_used(f, i):
+    t, lx, ly = int(f['tile'][i]), int(f['link_x'][i]), int(f['link_y'][i])
+    if f['2clr'][i]:
+        return {t, t ^ (lx << 3 | ly)}
+    half_w = bool(f['split'][i])
+    half_h = half_w and bool(t & 0x40)
+    dw = 8 if lx and not half_w else 0
+    dh = 1 if ly and not half_h else 0
+    return {t | x | y for x in (0, dw) for y in (0, dh)}
+
+
+def compose(pats, f, i):
+    """Sprite i as the VDC draws it: a color-index image, 0 = clear."""
+    t, c = int(f['tile'][i]), int(f['color'][i])
+    lx, ly = int(f['link_x'][i]), int(f['link_y'][i])
+    half_w = bool(f['split'][i])
+    half_h = half_w and bool(t & 0x40)
+    if f['2clr'][i]:
+        # 2nd pattern overwrites the 1st, at the same position.
+        img = pats[t] * np.uint8(c)
+        if lx | ly:
+            c2 = ramdump.SPR_2CLR_LUT[c, i >> 6]
+            img = np.where(pats[t ^ (lx << 3 | ly)], c2, img)
+    else:
+        cols = (0, 8) if lx and not half_w else (0,)
+        rows = (0, 1) if ly and not half_h else (0,)
+        img = np.block([[pats[t | y | x] for x in cols]
+                        for y in rows]) * np.uint8(c)
+    if half_w:
+        img = img[:, lx * 8:lx * 8 + 8]
+    if half_h:
+        img = img[ly * 8:ly * 8 + 8]
+    img = img.copy()
+    img[:int(f['start_line'][i]) * 2] = 0
+    return img
+
+
+def pattern_grid(bits, colors, scale):
+    """128 patterns, 16 per row. bits: (128, 16, 16) index into colors."""
+    cell = 16 * scale + 2
+    img = np.empty((8 * cell, 16 * cell, 3), dtype=np.uint8)
+    img[:] = GRID
+    px = np.asarray(colors, dtype=np.uint8)[bits]
+    px = px.repeat(scale, axis=1).repeat(scale, axis=2)
+    for t in range(128):
+        y, x = (t // 16) * cell + 1, (t % 16) * cell + 1
+        img[y:y + 16 * scale, x:x + 16 * scale] = px[t]
+    return Image.fromarray(img, 'RGB'), cell
+
+
+def oam_overlay(pats, f, palette, scale):
+    screen = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    drawn = np.zeros((HEIGHT, WIDTH), dtype=bool)
+    boxes = []
+    for i in np.flatnonzero(f['shown']):
+        spr = compose(pats, f, i)
+        x0 = int(f['x'][i]) * 2 + SPR_X0
+        y0 = int(f['y'][i]) * 2 + SPR_Y0
+        h, w = spr.shape
+        # Clip to the render area.
+        sx0, sy0 = max(0, -x0), max(0, -y0)
+        sx1, sy1 = min(w, WIDTH - x0), min(h, HEIGHT - y0)
+        if sx0 < sx1 and sy0 < sy1:
+            sub = spr[sy0:sy1, sx0:sx1]
+            win = (slice(y0 + sy0, y0 + sy1), slice(x0 + sx0, x0 + sx1))
+            screen[win] = np.where(sub, sub, screen[win])
+            drawn[win] |= sub != 0
+        boxes.append((i, x0, y0, w, h))
+
+    rgb = PALETTES[palette][screen]
+    rgb[~drawn] = BG
+    img = Image.fromarray(rgb.repeat(scale, 0).repeat(scale, 1), 'RGB')
+    dr = ImageDraw.Draw(img)
+    for i, x, y, w, h in boxes:
+        c = tuple(int(v) for v in PALETTES[palette][f['color'][i]])
+        dr.rectangle([x * scale, y * scale,
+                      (x + w) * scale - 1, (y + h) * scale - 1], outline=c)
+        dr.text((x * scale + 1, y * scale + 1), str(i), fill=TEXT)
+    return img
+
+
+def describe(f, i):
+    flags = ''.join(ch for ch, k in (('X', 'link_x'), ('Y', 'link_y'),
+                                     ('S', 'split'), ('2', '2clr'))
+                    if f[k][i])
+    return (f"{i:3d} x={f['x'][i]:3d} y={f['y'][i]:3d} "
+            f"tile={f['tile'][i]:02x} color={f['color'][i]:2d} "
+            f"sl={f['start_line'][i]:2d} {flags}")
+
+
+def sheet(d, title, palette, pair, scale):
+    pats = ramdump.sprite_patterns(d.vram)
+    f = sprite_info(d)
+    shown = np.flatnonzero(f['shown'])
+    font = ImageFont.load_default()
+
+    norm, cell = pattern_grid(pats, [BG, ON], scale)
+    p2 = pats[np.arange(128) ^ PAIRS[pair]]
+    twoc, _ = pattern_grid(np.where(p2, 2, pats), [BG, ON, ON2], scale)
+    ovl = oam_overlay(pats, f, palette, scale)
+
+    # Outline pattern cells in use, in the user's color.
+    for i in shown:
+        c = tuple(int(v) for v in PALETTES[palette][f['color'][i]])
+        for grid, tiles in ((norm, tiles_used(f, i)),
+                            (twoc, {int(f['tile'][i])} if f['2clr'][i]
+                             else ())):
+            dr = ImageDraw.Draw(grid)
+            for t in tiles:
+                y, x = (t // 16) * cell, (t % 16) * cell
+                dr.rectangle([x, y, x + cell - 1, y + cell - 1], outline=c)
+
+    r0 = int(d.regs[0])
+    head = (f'{title}   R0={r0:02x}'
+            f"  sprites {'on' if r0 & ramdump.R0_SPR_EN else 'off'}"
+            f"{'  2-color' if r0 & ramdump.R0_SP_2CLRM else ''}"
+            f"{'  hide 64-127' if r0 & ramdump.R0_HIDE_HI_SPR else ''}"
+            f'   {len(shown)} visible')
+    rows = [describe(f, i) for i in shown]
+    lh = 12
+    ncol = 2
+    per_col = (len(rows) + ncol - 1) // ncol
+    col_w = max([font.getlength(r) for r in rows] + [0]) + PAD * 2
+
+    w = PAD + norm.width + PAD + max(ovl.width, col_w * ncol) + PAD
+    h = PAD + lh + PAD + max(norm.height * 2 + lh * 2 + PAD,
+                             ovl.height + lh + PAD + per_col * lh) + PAD
+    img = Image.new('RGB', (int(w), int(h)), (0, 0, 0))
+    dr = ImageDraw.Draw(img)
+    dr.text((PAD, PAD), head, fill=TEXT, font=font)
+
+    y = PAD + lh + PAD
+    dr.text((PAD, y), 'patterns', fill=TEXT, font=font)
+    img.paste(norm, (PAD, y + lh))
+    y2 = y + lh + norm.height + PAD
+    dr.text((PAD, y2), f'2-color pairs: tile over tile ^ {PAIRS[pair]:x}',
+            fill=TEXT, font=font)
+    img.paste(twoc, (PAD, y2 + lh))
+
+    x = PAD + norm.width + PAD
+    dr.text((x, y), 'OAM', fill=TEXT, font=font)
+    img.paste(ovl, (x, y + lh))
+    ty = y + lh + ovl.height + PAD
+    for n, r in enumerate(rows):
+        dr.text((x + (n // per_col) * col_w, ty + (n % per_col) * lh), r,
+                fill=TEXT, font=font)
+    return img, rows
+
+
+def process(job):
+    fin, fout, palette, pair, scale = job
+    d = ramdump.Dump.load(fin)
+    img, rows = sheet(d, os.path.basename(fin), palette, pair, scale)
+    img.save(fout)
+    return fin, rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Extract sprite sheets from RAM dumps.')
+    ap.add_argument('input', help='RAM dump, or directory of *.bin dumps')
+    ap.add_argument('output', help='output PNG, or directory')
+    ap.add_argument('-p', '--palette', choices=PALETTES, default='rgb')
+    ap.add_argument('--pair', choices=PAIRS, default='y',
+                    help='partner tile for the 2-color sheet (default: y)')
+    ap.add_argument('-s', '--scale', type=int, default=2)
+    ap.add_argument('-l', '--list', action='store_true',
+                    help='print visible sprites')
+    ap.add_argument('-j', '--jobs', type=int, default=None,
+                    help='worker processes (default: all cores)')
+    args = ap.parse_args()
+
+    if os.path.isdir(args.input):
+        os.makedirs(args.output, exist_ok=True)
+        ins = [os.path.join(args.input, fn)
+               for fn in sorted(os.listdir(args.input)) if fn.endswith('.bin')]
+        outs = [os.path.join(args.output, os.path.splitext(
+                os.path.basename(fn))[0] + '.png') for fn in ins]
+    else:
+        ins, outs = [args.input], [args.output]
+    if not ins:
+        sys.exit(f'{args.input}: no dumps')
+
+    jobs = [(i, o, args.palette, args.pair, args.scale)
+            for i, o in zip(ins, outs)]
+    with ProcessPoolExecutor(args.jobs) as ex:
+        for fin, rows in ex.map(process, jobs):
+            if args.list:
+                print(f'{fin}:')
+                for r in rows:
+                    print('  ' + r)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Build boot.rom and the testbench ROM images from the dumped ROMs
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Inputs (see Readme.md) are MD5-checked while they are read. Outputs
+# are only re-written when the inputs they are built from have changed,
+# or when the output is missing / was modified.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STAMP = os.path.join(ROOT, '.gen-roms.stamp')
+
+# name: (size, MD5)
+INPUTS = {
+    'upd7801g.s01': (0x1000, '635a978fd40db9a18ee44eff449fc126'),
+    'epochtv.chr': (0x400, '929617bc739e58e550fe9025cae4158b'),
+    'upd1771c-017.s03': (0x400, '9b03b66c6dc89de9a11d5cd908538ac3'),
+}
+
+HEXDIG = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+def hex8(data):
+    """One byte per line, for $readmemh into a [7:0] array."""
+    b = np.frombuffer(data, dtype=np.uint8)
+    out = np.empty((len(b), 3), dtype=np.uint8)
+    out[:, 0] = HEXDIG[b >> 4]
+    out[:, 1] = HEXDIG[b & 15]
+    out[:, 2] = ord('\n')
+    return out.tobytes()
+
+
+def hex16le(data):
+    """One little-endian 16-bit word per line, for a [15:0] array."""
+    b = np.frombuffer(data, dtype=np.uint8).reshape(-1, 2)
+    out = np.empty((len(b), 5), dtype=np.uint8)
+    out[:, 0] = HEXDIG[b[:, 1] >> 4]
+    out[:, 1] = HEXDIG[b[:, 1] & 15]
+    out[:, 2] = HEXDIG[b[:, 0] >> 4]
+    out[:, 3] = HEXDIG[b[:, 0] & 15]
+    out[:, 4] = ord('\n')
+    return out.tobytes()
+
+
+def copy(data):
+    return data
+
+
+def cat(*data):
+    return b''.join(data)
+
+
+# path (relative to ROOT): (builder, inputs)
+OUTPUTS = {
+    'bootrom.hex': (hex8, ['upd7801g.s01']),
+    'upd7800/tb/bootrom.hex': (hex8, ['upd7801g.s01']),
+    'upd1771c/upd1771c_rom.hex': (hex16le, ['upd1771c-017.s03']),
+    'tb/upd7801g.s01': (copy, ['upd7801g.s01']),
+    'tb/epochtv.chr.s02': (copy, ['epochtv.chr']),
+    'tb/upd1771c-017.s03': (copy, ['upd1771c-017.s03']),
+    'epochtv1/tb/epochtv.chr': (copy, ['epochtv.chr']),
+}
+
+
+def read_input(path, size, md5, chunk=1 << 12):
+    """Read a ROM, hashing it as it streams in."""
+    h = hashlib.md5()
+    buf = bytearray()
+    with open(path, 'rb') as f:
+        while c := f.read(chunk):
+            h.update(c)
+            buf += c
+    if len(buf) != size:
+        raise ValueError(f'{path}: size {len(buf)}, expected {size}')
+    if h.hexdigest() != md5:
+        raise ValueError(f'{path}: MD5 {h.hexdigest()}, expected {md5}')
+    return bytes(buf), h.hexdigest()
+
+
+def file_md5(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.md5(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Build ROM images for the core and testbenches.')
+    ap.add_argument('-i', '--indir', default='.',
+                    help='directory containing the dumped ROMs')
+    ap.add_argument('-o', '--boot-rom', default='boot.rom',
+                    help='boot.rom output path (default: ./boot.rom)')
+    ap.add_argument('-f', '--force', action='store_true',
+                    help='re-write all outputs')
+    ap.add_argument('--no-verify', action='store_true',
+                    help='accept inputs with the wrong MD5')
+    args = ap.parse_args()
+
+    data, sums = {}, {}
+    try:
+        for name, (size, md5) in INPUTS.items():
+            path = os.path.join(args.indir, name)
+            try:
+                data[name], sums[name] = read_input(path, size, md5)
+            except ValueError as e:
+                if not args.no_verify:
+                    raise
+                print(f'warning: {e}')
+                with open(path, 'rb') as f:
+                    data[name] = f.read()
+                sums[name] = hashlib.md5(data[name]).hexdigest()
+    except (OSError, ValueError) as e:
+        sys.exit(f'error: {e}')
+
+    try:
+        with open(STAMP) as f:
+            stamp = json.load(f)
+    except (FileNotFoundError, ValueError):
+        stamp = {}
+
+    outputs = {os.path.join(ROOT, p): v for p, v in OUTPUTS.items()}
+    outputs[os.path.abspath(args.boot_rom)] = (cat, list(INPUTS))
+
+    nwritten = 0
+    for path, (fn, ins) in outputs.items():
+        key = fn.__name__ + ':' + ','.join(sums[i] for i in ins)
+        st = stamp.get(path)
+        if (not args.force and st and st[0] == key
+                and file_md5(path) == st[1]):
+            continue
+        out = fn(*(data[i] for i in ins))
+        with open(path, 'wb') as f:
+            f.write(out)
+        stamp[path] = [key, hashlib.md5(out).hexdigest()]
+        print(f'wrote {os.path.relpath(path)}')
+        nwritten += 1
+
+    with open(STAMP, 'w') as f:
+        json.dump(stamp, f, indent=1)
+    print(f'{nwritten} of {len(outputs)} outputs updated')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+# Build and run all testbenches, with cached builds
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Benches are found by their emacs compile-command lines. Each command
+# is split into a build step (iverilog / verilator) and run steps. The
+# build output goes to a cache directory keyed by a hash of the command
+# and the contents of every source it reads (incl. -f/-F file lists,
+# and headers: those beside the sources, and any `include'd), so an
+# unchanged bench is never rebuilt.
+#
+# Each bench runs in its own scratch copy of the tree (symlinks), so
+# benches sharing a directory can run in parallel and their output files
+# stay apart. A bench fails on non-zero exit or on error / fatal /
+# assertion messages in its output.
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SRC_EXTS = ('.sv', '.v', '.svh', '.vh', '.cpp', '.h')
+HDR_EXTS = ('.svh', '.vh')
+
+RE_INCLUDE = re.compile(r'^\s*`include\s+"([^"]+)"', re.M)
+RE_CMD = re.compile(r'compile-command:\s*"(.*)"\s*$', re.M)
+RE_FAIL = re.compile(r'^(ERROR|FATAL|%Error|%Fatal)\b.*|^.*Assertion failed.*', re.M)
+
+
+class Bench:
+    def __init__(self, path, tool, cmd):
+        self.dir = os.path.dirname(path)
+        self.rel = os.path.relpath(self.dir, ROOT)
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.id = f'{self.rel}/{self.name}'
+        self.tool = tool
+        self.cmd = cmd
+        steps = [[]]
+        for tok in shlex.split(cmd):
+            if tok == '&&':
+                steps.append([])
+            else:
+                steps[-1].append(tok)
+        self.build = steps[0]
+        self.post = steps[1:]
+        if tool == 'iverilog':
+            # Drop the ./x.vvp step; we run the cached image instead.
+            self.post = self.post[1:]
+
+    def sources(self):
+        """Every file the build step reads, as paths relative to self.dir."""
+        srcs = set()
+        incdirs = []
+        args = iter(self.build[1:])
+        for a in args:
+            if a in ('-f', '-F'):
+                lst = next(args)
+                srcs.add(lst)
+                base = os.path.dirname(lst) if a == '-F' else ''
+                with open(os.path.join(self.dir, lst)) as f:
+                    for l in f:
+                        l = l.split('//')[0].strip()
+                        if l:
+                            srcs.add(os.path.normpath(os.path.join(base, l)))
+            elif a.startswith('+incdir+'):
+                incdirs += a.split('+')[2:]
+            elif a.startswith('-I') and len(a) > 2:
+                incdirs.append(a[2:])
+            elif a.endswith(SRC_EXTS):
+                srcs.add(a)
+        # Headers may be included from any source directory.
+        for d in {os.path.dirname(s) for s in srcs}:
+            for fn in os.listdir(os.path.join(self.dir, d) or '.'):
+                if fn.endswith(HDR_EXTS):
+                    srcs.add(os.path.normpath(os.path.join(d, fn)))
+        # ... or from elsewhere, by `include: follow those.
+        todo = list(srcs)
+        while todo:
+            s = todo.pop()
+            if not s.endswith(SRC_EXTS):
+                continue
+            with open(os.path.join(self.dir, s), errors='replace') as f:
+                incs = RE_INCLUDE.findall(f.read())
+            for inc in incs:
+                for d in [os.path.dirname(s), '', *incdirs]:
+                    h = os.path.normpath(os.path.join(d, inc))
+                    if os.path.isfile(os.path.join(self.dir, h)):
+                        if h not in srcs:
+                            srcs.add(h)
+                            todo.append(h)
+                        break
+        return sorted(srcs)
+
+    def key(self, tool_version):
+        h = hashlib.sha256()
+        h.update(tool_version.encode())
+        h.update(self.cmd.encode())
+        for s in self.sources():
+            h.update(s.encode() + b'\0')
+            with open(os.path.join(self.dir, s), 'rb') as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        return h.hexdigest()[:20]
+
+    def build_cmd(self, out):
+        """Build step, redirected to write into directory out."""
+        cmd = list(self.build)
+        if self.tool == 'iverilog':
+            cmd[cmd.index('-o') + 1] = os.path.join(out, self.name + '.vvp')
+        else:
+            cmd[1:1] = ['--Mdir', out]
+        return cmd
+
+    def run_cmd(self, out):
+        if self.tool == 'iverilog':
+            return ['vvp', os.path.join(out, self.name + '.vvp')]
+        top = self.build[self.build.index('--top-module') + 1]
+        return [os.path.join(out, 'V' + top)]
+
+
+def discover():
+    benches = []
+    for d, dirs, files in os.walk(ROOT):
+        dirs[:] = sorted(x for x in dirs if not x.startswith('.')
+                         and x != 'obj_dir')
+        for fn in sorted(files):
+            if not (fn.endswith(('.sv', '.cpp'))
+                    and os.path.splitext(fn)[0].endswith('_tb')):
+                continue
+            path = os.path.join(d, fn)
+            with open(path) as f:
+                m = RE_CMD.search(f.read())
+            if m:
+                cmd = m.group(1).replace('\\"', '"')
+                tool = 'verilator' if fn.endswith('.cpp') else 'iverilog'
+                benches.append(Bench(path, tool, cmd))
+    return benches
+
+
+def select(benches, tool, pats):
+    """Pick one tool per bench (tool='auto': Verilator where available)."""
+    by_name = {}
+    for b in benches:
+        by_name.setdefault(b.id, {})[b.tool] = b
+    ret = []
+    for name, tools in by_name.items():
+        if pats and not any(fnmatch.fnmatch(name, p) for p in pats):
+            continue
+        if tool == 'auto':
+            for t in ('verilator', 'iverilog'):
+                if t in tools and shutil.which(t):
+                    ret.append(tools[t])
+                    break
+            else:
+                ret.append(next(iter(tools.values())))
+        elif tool in tools:
+            ret.append(tools[tool])
+    return ret
+
+
+def tool_version(tool):
+    try:
+        p = subprocess.run([tool, '-V' if tool == 'iverilog' else '--version'],
+                           capture_output=True, text=True)
+    except FileNotFoundError:
+        return None
+    return p.stdout.splitlines()[0] if p.stdout else tool
+
+
+def mirror(dest, tbdir):
+    """Symlink copy of ROOT in dest, with tbdir's files linked and its
+    subdirectories real, so run outputs land in dest."""
+    rel = os.path.relpath(tbdir, ROOT)
+    src, dst = ROOT, dest
+    os.makedirs(dst)
+    for part in rel.split(os.sep) + [None]:
+        for fn in os.listdir(src):
+            if fn == part or fn.startswith('.'):
+                continue
+            s = os.path.join(src, fn)
+            if part is None and os.path.isdir(s):
+                os.mkdir(os.path.join(dst, fn))
+            else:
+                os.symlink(s, os.path.join(dst, fn))
+        if part is None:
+            break
+        src, dst = os.path.join(src, part), os.path.join(dst, part)
+        os.mkdir(dst)
+    return dst
+
+
+def artifacts(d):
+    ret = []
+    for p, dirs, files in os.walk(d):
+        for fn in files:
+            path = os.path.join(p, fn)
+            if not os.path.islink(path):
+                ret.append(os.path.relpath(path, d))
+    return sorted(ret)
+
+
+def sh(cmd, cwd, log, timeout):
+    with open(log, 'a') as f:
+        f.write('$ ' + shlex.join(cmd) + '\n')
+        f.flush()
+        p = subprocess.run(cmd, cwd=cwd, stdout=f, stderr=subprocess.STDOUT,
+                           timeout=timeout)
+    return p.returncode
+
+
+def run_bench(b, args, versions):
+    res = {'bench': b.id, 'tool': b.tool, 'build': None, 'status': None}
+    t0 = time.monotonic()
+    wd = os.path.join(args.out, b.id.replace('/', '.'))
+    shutil.rmtree(wd, ignore_errors=True)
+    cwd = mirror(wd, b.dir)
+    log = os.path.join(wd, 'log.txt')
+    res['log'] = os.path.relpath(log, args.out)
+
+    try:
+        if not versions[b.tool]:
+            raise RuntimeError(f'{b.tool} not found')
+        key = b.key(versions[b.tool])
+        out = os.path.join(args.cache, f'{b.name}-{key}')
+        if os.path.isdir(out) and not args.rebuild:
+            res['build'] = 'cached'
+        else:
+            tmp = out + '.tmp'
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            if sh(b.build_cmd(tmp), cwd, log, args.timeout):
+                raise RuntimeError('build failed')
+            shutil.rmtree(out, ignore_errors=True)
+            os.rename(tmp, out)
+            res['build'] = 'built'
+
+        rc = sh(b.run_cmd(out), cwd, log, args.timeout)
+        for cmd in b.post:
+            if rc:
+                break
+            rc = sh(cmd, cwd, log, args.timeout)
+        with open(log) as f:
+            m = RE_FAIL.search(f.read())
+        if rc:
+            res['status'], res['reason'] = 'fail', f'exit code {rc}'
+        elif m:
+            res['status'], res['reason'] = 'fail', m.group(0).strip()
+        else:
+            res['status'] = 'pass'
+    except subprocess.TimeoutExpired:
+        res['status'], res['reason'] = 'fail', 'timeout'
+    except (OSError, RuntimeError) as e:
+        res['status'], res['reason'] = 'error', str(e)
+
+    res['time'] = round(time.monotonic() - t0, 2)
+    res['artifacts'] = artifacts(cwd)
+    res['dir'] = os.path.relpath(cwd, args.out)
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Run all testbenches.')
+    ap.add_argument('benches', nargs='*', metavar='PATTERN',
+                    help='bench name patterns (e.g. "upd1771c/*")')
+    ap.add_argument('-t', '--tool', default='auto',
+                    choices=('auto', 'verilator', 'iverilog'))
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    ap.add_argument('-o', '--out', default=os.path.join(ROOT, '.regress'),
+                    help='results directory')
+    ap.add_argument('--cache', default=None,
+                    help='build cache directory (default: OUT/cache)')
+    ap.add_argument('--timeout', type=float, default=3600,
+                    help='per-step timeout, seconds')
+    ap.add_argument('--rebuild', action='store_true',
+                    help='ignore cached builds')
+    ap.add_argument('-l', '--list', action='store_true',
+                    help='list benches and exit')
+    args = ap.parse_args()
+    args.out = os.path.abspath(args.out)
+    args.cache = os.path.abspath(args.cache or os.path.join(args.out, 'cache'))
+
+    benches = select(discover(), args.tool, args.benches)
+    if args.list:
+        for b in benches:
+            print(f'{b.id:32} {b.tool}')
+        return
+
+    os.makedirs(args.cache, exist_ok=True)
+    versions = {t: tool_version(t) for t in {b.tool for b in benches}}
+    t0 = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(args.jobs) as ex:
+        for r in ex.map(lambda b: run_bench(b, args, versions), benches):
+            print(f"{r['bench']:32} {r['tool']:10} {r['build'] or '-':7}"
+                  f" {r['status']:5} {r['time']:8.1f}s"
+                  + (f"  {r['reason']}" if 'reason' in r else ''))
+            results.append(r)
+
+    npass = sum(r['status'] == 'pass' for r in results)
+    summary = {
+        'time': round(time.monotonic() - t0, 2),
+        'passed': npass,
+        'total': len(results),
+        'results': results,
+    }
+    with open(os.path.join(args.out, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f'{npass} of {len(results)} benches passed')
+    sys.exit(0 if npass == len(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# One entry point for the Python tools
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Each subcommand runs its tool script with the remaining arguments.
+# Nothing but the chosen script is imported, so startup stays cheap.
+#
+#   scvtool.py scan ROM...               ROM checksums (doc/scan-rom.py)
+#   scvtool.py render HEX... OUT         render.hex -> PNG (render2png.py)
+#   scvtool.py ucode [--profile F]       gen-ucode.py, in upd7800/
+#   scvtool.py urom [--profile F]        gen-urom.py, in upd7800/
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# name: (script, run in script's dir, description)
+COMMANDS = {
+    'scan': ('../../doc/scan-rom.py', False, 'print ROM checksums'),
+    'render': ('epochtv1/tb/render2png.py', False, 'convert render.hex to PNG'),
+    'ucode': ('upd7800/gen-ucode.py', True, 'generate ucode-gen.yaml'),
+    'urom': ('upd7800/gen-urom.py', True, 'generate microcode ROM .svh'),
+}
+
+
+def usage(f):
+    f.write(f'usage: {os.path.basename(sys.argv[0])} COMMAND [ARGS...]\n\n')
+    for name, (_, _, desc) in COMMANDS.items():
+        f.write(f'  {name:8} {desc}\n')
+    f.write('\nCOMMAND -h shows the command\'s own options.\n')
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        usage(sys.stdout)
+        return
+    cmd = sys.argv[1]
+    if cmd not in COMMANDS:
+        usage(sys.stderr)
+        sys.exit(2)
+
+    script, chdir, _ = COMMANDS[cmd]
+    path = os.path.normpath(os.path.join(ROOT, script))
+    if chdir:
+        os.chdir(os.path.dirname(path))
+    sys.path.insert(0, os.path.dirname(path))
+    sys.argv = [f'{os.path.basename(sys.argv[0])} {cmd}'] + sys.argv[2:]
+
+    # Plain exec rather than runpy, which pulls in pkgutil and typing.
+    with open(path) as f:
+        code = compile(f.read(), path, 'exec')
+    exec(code, {'__name__': '__main__', '__file__': path})
+
+
+if __name__ == '__main__':
+    main()
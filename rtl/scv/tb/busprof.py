@@ -0,0 +1,241 @@
+# CPU bus access / wait profiler for bus traces
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Classifies every access in a bus trace (see bustrace.py; scv_tb
+# +bustrace writes one) by memory region (doc/notes.txt), and counts
+# accesses, WAIT-stretched accesses and the T-cycles they lost (as
+# recorded in the trace) per region, per frame (frames start at VBL
+# rising) and per instruction (opcode, incl. prefix; an access counts
+# toward the instruction whose fetch it follows).
+#
+# The TV-1 stretches every access it decodes (A15 = 0, external) by one
+# T-cycle (doc/epochtv1.txt); --wait-states changes that. Accesses that
+# waited longer than that model says, or shorter, are counted per
+# region.
+#
+# The trace is read in chunks, so its size is not limited by memory.
+# Writes a JSON report (-o) and a heat map (-m): one row per frame, one
+# column per 256-byte page, brightness = log(accesses).
+
+import argparse
+import json
+import sys
+
+import numpy as np
+from PIL import Image
+
+import bustrace
+
+# name: (first, last) address
+REGIONS = {
+    'irom': (0x0000, 0x0fff),
+    'undef': (0x1000, 0x1fff),
+    'vram': (0x2000, 0x2fff),
+    'bgm': (0x3000, 0x31ff),
+    'oam': (0x3200, 0x33ff),
+    'vdc_reg': (0x3400, 0x3403),
+    'unused': (0x3404, 0x7fff),
+    'apu': (0x3600, 0x3600),
+    'cart': (0x8000, 0xff7f),
+    'wram': (0xff80, 0xffff),
+}
+NREG = len(REGIONS)
+
+REGION = np.zeros(0x10000, dtype=np.uint8)
+for _i, (_lo, _hi) in enumerate(REGIONS.values()):
+    REGION[_lo:_hi + 1] = _i        # later entries override (apu)
+
+# Accesses the TV-1 decodes, and so should stretch.
+WAIT_EXPECTED = np.zeros(0x10000, dtype=bool)
+WAIT_EXPECTED[0x1000:0x8000] = True
+
+# Region stripe colors, for the heat map
+STRIPE = np.array([
+    (128, 128, 128), (64, 0, 0), (0, 160, 0), (0, 0, 255), (160, 0, 235),
+    (235, 235, 0), (40, 40, 40), (255, 0, 0), (0, 235, 235),
+    (235, 150, 150),
+], dtype=np.uint8)
+
+CHUNK = 1 << 22
+
+
+class Profile:
+    def __init__(self, wait_states=1):
+        self.ws = wait_states       # the model's stretch of a decoded access
+        # rd, wr, m1, waits, wait cycles
+        self.reg = np.zeros((5, NREG), dtype=np.int64)
+        self.model = np.zeros((2, NREG), dtype=np.int64)  # unexp., missing
+        self.frame_acc = np.zeros((0, NREG), dtype=np.int64)
+        self.frame_wait = np.zeros((0, NREG), dtype=np.int64)
+        self.frame_page = np.zeros((0, 256), dtype=np.int64)
+        self.ops = {}               # key: [count, accesses, waits, wait cycles]
+        # Carried between chunks
+        self.frame = 0
+        self.vbl = False
+        self.op = -1                # opcode key of the current instruction
+        self.insns = bustrace.Insns()
+        self.total = 0
+
+    def grow(self, nf):
+        n = len(self.frame_acc)
+        if nf > n:
+            pad = ((0, nf - n), (0, 0))
+            self.frame_acc = np.pad(self.frame_acc, pad)
+            self.frame_wait = np.pad(self.frame_wait, pad)
+            self.frame_page = np.pad(self.frame_page, pad)
+
+    def add(self, t, nxt=None):
+        """Count a chunk of trace; nxt is the record after it, if any."""
+        t = np.asarray(t)
+        if not len(t):
+            return
+        a = bustrace.addr(t)
+        rd = (t & bustrace.RD) != 0
+        wr = (t & bustrace.WR) != 0
+        m1 = (t & bustrace.M1) != 0
+        wc = bustrace.waits(t).astype(np.int64)
+        wait = wc > 0
+        vbl = (t & bustrace.VBL) != 0
+        reg = REGION[a]
+        n = len(t)
+        self.total += n
+
+        # Regions
+        for k, m in enumerate((rd & ~m1, wr, m1, wait)):
+            self.reg[k] += np.bincount(reg[m], minlength=NREG)
+        self.reg[4] += np.bincount(reg, weights=wc, minlength=NREG).astype(np.int64)
+        exp = WAIT_EXPECTED[a] * min(self.ws, bustrace.WAIT_MAX)
+        self.model[0] += np.bincount(reg[wc > exp], minlength=NREG)
+        self.model[1] += np.bincount(reg[wc < exp], minlength=NREG)
+
+        # Frames
+        prev_vbl = np.concatenate(([self.vbl], vbl[:-1]))
+        frame = self.frame + np.cumsum(vbl & ~prev_vbl)
+        nf = int(frame[-1]) + 1
+        self.grow(nf)
+        f0 = self.frame
+        fl = frame - f0
+        w = nf - f0
+        self.frame_acc[f0:nf] += np.bincount(
+            fl * NREG + reg, minlength=w * NREG).reshape(w, NREG)
+        self.frame_wait[f0:nf] += np.bincount(
+            fl * NREG + reg, weights=wc,
+            minlength=w * NREG).reshape(w, NREG).astype(np.int64)
+        self.frame_page[f0:nf] += np.bincount(
+            fl * 256 + (a >> 8), minlength=w * 256).reshape(w, 256)
+        self.frame = int(frame[-1])
+        self.vbl = bool(vbl[-1])
+
+        # Instructions
+        start, key = self.insns.split(t, nxt)
+        i = np.arange(n)
+        idx = np.maximum.accumulate(np.where(start, i, -1))
+        ik = np.where(idx >= 0, key[np.maximum(idx, 0)], self.op)
+
+        keys, inv = np.unique(ik, return_inverse=True)
+        cnt = np.bincount(inv[start], minlength=len(keys))
+        acc = np.bincount(inv, minlength=len(keys))
+        wt = np.bincount(inv[wait], minlength=len(keys))
+        wcyc = np.bincount(inv, weights=wc, minlength=len(keys)).astype(np.int64)
+        for k, *v in zip(keys.tolist(), cnt.tolist(), acc.tolist(),
+                         wt.tolist(), wcyc.tolist()):
+            if k < 0:
+                continue            # before the first fetch
+            e = self.ops.setdefault(k, [0, 0, 0, 0])
+            for j, x in enumerate(v):
+                e[j] += x
+        self.op = int(ik[-1])
+
+    def report(self):
+        names = list(REGIONS)
+        regions = {}
+        for i, name in enumerate(names):
+            rd, wr, m1, wt, wc = (int(x) for x in self.reg[:, i])
+            if not (rd or wr or m1):
+                continue
+            regions[name] = {
+                'reads': rd, 'writes': wr, 'fetches': m1,
+                'waits': wt, 'wait_cycles': wc,
+                'unexpected_waits': int(self.model[0, i]),
+                'missing_waits': int(self.model[1, i]),
+            }
+        ops = sorted(self.ops.items(), key=lambda kv: -kv[1][3])
+        return {
+            'accesses': self.total,
+            'frames': len(self.frame_acc),
+            'wait_states': self.ws,
+            'wait_cycles': int(self.reg[4].sum()),
+            'wait_model_ok': not self.model.any(),
+            'regions': regions,
+            'per_frame': {
+                'accesses': {n: self.frame_acc[:, i].tolist()
+                             for i, n in enumerate(names) if n in regions},
+                'wait_cycles': {n: self.frame_wait[:, i].tolist()
+                                for i, n in enumerate(names) if n in regions},
+            },
+            'opcodes': {
+                (f'{k >> 8:02x} {k & 255:02x}' if k > 255 else f'{k:02x}'): {
+                    'count': c, 'accesses': x, 'waits': y, 'wait_cycles': z,
+                } for k, (c, x, y, z) in ops
+            },
+        }
+
+    def heatmap(self, scale):
+        c = np.log1p(self.frame_page.astype(np.float64))
+        if c.max() > 0:
+            c /= c.max()
+        # black -> red -> yellow -> white
+        img = np.stack([np.clip(3 * c, 0, 1), np.clip(3 * c - 1, 0, 1),
+                        np.clip(3 * c - 2, 0, 1)], axis=-1)
+        img = (img * 255).astype(np.uint8)
+        stripe = STRIPE[REGION[np.arange(256) << 8]]
+        img = np.concatenate([np.repeat(stripe[None], 4, axis=0), img])
+        return Image.fromarray(img.repeat(scale, axis=1), 'RGB')
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Profile CPU bus accesses and waits.')
+    ap.add_argument('trace', help='bus trace (scv_tb.bus)')
+    ap.add_argument('-o', '--output', help='write JSON report')
+    ap.add_argument('-m', '--heatmap', metavar='PNG',
+                    help='write per-frame access heat map')
+    ap.add_argument('-w', '--wait-states', type=int, default=1,
+                    help='T-cycles the TV-1 model stretches a decoded '
+                    'access by (default: 1)')
+    ap.add_argument('-n', '--top', type=int, default=10,
+                    help='opcodes to list (default: 10)')
+    args = ap.parse_args()
+
+    t = bustrace.read(args.trace)
+    pr = Profile(args.wait_states)
+    for i in range(0, len(t), CHUNK):
+        pr.add(t[i:i + CHUNK], t[i + CHUNK] if i + CHUNK < len(t) else None)
+    rep = pr.report()
+
+    print(f"{rep['accesses']} accesses, {rep['frames']} frames, "
+          f"{rep['wait_cycles']} wait cycles")
+    print(f"{'region':10} {'reads':>10} {'writes':>10} {'fetches':>10} "
+          f"{'waits':>10} {'wait cyc':>10} {'model':>8}")
+    for name, r in rep['regions'].items():
+        bad = r['unexpected_waits'] + r['missing_waits']
+        print(f"{name:10} {r['reads']:10} {r['writes']:10} {r['fetches']:10} "
+              f"{r['waits']:10} {r['wait_cycles']:10} {'ok' if not bad else bad:>8}")
+    print(f"{'opcode':10} {'count':>10} {'accesses':>10} {'waits':>10} "
+          f"{'wait cyc':>10}")
+    for k, o in list(rep['opcodes'].items())[:args.top]:
+        print(f"{k:10} {o['count']:10} {o['accesses']:10} {o['waits']:10} "
+              f"{o['wait_cycles']:10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rep, f, indent=1)
+    if args.heatmap:
+        pr.heatmap(2).save(args.heatmap)
+    sys.exit(0 if rep['wait_model_ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
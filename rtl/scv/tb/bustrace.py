@@ -0,0 +1,88 @@
+# CPU bus trace records
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# One 32-bit little-endian word per CPU bus access:
+#
+#   [15:0]  A
+#   [23:16] DB
+#   [24]    RD
+#   [25]    WR
+#   [26]    M1 (opcode fetch)
+#   [27]    VBL
+#   [29:28] PC[6:5] (cartridge bank / RAM enable port bits)
+#   [31:30] WAIT: T-cycles the access was stretched by (WAITB low at
+#           the CPU's T2 sample), 3 meaning 3 or more
+
+import os
+
+import numpy as np
+
+RD = 1 << 24
+WR = 1 << 25
+M1 = 1 << 26
+VBL = 1 << 27
+WAIT = 3 << 30
+WAIT_MAX = 3
+
+# Opcode prefixes (upd7800.sv of_prefix)
+PREFIXES = np.zeros(256, dtype=bool)
+PREFIXES[[0x48, 0x4c, 0x4d, 0x60, 0x64, 0x70, 0x74]] = True
+
+
+def read(fn):
+    """Map a trace file as a uint32 array."""
+    if not os.path.getsize(fn):
+        return np.zeros(0, dtype='<u4')
+    return np.memmap(fn, dtype='<u4', mode='r')
+
+
+def addr(t):
+    return (t & 0xffff).astype(np.uint16)
+
+
+def data(t):
+    return ((t >> 16) & 0xff).astype(np.uint8)
+
+
+def pc65(t):
+    return ((t >> 28) & 3).astype(np.uint8)
+
+
+def waits(t):
+    return ((t >> 30) & 3).astype(np.uint8)
+
+
+class Insns:
+    """Finds the instructions in a trace, one chunk at a time."""
+    def __init__(self):
+        self.p_run = 0              # trailing run of prefix-valued fetches
+        self.pstart = False         # last access was a prefix
+
+    def split(self, t, nxt=None):
+        """Returns (start, key) for a chunk: whether each access is an
+        instruction's first fetch, and the opcode key there: byte, or
+        prefix << 8 | next byte (from nxt, the record after the chunk,
+        for the last access). nxt is None at the end of the trace."""
+        m1 = (t & M1) != 0
+        d = data(t)
+
+        # A fetch starts an instruction unless it follows a prefix that
+        # did. In a run of prefix-valued fetches, every other one is a
+        # prefix (the rest are 2nd bytes).
+        i = np.arange(len(t))
+        p = m1 & PREFIXES[d]
+        prev_p = np.concatenate(([self.p_run > 0], p[:-1]))
+        run0 = np.maximum.accumulate(np.where(p & ~prev_p, i, -1))
+        pos = np.where(run0 >= 0, i - run0, i + self.p_run)
+        pstart = p & (pos % 2 == 0)
+        start = m1 & ~np.concatenate(([self.pstart], pstart[:-1]))
+
+        key = d.astype(np.int32)
+        after = int(data(nxt)) if nxt is not None else 0
+        key = np.where(pstart, (key << 8) | np.append(key[1:], after), key)
+        self.p_run = int(pos[-1]) + 1 if p[-1] else 0
+        self.pstart = bool(pstart[-1])
+        return start, key
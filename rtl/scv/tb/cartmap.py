@@ -0,0 +1,202 @@
+# Cartridge mapper model: translate CPU bus traces to ROM / RAM accesses
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Mirrors cart_id.sv and cart_mapper.sv. For each mapper, a table maps
+# {PC[6:5], A[14:0]} to the ROM or RAM address, so a whole trace (see
+# bustrace.py) translates with one gather. Reports, per game, cartridge
+# accesses that fall outside the ROM image or the mapper's RAM, and
+# writes that land on ROM.
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+import bustrace
+
+# mapper_t (scv_pkg.sv)
+MAPPERS = {
+    'ROM8K': 1,
+    'ROM16K': 2,
+    'ROM32K': 3,
+    'ROM32K_RAM8K': 4,
+    'ROM64K': 5,
+    'ROM128K': 6,
+    'ROM128K_RAM4K': 7,
+}
+
+# name: (ROM address width, RAM size)
+GEOMETRY = {
+    'ROM8K': (13, 0),
+    'ROM16K': (14, 0),
+    'ROM32K': (15, 0),
+    'ROM32K_RAM8K': (15, 0x2000),
+    'ROM64K': (16, 0),
+    'ROM128K': (17, 0),
+    'ROM128K_RAM4K': (17, 0x1000),
+}
+
+# cart_id.sv
+CKSUM_ROM32K_RAM8K = {0x002aa39f, 0x002da24f, 0x003016e4, 0x002df73d}
+CKSUM_ROM128K_RAM4K = {0x01384995}
+
+# Table entries: RAM flag | address
+IS_RAM = np.uint32(1 << 31)
+
+# Cartridge window in CPU space
+CART_LO, CART_HI = 0x8000, 0xff80
+
+
+def cart_id(rom):
+    """Return the mapper name cart_id.sv picks for this ROM image."""
+    size_log2 = {1 << n: n for n in range(13, 18)}.get(len(rom), 0)
+    cksum = int(np.frombuffer(rom, dtype=np.uint8).sum(dtype=np.uint64)) & 0xffffffff
+    if size_log2 == 13:
+        return 'ROM8K'
+    if size_log2 == 14:
+        return 'ROM16K'
+    if size_log2 == 16:
+        return 'ROM64K'
+    if size_log2 == 17:
+        return 'ROM128K_RAM4K' if cksum in CKSUM_ROM128K_RAM4K else 'ROM128K'
+    if size_log2 == 15 and cksum in CKSUM_ROM32K_RAM8K:
+        return 'ROM32K_RAM8K'
+    return 'ROM32K'
+
+
+def make_table(mapper):
+    """(4, 0x8000) table of translated addresses, indexed [PC[6:5], A]."""
+    a = np.arange(0x8000, dtype=np.uint32)
+    pc = np.arange(4, dtype=np.uint32)[:, None]
+    pc5, pc6 = pc & 1, pc >> 1
+    rom_aw, _ = GEOMETRY[mapper]
+    ram_aw = 12 if mapper == 'ROM128K_RAM4K' else 13
+
+    rom_a = a & ((1 << min(rom_aw, 15)) - 1)
+    if mapper == 'ROM64K':
+        rom_a = rom_a | (pc5 << 15)
+    elif mapper in ('ROM128K', 'ROM128K_RAM4K'):
+        rom_a = rom_a | (pc << 15)
+    rom_a = np.broadcast_to(rom_a, (4, 0x8000))
+
+    ram_en = np.zeros((4, 0x8000), dtype=bool)
+    if mapper == 'ROM32K_RAM8K':
+        ram_en = (pc5 == 1) & ((a >> 13) == 3)
+    elif mapper == 'ROM128K_RAM4K':
+        ram_en = (pc6 == 1) & ((a >> 12) == 7)
+    ram_a = (a & 0x1fff & ((1 << ram_aw) - 1)) | IS_RAM
+
+    return np.where(ram_en, ram_a, rom_a).astype(np.uint32)
+
+
+_tables = {}
+
+
+def table(mapper):
+    if mapper not in _tables:
+        _tables[mapper] = make_table(mapper).ravel()
+    return _tables[mapper]
+
+
+def translate(trace, mapper):
+    """Translate cartridge accesses in a trace.
+
+    Returns (mask of cartridge accesses, translated entries for them)."""
+    a = bustrace.addr(trace)
+    cart = ((a >= CART_LO) & (a < CART_HI)
+            & ((trace & (bustrace.RD | bustrace.WR)) != 0))
+    t = trace[cart]
+    idx = (bustrace.pc65(t).astype(np.uint32) << 15) | (a[cart] & 0x7fff)
+    return cart, table(mapper)[idx]
+
+
+def check(rom_size, trace, mapper):
+    """Return a dict of access counts and problems for one game."""
+    cart, x = translate(trace, mapper)
+    wr = (trace[cart] & bustrace.WR) != 0
+    is_ram = (x & IS_RAM) != 0
+    addr = x & ~IS_RAM
+    rom_rd = ~is_ram & ~wr
+    _, ram_size = GEOMETRY[mapper]
+
+    res = {
+        'mapper': mapper,
+        'accesses': int(cart.sum()),
+        'rom_reads': int(rom_rd.sum()),
+        'ram_accesses': int(is_ram.sum()),
+        'rom_oob': int((rom_rd & (addr >= rom_size)).sum()),
+        'ram_oob': int((is_ram & (addr >= ram_size)).sum()),
+        'rom_writes': int((~is_ram & wr).sum()),
+    }
+    if res['rom_reads']:
+        res['rom_span'] = (int(addr[rom_rd].min()), int(addr[rom_rd].max()))
+    oob = np.flatnonzero(cart)[(rom_rd & (addr >= rom_size))
+                               | (is_ram & (addr >= ram_size))
+                               | (~is_ram & wr)]
+    res['first_problem'] = int(oob[0]) if len(oob) else None
+    return res
+
+
+def find_rom(trace_fn, romdir):
+    stem = os.path.splitext(os.path.basename(trace_fn))[0]
+    for ext in ('.bin', '.rom', '.0'):
+        fn = os.path.join(romdir or os.path.dirname(trace_fn), stem + ext)
+        if os.path.exists(fn):
+            return fn
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Check cartridge accesses in bus traces.')
+    ap.add_argument('traces', nargs='+', metavar='TRACE',
+                    help='bus trace(s); the ROM is the file of the same name'
+                    ' with a .bin/.rom extension')
+    ap.add_argument('-r', '--roms', metavar='DIR',
+                    help='directory holding the ROMs (default: trace dir)')
+    ap.add_argument('-m', '--mapper', choices=MAPPERS,
+                    help='force mapper (default: as cart_id.sv picks)')
+    ap.add_argument('-a', '--all-mappers', action='store_true',
+                    help='check each game against every mapper')
+    args = ap.parse_args()
+
+    bad = 0
+    for tfn in args.traces:
+        rfn = find_rom(tfn, args.roms)
+        if not rfn:
+            print(f'{tfn}: no ROM found')
+            bad += 1
+            continue
+        with open(rfn, 'rb') as f:
+            rom = f.read()
+        trace = bustrace.read(tfn)
+        auto = cart_id(rom)
+        if args.all_mappers:
+            mappers = list(MAPPERS)
+        else:
+            mappers = [args.mapper or auto]
+
+        name = os.path.basename(rfn)
+        for m in mappers:
+            r = check(len(rom), trace, m)
+            tag = '*' if m == auto else ' '
+            span = ('{:05x}-{:05x}'.format(*r['rom_span'])
+                    if 'rom_span' in r else '-')
+            msg = (f"{name:32} {m:14}{tag} {r['accesses']:9} acc"
+                   f"  ROM {span}  RAM {r['ram_accesses']:7}")
+            probs = [f'{r[k]} {k}' for k in ('rom_oob', 'ram_oob', 'rom_writes')
+                     if r[k]]
+            if probs:
+                msg += '  ' + ', '.join(probs) + f" (first @ {r['first_problem']})"
+                if m == auto or not args.all_mappers:
+                    bad += 1
+            print(msg)
+
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == '__main__':
+    main()
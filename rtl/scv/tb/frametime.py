@@ -0,0 +1,266 @@
+# CPU frame time budget from a bus trace
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Splits a bus trace (see bustrace.py; scv_tb +bustrace writes one)
+# into instructions, and costs each at its opcode's cycles in the
+# microcode generator's table (gen-ucode.py's nsteps, via
+# ../upd7800/asm.py), plus the WAIT T-cycles its accesses recorded.
+# An interrupt entry (a fetch, 3 pushes, then a fetch at an interrupt
+# vector) costs SOFTI's cycles. Since the cycles come from the table,
+# not the trace, re-running after changing gen-ucode.py (and make)
+# shows what the change does to a game's frames.
+#
+# Frames start at VBL rising, as in busprof.py. A frame's slack is the
+# idle loop it ends in: the longest trailing repeat of a sequence of up
+# to MAX_LOOP instructions that don't write, at the frame's outermost
+# level (interrupt handlers taken during the loop count as busy). The
+# rest of the frame is busy. A frame without one (the game didn't get
+# back to waiting for VBL) is busy throughout. The first and last
+# frames of the trace are partial, and left out.
+#
+# Reported: per frame, total and busy cycles, and the same within VBL;
+# the worst frames; and busy cycles by instruction class (the
+# gen-ucode.py table function: math_imm, load_wa, ...) and mnemonic.
+# --limit exits 1 if any frame is busier than that. The trace is read
+# in chunks.
+#
+#   python3 frametime.py scv_tb.bus -o frametime.json
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+import bustrace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '../upd7800'))
+import asm
+
+INT_VECTORS = (0x0004, 0x0008, 0x0010, 0x0020, 0x0040)  # upd7800.sv intva
+IR_SOFTI = 0x72
+MAX_LOOP = 16
+CHUNK = 1 << 22
+
+
+class CycleTable:
+    """Opcode key (as bustrace.Insns) -> cycles, class and mnemonic."""
+    def __init__(self):
+        self.classes = ['illegal', 'interrupt']
+        self.mnems = ['(illegal)', '(interrupt)']
+        # Unknown opcodes just fetch (upd7800.sv ird_lut default).
+        self.cycles = np.full(0x10000, 4, dtype=np.int64)
+        for p in asm.PREFIX.values():
+            self.cycles[p << 8:(p + 1) << 8] = 8
+        self.cls = np.zeros(0x10000, dtype=np.int64)
+        self.mnem = np.zeros(0x10000, dtype=np.int64)
+        for ops in asm.load_table():
+            for op in ops:
+                if op.cls not in self.classes:
+                    self.classes.append(op.cls)
+                if op.mnem not in self.mnems:
+                    self.mnems.append(op.mnem)
+                for ir in range(op.ir, op.ir1 + 1):
+                    k = asm.PREFIX[ir >> 8] << 8 | ir & 0xff if ir >> 8 else ir
+                    self.cycles[k] = op.cycles
+                    self.cls[k] = self.classes.index(op.cls)
+                    self.mnem[k] = self.mnems.index(op.mnem)
+        self.softi = int(self.cycles[IR_SOFTI])
+        self.reti = self.mnems.index('RETI')
+
+
+def idle_loop(pc, wr):
+    """Length of the trailing idle loop of an instruction sequence."""
+    for p in range(1, min(MAX_LOOP, len(pc) // 2) + 1):
+        bad = np.flatnonzero(pc[p:] != pc[:-p])
+        run = len(pc) - p - (bad[-1] + 1 if len(bad) else 0)
+        if run >= p and not wr[-p:].any():
+            return run + p
+    return 0
+
+
+class FrameTime:
+    def __init__(self, table):
+        self.tab = table
+        self.insns = bustrace.Insns()
+        self.frame = 0
+        self.vbl = False
+        self.tail = None            # records of the unfinished instruction
+        self.cur = []               # instruction columns of this frame
+        self.cur_frame = 0
+        self.rows = []              # per whole frame
+        self.cls_busy = np.zeros((2, len(table.classes)), dtype=np.int64)
+        self.mnem_busy = np.zeros((2, len(table.mnems)), dtype=np.int64)
+
+    def add(self, t, nxt=None):
+        """Count a chunk of trace; nxt is the record after it, if any."""
+        t = np.asarray(t)
+        if not len(t):
+            return
+        start, key = self.insns.split(t, nxt)
+        vbl = (t & bustrace.VBL) != 0
+        prev_vbl = np.concatenate(([self.vbl], vbl[:-1]))
+        frame = self.frame + np.cumsum(vbl & ~prev_vbl)
+        self.frame = int(frame[-1])
+        self.vbl = bool(vbl[-1])
+
+        cols = (t, start, key, frame)
+        if self.tail is not None:
+            cols = tuple(np.concatenate(c) for c in zip(self.tail, cols))
+        t, start, key, frame = cols
+        si = np.flatnonzero(start)
+        last = nxt is None
+        if not len(si):
+            self.tail = None if last else cols
+            return
+
+        # Finish every instruction but the last, which may go on into
+        # the next chunk.
+        a = bustrace.addr(t).astype(np.int64)
+        next_pc = np.append(a[si[1:]], -1)
+        if not last:
+            self.tail = tuple(c[si[-1]:] for c in cols)
+            t = t[:si[-1]]
+            si = si[:-1]
+            next_pc = next_pc[:-1]
+        n = len(si)
+        ins = np.cumsum(start[:len(t)]) - 1
+        own = ins >= 0
+        wr = own & ((t & bustrace.WR) != 0)
+        writes = np.bincount(ins[wr], minlength=n)
+        waits = np.bincount(ins[own], weights=bustrace.waits(t[own]),
+                            minlength=n).astype(np.int64)
+
+        k = key[si]
+        intr = np.isin(next_pc, INT_VECTORS) & (writes == 3)
+        cyc = np.where(intr, self.tab.softi, self.tab.cycles[k]) + waits
+        cls = np.where(intr, 1, self.tab.cls[k])
+        mnem = np.where(intr, 1, self.tab.mnem[k])
+        self.feed(frame[si], a[si], cyc, cls, mnem,
+                  (t[si] & bustrace.VBL) != 0, writes > 0, intr)
+
+    def feed(self, fr, *cols):
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(fr)) + 1, [len(fr)]))
+        for b0, b1 in zip(bounds[:-1], bounds[1:]):
+            if b0 == b1:
+                continue
+            if fr[b0] != self.cur_frame:
+                self.finish_frame(whole=self.cur_frame > 0)
+                self.cur_frame = int(fr[b0])
+            self.cur.append(tuple(c[b0:b1] for c in cols))
+
+    def finish_frame(self, whole):
+        cur, self.cur = self.cur, []
+        if not whole or not cur:
+            return
+        pc, cyc, cls, mnem, vbl, wr, intr = (np.concatenate(c) for c in zip(*cur))
+
+        # Interrupt nesting depth; the idle loop is at the shallowest.
+        reti = mnem == self.tab.reti
+        depth = np.cumsum(intr) - np.cumsum(np.concatenate(([False], reti[:-1])))
+        main = np.flatnonzero(depth == depth.min())
+        n_idle = idle_loop(pc[main], wr[main])
+        busy = np.ones(len(pc), dtype=bool)
+        if n_idle:
+            busy[main[len(main) - n_idle:]] = False
+
+        total = int(cyc.sum())
+        in_vbl = cyc[vbl]
+        self.rows.append({
+            'frame': self.cur_frame,
+            'instructions': len(pc),
+            'cycles': total,
+            'busy': int(cyc[busy].sum()),
+            'vbl_cycles': int(in_vbl.sum()),
+            'vbl_busy': int(in_vbl[busy[vbl]].sum()),
+            'idle_loop': f'{pc[main[-n_idle]]:04x}' if n_idle else None,
+        })
+        for acc, idx in ((self.cls_busy, cls), (self.mnem_busy, mnem)):
+            acc[0] += np.bincount(idx[busy], minlength=acc.shape[1])
+            acc[1] += np.bincount(idx[busy], weights=cyc[busy],
+                                  minlength=acc.shape[1]).astype(np.int64)
+
+    def report(self):
+        rows = self.rows
+        busy = np.array([r['busy'] for r in rows], dtype=np.int64)
+        cycles = np.array([r['cycles'] for r in rows], dtype=np.int64)
+        pct = 100 * busy / np.maximum(cycles, 1)
+        vbl = np.array([r['vbl_cycles'] for r in rows], dtype=np.int64)
+        vbl_busy = np.array([r['vbl_busy'] for r in rows], dtype=np.int64)
+        for r, p in zip(rows, pct):
+            r['busy_pct'] = round(float(p), 2)
+
+        def table(names, acc):
+            tot = max(int(acc[1].sum()), 1)
+            return {
+                names[i]: {'instructions': int(acc[0, i]), 'cycles': int(acc[1, i]),
+                           'pct': round(100 * int(acc[1, i]) / tot, 2)}
+                for i in np.argsort(-acc[1], kind='stable') if acc[0, i]
+            }
+
+        return {
+            'frames': len(rows),
+            'cycles_per_frame': round(float(cycles.mean()), 1) if rows else 0,
+            'busy_pct': {
+                'mean': round(float(pct.mean()), 2) if rows else 0,
+                'p95': round(float(np.percentile(pct, 95)), 2) if rows else 0,
+                'max': round(float(pct.max()), 2) if rows else 0,
+            },
+            'vbl_busy_pct': round(100 * int(vbl_busy.sum()) / max(int(vbl.sum()), 1), 2),
+            'frames_without_idle_loop': sum(r['idle_loop'] is None for r in rows),
+            'classes': table(self.tab.classes, self.cls_busy),
+            'mnemonics': table(self.tab.mnems, self.mnem_busy),
+            'per_frame': rows,
+        }
+
+
+def main():
+    ap = argparse.ArgumentParser(description='CPU frame time budget from a bus trace.')
+    ap.add_argument('trace', help='bus trace (scv_tb.bus)')
+    ap.add_argument('-o', '--output', help='write JSON report')
+    ap.add_argument('-n', '--top', type=int, default=10,
+                    help='frames, classes and mnemonics to list (default: 10)')
+    ap.add_argument('-l', '--limit', type=float, metavar='PCT',
+                    help='exit 1 if a frame is more than PCT%% busy')
+    args = ap.parse_args()
+
+    t = bustrace.read(args.trace)
+    ft = FrameTime(CycleTable())
+    for i in range(0, len(t), CHUNK):
+        ft.add(t[i:i + CHUNK], t[i + CHUNK] if i + CHUNK < len(t) else None)
+    rep = ft.report()
+    if not rep['frames']:
+        sys.exit(f'{args.trace}: no whole frames')
+
+    b = rep['busy_pct']
+    print(f"{rep['frames']} frames, {rep['cycles_per_frame']} cycles/frame; "
+          f"busy {b['mean']}% mean, {b['p95']}% p95, {b['max']}% max; "
+          f"{rep['vbl_busy_pct']}% of VBL busy; "
+          f"{rep['frames_without_idle_loop']} frames without an idle loop")
+    print(f"{'frame':>6} {'insns':>8} {'cycles':>8} {'busy':>8} {'busy%':>7} "
+          f"{'vbl busy':>17} {'idle loop':>9}")
+    worst = sorted(rep['per_frame'], key=lambda r: (-r['busy_pct'], r['frame']))
+    for r in worst[:args.top]:
+        print(f"{r['frame']:6} {r['instructions']:8} {r['cycles']:8} {r['busy']:8} "
+              f"{r['busy_pct']:7.2f} {r['vbl_busy']:8}/{r['vbl_cycles']:<8} "
+              f"{r['idle_loop'] or '-':>9}")
+    for what in ('classes', 'mnemonics'):
+        print(f"{'class' if what == 'classes' else 'mnemonic':12} "
+              f"{'insns':>10} {'cycles':>12} {'%':>6}")
+        for name, c in list(rep[what].items())[:args.top]:
+            print(f"{name:12} {c['instructions']:10} {c['cycles']:12} {c['pct']:6.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rep, f, indent=1)
+    over = args.limit is not None and b['max'] > args.limit
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
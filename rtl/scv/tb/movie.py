@@ -0,0 +1,142 @@
+# Input movies for scv_tb: compile a text script to the binary the
+# bench replays (+movie=FILE), or back
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Script: one input state per line, held for a number of frames.
+#
+#   # comment
+#   18                  nothing pressed, 18 frames
+#   2 1                 keypad 1, 2 frames
+#   @300 c1.r           C1 right, until frame 300
+#   4 c1.t1 c1.r        C1 T1 + right, 4 frames
+#
+# Buttons are named after hmi_t fields (scv_pkg.sv): c1.l c1.r c1.u
+# c1.d c1.t1 c1.t2, c2.*, 0-9 (num), cl, en, pause. Frames are counted
+# as scv_tb does: a state applies from one VS fall to the next. After
+# the last line nothing is pressed.
+#
+# Binary: big-endian 32-bit words, so the bench can $fread each 64-bit
+# record straight into a reg. A header record of "SCVM" and VERSION,
+# then (frames, hmi_t) records, identical states merged.
+#
+#   python3 movie.py boot.txt boot.mov
+#   python3 movie.py -d boot.mov            # back to a script
+
+import argparse
+import struct
+import sys
+
+MAGIC = b'SCVM'
+VERSION = 1
+REC = struct.Struct('>II')
+
+# hmi_t bits, MSB first
+BUTTONS = ([f'c{c}.{b}' for c in (1, 2) for b in ('l', 'r', 'u', 'd', 't1', 't2')]
+           + [str(n) for n in range(9, -1, -1)]
+           + ['cl', 'en', 'pause'])
+BIT = {name: len(BUTTONS) - 1 - i for i, name in enumerate(BUTTONS)}
+
+
+class ScriptError(Exception):
+    pass
+
+
+def parse(lines):
+    """Script lines -> [(frames, hmi)], identical states merged."""
+    recs = []
+    frame = 0
+    for ln, line in enumerate(lines, 1):
+        words = line.split('#', 1)[0].split()
+        if not words:
+            continue
+        try:
+            if words[0].startswith('@'):
+                n = int(words[0][1:]) - frame
+            else:
+                n = int(words[0])
+        except ValueError:
+            raise ScriptError(f'{ln}: bad frame count {words[0]!r}')
+        if n < 0:
+            raise ScriptError(f'{ln}: {words[0]} is before frame {frame}')
+        hmi = 0
+        for w in words[1:]:
+            if w not in BIT:
+                raise ScriptError(f'{ln}: unknown button {w!r}')
+            hmi |= 1 << BIT[w]
+        if n == 0:
+            continue
+        frame += n
+        if recs and recs[-1][1] == hmi:
+            recs[-1] = (recs[-1][0] + n, hmi)
+        else:
+            recs.append((n, hmi))
+    return recs
+
+
+def write(f, recs):
+    f.write(REC.pack(int.from_bytes(MAGIC, 'big'), VERSION))
+    for n, hmi in recs:
+        while n:
+            k = min(n, 0x7fffffff)  # scv_tb counts in an integer
+            f.write(REC.pack(k, hmi))
+            n -= k
+
+
+def read(f):
+    data = f.read()
+    if len(data) < REC.size or data[:4] != MAGIC:
+        raise ValueError('not a movie')
+    _, ver = REC.unpack_from(data)
+    if ver != VERSION:
+        raise ValueError(f'version {ver}, expected {VERSION}')
+    recs = [REC.unpack_from(data, i)
+            for i in range(REC.size, len(data) - REC.size + 1, REC.size)]
+    for i, (n, _) in enumerate(recs):
+        if not n or n > 0x7fffffff:
+            raise ValueError(f'record {i}: bad frame count {n}')
+    return recs
+
+
+def unparse(recs):
+    frame = 0
+    for n, hmi in recs:
+        names = [b for b in BUTTONS if hmi >> BIT[b] & 1]
+        yield ' '.join([str(n)] + names) + f'\t# {frame}'
+        frame += n
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Compile scv_tb input movies.')
+    ap.add_argument('input', help='script (or movie, with -d)')
+    ap.add_argument('output', nargs='?', help='movie (or script, with -d)')
+    ap.add_argument('-d', '--decompile', action='store_true',
+                    help='movie -> script')
+    args = ap.parse_args()
+
+    try:
+        if args.decompile:
+            with open(args.input, 'rb') as f:
+                text = '\n'.join(unparse(read(f))) + '\n'
+            if args.output:
+                with open(args.output, 'w') as f:
+                    f.write(text)
+            else:
+                sys.stdout.write(text)
+            return
+        with open(args.input) as f:
+            recs = parse(f)
+    except ScriptError as e:
+        sys.exit(f'{args.input}:{e}')
+    except ValueError as e:
+        sys.exit(f'{args.input}: {e}')
+    out = args.output or args.input.rsplit('.', 1)[0] + '.mov'
+    with open(out, 'wb') as f:
+        write(f, recs)
+    print(f'{out}: {sum(n for n, _ in recs)} frames, {len(recs)} records')
+
+
+if __name__ == '__main__':
+    main()
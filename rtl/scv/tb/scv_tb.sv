@@ -152,6 +152,22 @@ integer fpic;
 logic   pice;
 string  fname;
 
+// +frames=N: $finish after N frames. +dump_from=F: (Verilator) start
+// dumping at frame F. +nopics: don't write frames/render-*.
+integer frames_max = 0;
+integer dump_from = -1;
+bit     nopics;
+
+initial begin
+`ifdef VERILATOR
+  frames_max = 320;
+  dump_from = 290;
+`endif
+  void'($value$plusargs("frames=%d", frames_max));
+  void'($value$plusargs("dump_from=%d", dump_from));
+  nopics = $test$plusargs("nopics");
+end
+
 initial fpic = -1;
 always @(negedge vs) begin
   if (fpic != -1) begin
@@ -165,12 +181,12 @@ always @(negedge vs) begin
   $sformat(fname, "frames/render-%03d", frame);
   pice = 0;
 `ifdef VERILATOR
-  if (frame == 290)
+  if (frame == dump_from)
     $dumpvars();
-  if (frame == 320)
-    $finish();
 `endif
-  if ((frame % 10) == 0) begin
+  if (frames_max != 0 && frame == frames_max)
+    $finish();
+  if ((frame % 10) == 0 && !nopics) begin
     fpic = $fopen({fname, ".hex"}, "w");
   end
   frame = frame + 1;
@@ -187,8 +203,186 @@ always @(posedge clk) begin
     else if (pice) begin
       pice = 0;
       $fwrite(fpic, "\n");
+      $fflush(fpic);
+    end
+  end
+end
+
+//////////////////////////////////////////////////////////////////////
+
+// Audio capture: +audio writes scv_tb.raw. To convert the file:
+//   python3 ../upd1771c/tb/raw2wav.py scv_tb.raw scv_tb.wav
+
+integer faud = 0;
+wire [15:0] aud_out = {aud_pcm, 7'b0};
+initial begin
+  if ($test$plusargs("audio")) begin
+    faud = $fopen("scv_tb.raw", "w");
+    assert(faud != 0) else $fatal(1, "can't open scv_tb.raw");
+  end
+end
+always @(posedge clk) if (faud) begin
+  if (~res & dut.apu.phi2p) begin
+    $fwrite(faud, "%c%c", aud_out[15:8], aud_out[7:0]);
+  end
+end
+final
+  if (faud)
+    $fclose(faud);
+
+//////////////////////////////////////////////////////////////////////
+
+// Memory snapshots, for render_tb: +snap_every=N [+snap_start=F]
+// writes one every N frames from frame F to scv_tb.snap. Each is a set
+// of records: "SNAP", frame, base address, length (32-bit LE), then
+// that range of CPU address space. To cut render_tb dumps:
+//   python3 ../epochtv1/tb/snapdump.py scv_tb.snap snaps/
+
+integer fsnap = 0;
+integer snap_every = 0, snap_start = 0;
+initial begin
+  if ($value$plusargs("snap_every=%d", snap_every) && snap_every > 0) begin
+    void'($value$plusargs("snap_start=%d", snap_start));
+    fsnap = $fopen("scv_tb.snap", "wb");
+    assert(fsnap != 0) else $fatal(1, "can't open scv_tb.snap");
+  end
+end
+final
+  if (fsnap)
+    $fclose(fsnap);
+
+task snap_u32(input [31:0] v);
+  $fwrite(fsnap, "%c%c%c%c", v[7:0], v[15:8], v[23:16], v[31:24]);
+endtask
+
+task snap_header(input integer f, input [15:0] base, input [15:0] len);
+  $fwrite(fsnap, "SNAP");
+  snap_u32(f);
+  snap_u32(32'(base));
+  snap_u32(32'(len));
+endtask
+
+task snap_write(input integer f);
+integer i;
+  // $2000-$3403: VRAM, BGM, OAM, R0-R3 (render_tb load_rams layout)
+  snap_header(f, 16'h2000, 16'h1404);
+  for (i = 0; i < 2048; i++)
+    $fwrite(fsnap, "%c%c", dut.vrama.mem[i], dut.vramb.mem[i]);
+  for (i = 0; i < 128; i++)
+    snap_u32(dut.vdc.bgm[i]);
+  for (i = 0; i < 128; i++)
+    snap_u32(dut.vdc.oam[i]);
+  $fwrite(fsnap, "%c%c%c%c", dut.vdc.ioreg0, dut.vdc.ioreg1,
+          dut.vdc.ioreg2, dut.vdc.ioreg3);
+
+  // $FF80-$FFFF: WRAM
+  snap_header(f, 16'hff80, 16'h0080);
+  for (i = 0; i < 128; i++)
+    $fwrite(fsnap, "%c", dut.cpu.wram.mem[i]);
+  $fflush(fsnap);
+endtask
+
+// Taken as VS starts, at the end of the frame last $display'ed.
+always @(posedge vs) begin
+  if (fsnap && frame - 1 >= snap_start &&
+      ((frame - 1 - snap_start) % snap_every) == 0)
+    snap_write(frame - 1);
+end
+
+//////////////////////////////////////////////////////////////////////
+
+// CPU bus trace: +bustrace writes scv_tb.bus, one record per access,
+// incl. internal ROM / RAM (format: bustrace.py). To profile it:
+//   python3 busprof.py scv_tb.bus -o busprof.json -m busprof.png
+// and for the CPU time each frame uses:
+//   python3 frametime.py scv_tb.bus -o frametime.json
+
+integer     fbus = 0;
+reg         bus_act;
+reg [31:0]  bus_rec;
+reg [1:0]   bus_wait;
+
+initial begin
+  bus_act = 0;
+  if ($test$plusargs("bustrace")) begin
+    fbus = $fopen("scv_tb.bus", "wb");
+    assert(fbus != 0) else $fatal(1, "can't open scv_tb.bus");
+  end
+end
+final
+  if (fbus)
+    $fclose(fbus);
+
+always @(posedge clk) if (fbus) begin
+  if (~dut.cpu.core_rdb | ~dut.cpu.core_wrb) begin
+    // T-cycles the core held T2 for WAITB (sampled on CP2 falling),
+    // saturating.
+    bus_wait = bus_act ? bus_rec[31:30] : 2'd0;
+    if (dut.cpu.core.cp2n & dut.cpu.core.t2_wait & ~&bus_wait)
+      bus_wait = bus_wait + 1'd1;
+    bus_rec[15:0] <= dut.cpu.core_a;
+    bus_rec[23:16] <= ~dut.cpu.core_wrb ? dut.cpu.core_db_o : dut.cpu.core_db;
+    bus_rec[24] <= ~dut.cpu.core_rdb;
+    bus_rec[25] <= ~dut.cpu.core_wrb;
+    bus_rec[26] <= dut.cpu.M1;
+    bus_rec[27] <= dut.vbl;
+    bus_rec[29:28] <= dut.pco[6:5];
+    bus_rec[31:30] <= bus_wait;
+    bus_act <= 1;
+  end
+  else if (bus_act) begin
+    $fwrite(fbus, "%c%c%c%c", bus_rec[7:0], bus_rec[15:8],
+            bus_rec[23:16], bus_rec[31:24]);
+    bus_act <= 0;
+  end
+end
+
+//////////////////////////////////////////////////////////////////////
+
+// APU interrupt trace: +inttrace writes scv_tb.int. To analyze it:
+//   python3 ../upd1771c/tb/intlat.py scv_tb.int
+
+`define INT_TRACE_DUT dut.apu
+`define INT_TRACE_FILE "scv_tb.int"
+`include "../upd1771c/tb/int_trace.svh"
+
+//////////////////////////////////////////////////////////////////////
+
+// Input movie: +movie=FILE replays per-frame hmi_t states, instead of
+// the canned key presses below. To compile one from a script:
+//   python3 movie.py boot.txt boot.mov
+
+integer     fmovie = -1;
+integer     movie_left = 0;
+reg [63:0]  movie_rec;
+string      movie_fn;
+
+initial begin
+  if ($value$plusargs("movie=%s", movie_fn)) begin
+    fmovie = $fopen(movie_fn, "rb");
+    assert(fmovie != 0) else $finish;
+    assert($fread(movie_rec, fmovie) == 8 && movie_rec == {"SCVM", 32'd1})
+      else $fatal(1, "%s: not a version 1 movie", movie_fn);
+  end
+end
+
+// Records are (frames, hmi_t), applied from one VS fall.
+always @(negedge vs) if (fmovie != -1) begin
+  if (movie_left <= 0) begin
+    if ($fread(movie_rec, fmovie) == 8) begin
+      movie_left = movie_rec[63:32];
+      if (movie_left <= 0)
+        $fatal(1, "%s: bad frame count %0d", movie_fn, movie_rec[63:32]);
+      hmi = movie_rec[24:0];
+    end
+    else begin
+      hmi = 0;
+      $fclose(fmovie);
+      fmovie = -1;
+      $display("Movie ended.");
     end
   end
+  movie_left = movie_left - 1;
 end
 
 //////////////////////////////////////////////////////////////////////
@@ -220,7 +414,7 @@ initial #0 begin
 
 end
 
-initial if (1) begin
+initial if (!$test$plusargs("movie=")) begin
   #(300e3);
   $display("Pressing 1...");
   hmi.num[1] = '1;
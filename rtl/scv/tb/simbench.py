@@ -0,0 +1,216 @@
+# Verilator build-option sweep and simulation speed history for scv_tb
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Builds scv_tb with each combination of the selected options, starting
+# from the compile-command in scv_tb.cpp, and runs a fixed boot
+# workload (+frames=N +nopics; with tracing, dumping starts at frame 0).
+# Records build time, wall time, emulated clock cycles per second and
+# peak RSS, and appends them to a history file. Each result is compared
+# with the last one for the same options in the history.
+#
+#   python3 simbench.py                      # trace on/off, threads 1
+#   python3 simbench.py -t 1,2,4 --opt both  # wider sweep
+#
+# scv_tb generates its clock and stimulus with delays, so it needs
+# --timing. --timing off/both adds --no-timing builds; until the bench
+# can do without delays, those are recorded as build failures.
+#
+# Needs the ROMs and cart.bin that scv_tb loads, in this directory.
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORK = os.path.join(HERE, '.simbench')
+
+RE_CMD = re.compile(r'compile-command:\s*"(.*)"\s*$', re.M)
+RE_FRAME = re.compile(r'^\s*(\d+) us: Frame (\d+)', re.M)
+
+CLK_MHZ = 2 * 14.3181818    # scv_tb clk
+
+
+def base_command():
+    with open(os.path.join(HERE, 'scv_tb.cpp')) as f:
+        m = RE_CMD.search(f.read())
+    return shlex.split(m[1])
+
+
+def build_command(cfg, mdir):
+    """Apply a configuration to the compile-command."""
+    cmd = []
+    it = iter(base_command())
+    for a in it:
+        if a in ('--trace-fst', '--trace'):
+            if cfg['trace']:
+                cmd.append(a)
+        elif a == '--trace-threads':
+            v = next(it)
+            if cfg['trace']:
+                cmd += [a, v]
+        elif a in ('--timing', '--no-timing'):
+            cmd.append('--timing' if cfg['timing'] else '--no-timing')
+        else:
+            cmd.append(a)
+    if cfg['threads'] > 1:
+        cmd += ['--threads', str(cfg['threads'])]
+    if cfg['opt']:
+        cmd += ['-O3', '-CFLAGS', '-O3']
+    i = cmd.index('--build')
+    return cmd[:i] + ['--Mdir', mdir] + cmd[i:]
+
+
+def cfg_name(cfg):
+    return '-'.join([
+        'trace' if cfg['trace'] else 'notrace',
+        f"t{cfg['threads']}",
+        'O3' if cfg['opt'] else 'O0',
+        'timing' if cfg['timing'] else 'notiming',
+    ])
+
+
+def run(cmd, log, cwd):
+    """Run cmd; return (exit code, wall time, peak RSS in MB)."""
+    with open(log, 'w') as f:
+        t0 = time.perf_counter()
+        p = subprocess.Popen(cmd, cwd=cwd, stdout=f, stderr=subprocess.STDOUT)
+        _, status, ru = os.wait4(p.pid, 0)
+        t = time.perf_counter() - t0
+        p.returncode = os.waitstatus_to_exitcode(status)
+    return p.returncode, t, ru.ru_maxrss / 1024
+
+
+def bench(cfg, frames, verbose):
+    name = cfg_name(cfg)
+    mdir = os.path.join(WORK, 'obj_' + name)
+    res = {'config': name}
+
+    log = os.path.join(WORK, name + '.build.log')
+    cmd = build_command(cfg, mdir)
+    if verbose:
+        print(' '.join(cmd))
+    rc, t, _ = run(cmd, log, HERE)
+    res['build_time'] = round(t, 1)
+    if rc:
+        res['error'] = f'build failed, see {os.path.relpath(log)}'
+        return res
+
+    log = os.path.join(WORK, name + '.run.log')
+    args = [f'+frames={frames}', '+nopics']
+    if cfg['trace']:
+        args.append('+dump_from=0')
+    rc, t, rss = run([os.path.join(mdir, 'Vscv_tb')] + args, log, HERE)
+    with open(log) as f:
+        out = f.read()
+    fr = RE_FRAME.findall(out)
+    if rc or not fr:
+        res['error'] = f'run failed, see {os.path.relpath(log)}'
+        return res
+    sim_us = int(fr[-1][0])
+    res.update({
+        'frames': int(fr[-1][1]),
+        'sim_us': sim_us,
+        'wall_time': round(t, 3),
+        'cycles_per_sec': round(sim_us * CLK_MHZ / t),
+        'frames_per_sec': round(int(fr[-1][1]) / t, 3),
+        'max_rss_mb': round(rss, 1),
+    })
+    return res
+
+
+def git_rev():
+    p = subprocess.run(['git', 'describe', '--always', '--dirty'],
+                       cwd=HERE, stdout=subprocess.PIPE,
+                       stderr=subprocess.DEVNULL, text=True)
+    return p.stdout.strip() or None
+
+
+def last_results(history):
+    """config name -> latest result in the history file."""
+    ret = {}
+    if os.path.exists(history):
+        with open(history) as f:
+            for l in f:
+                for r in json.loads(l)['results']:
+                    if 'error' not in r:
+                        ret[r['config']] = r
+    return ret
+
+
+def bools(s):
+    return {'on': [True], 'off': [False], 'both': [False, True]}[s]
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Sweep scv_tb Verilator builds for speed.')
+    ap.add_argument('--trace', choices=('on', 'off', 'both'), default='both')
+    ap.add_argument('-t', '--threads', default='1',
+                    help='comma-separated --threads values (default: 1)')
+    ap.add_argument('--opt', choices=('on', 'off', 'both'), default='off',
+                    help='-O3 (Verilator and C++)')
+    ap.add_argument('--timing', choices=('on', 'off', 'both'), default='on')
+    ap.add_argument('-f', '--frames', type=int, default=30,
+                    help='frames to emulate per run (default: 30)')
+    ap.add_argument('--history', default=os.path.join(WORK, 'history.jsonl'),
+                    help='history file (JSON lines)')
+    ap.add_argument('--tolerance', type=float, default=0.1,
+                    help='allowed drop in cycles/s vs. history (default: 0.1)')
+    ap.add_argument('-v', '--verbose', action='store_true')
+    args = ap.parse_args()
+
+    if not shutil.which('verilator'):
+        sys.exit('verilator not found')
+    os.makedirs(WORK, exist_ok=True)
+    prev = last_results(args.history)
+    threads = [int(x) for x in args.threads.split(',')]
+    cfgs = [dict(trace=tr, threads=th, opt=o, timing=ti)
+            for tr, th, o, ti in itertools.product(
+                bools(args.trace), threads, bools(args.opt),
+                bools(args.timing))]
+
+    results = []
+    slower = 0
+    print(f"{'config':28} {'build s':>8} {'run s':>8} {'Mcyc/s':>8} "
+          f"{'fps':>7} {'RSS MB':>8}")
+    for cfg in cfgs:
+        r = bench(cfg, args.frames, args.verbose)
+        results.append(r)
+        if 'error' in r:
+            print(f"{r['config']:28} {r['error']}")
+            continue
+        line = (f"{r['config']:28} {r['build_time']:8.1f} "
+                f"{r['wall_time']:8.2f} {r['cycles_per_sec'] / 1e6:8.3f} "
+                f"{r['frames_per_sec']:7.2f} {r['max_rss_mb']:8.1f}")
+        p = prev.get(r['config'])
+        if p and p['frames'] == r['frames']:
+            ratio = r['cycles_per_sec'] / p['cycles_per_sec']
+            line += f'  {ratio:5.2f}x'
+            if ratio < 1 - args.tolerance:
+                line += '  SLOWER'
+                slower += 1
+        print(line)
+
+    with open(args.history, 'a') as f:
+        f.write(json.dumps({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'rev': git_rev(),
+            'host': platform.node(),
+            'machine': platform.machine(),
+            'results': results,
+        }) + '\n')
+    sys.exit(1 if slower else 0)
+
+
+if __name__ == '__main__':
+    main()
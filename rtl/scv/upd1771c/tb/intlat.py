@@ -0,0 +1,227 @@
+# uPD1771C interrupt latency and tone timing from an interrupt trace
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Reads a trace written by int_trace.svh (scv_tb +inttrace: scv_tb.int)
+# and measures, per interrupt:
+#   - trigger -> vector: PHI2 cycles from the trigger that set it
+#     pending to its vector being taken
+#   - vector -> RETI: time spent in the handler
+#   - trigger periods, against those the counters should produce:
+#     tone N * (1, 2, 4, 8) by N range (see upd1771c.sv), NS 512 / 256 /
+#     64 / 32 by MD[9:8], time 512
+# Triggers that arrive while their interrupt is pending (coalesced) or
+# active (dropped) are counted; both lose an interrupt.
+#
+# Periods spanning a change of N / MD[9:8] aren't checked. Output is a
+# text summary with histograms, a list of period mismatches, and a JSON
+# report (-o). The trace is streamed in chunks.
+
+import argparse
+import collections
+import json
+import os
+import sys
+
+import numpy as np
+
+REC = np.dtype([('cyc', '<u4'), ('ev', 'u1'), ('id', 'u1'), ('arg', '<u2')])
+EV_TRIG, EV_VECTOR, EV_RETI = range(3)
+NAMES = ('tone', 'ns', 'ext', 'time')
+II_TONE, II_NS, II_EXT, II_TIME = range(4)
+
+PHI2_HZ = 750000
+CHUNK = 1 << 20
+
+
+def expected_period(iid, setting):
+    if iid == II_TONE:
+        n = setting
+        if n < 0x08:
+            return None             # no tone interrupt
+        for lo, mult in ((0x40, 1), (0x20, 2), (0x10, 4), (0x08, 8)):
+            if n >= lo:
+                return n * mult
+    if iid == II_NS:
+        return (512, 256, 64, 32)[setting & 3]
+    if iid == II_TIME:
+        return 512
+    return None
+
+
+class Analyzer:
+    def __init__(self, keep_mismatches):
+        self.keep = keep_mismatches
+        self.trig = [0] * 4
+        self.enabled = [0] * 4
+        self.vectors = [0] * 4
+        self.coalesced = [0] * 4
+        self.dropped = [0] * 4
+        self.latency = [collections.Counter() for _ in range(4)]
+        self.service = [collections.Counter() for _ in range(4)]
+        self.periods = [collections.Counter() for _ in range(4)]  # (setting, period)
+        self.vecs = [collections.Counter() for _ in range(4)]
+        self.mismatches = []
+        self.n_mismatches = 0
+        self.records = 0
+        # State carried between chunks
+        self.last_trig = [None] * 4     # (cycle, setting)
+        self.pend = [None] * 4          # cycle set pending
+        self.active = [None] * 4        # cycle vector taken
+
+    def add(self, recs):
+        self.records += len(recs)
+        for cyc, ev, iid, arg in recs.tolist():
+            if ev == EV_TRIG:
+                self.trigger(cyc, iid, arg)
+            elif ev == EV_VECTOR:
+                self.vectors[iid] += 1
+                self.vecs[iid][arg] += 1
+                if self.pend[iid] is not None:
+                    self.latency[iid][(cyc - self.pend[iid]) & 0xffffffff] += 1
+                    self.pend[iid] = None
+                self.active[iid] = cyc
+            elif ev == EV_RETI:
+                if self.active[iid] is not None:
+                    self.service[iid][(cyc - self.active[iid]) & 0xffffffff] += 1
+                    self.active[iid] = None
+
+    def trigger(self, cyc, iid, arg):
+        setting = arg & 0xff
+        self.trig[iid] += 1
+        last = self.last_trig[iid]
+        if last is not None and last[1] == setting:
+            dt = (cyc - last[0]) & 0xffffffff
+            self.periods[iid][(setting, dt)] += 1
+            exp = expected_period(iid, setting)
+            if exp is not None and dt != exp:
+                self.n_mismatches += 1
+                if len(self.mismatches) < self.keep:
+                    self.mismatches.append({
+                        'cycle': cyc, 'int': NAMES[iid], 'setting': setting,
+                        'period': dt, 'expected': exp,
+                    })
+        self.last_trig[iid] = (cyc, setting)
+
+        if arg & 0x100:
+            self.enabled[iid] += 1
+            if self.active[iid] is not None:
+                self.dropped[iid] += 1
+            elif self.pend[iid] is not None:
+                self.coalesced[iid] += 1
+            else:
+                self.pend[iid] = cyc
+
+    def report(self):
+        ret = {'records': self.records, 'mismatches': self.n_mismatches,
+               'interrupts': {}}
+        for i, name in enumerate(NAMES):
+            if not (self.trig[i] or self.vectors[i]):
+                continue
+            periods = collections.defaultdict(dict)
+            for (s, dt), c in sorted(self.periods[i].items()):
+                periods[s][dt] = c
+            ret['interrupts'][name] = {
+                'triggers': self.trig[i],
+                'enabled': self.enabled[i],
+                'vectors': self.vectors[i],
+                'coalesced': self.coalesced[i],
+                'dropped': self.dropped[i],
+                'vector_addrs': {f'{v:03x}': c for v, c in sorted(self.vecs[i].items())},
+                'trigger_to_vector': dict(sorted(self.latency[i].items())),
+                'vector_to_reti': dict(sorted(self.service[i].items())),
+                'periods': {
+                    s: {'expected': expected_period(i, s), 'measured': p}
+                    for s, p in periods.items()
+                },
+            }
+        ret['mismatch_list'] = self.mismatches
+        return ret
+
+
+def hist_lines(counter, bins=12, width=40):
+    """Text histogram of a {value: count} Counter."""
+    if not counter:
+        return ['    (none)']
+    vals = np.array(sorted(counter))
+    cnts = np.array([counter[v] for v in vals])
+    if len(vals) > bins:
+        edges = np.linspace(vals[0], vals[-1] + 1, bins + 1)
+        idx = np.searchsorted(edges, vals, side='right') - 1
+        cnts = np.bincount(idx, weights=cnts, minlength=bins).astype(int)
+        labels = [f'{int(edges[k])}-{int(np.ceil(edges[k + 1])) - 1}'
+                  for k in range(bins)]
+    else:
+        labels = [str(v) for v in vals]
+    total = counter.total()
+    mean = sum(v * c for v, c in counter.items()) / total
+    lines = [f'    min {vals[0]}  mean {mean:.1f}  max {vals[-1]}  (n = {total})']
+    top = cnts.max()
+    for lab, c in zip(labels, cnts):
+        lines.append(f'    {lab:>12} {c:9} {"#" * int(np.ceil(width * c / top))}')
+    return lines
+
+
+def setting_name(iid, s):
+    return f'N={s:#04x}' if iid == II_TONE else f'MD[9:8]={s}' if iid == II_NS else '-'
+
+
+def main():
+    ap = argparse.ArgumentParser(description='uPD1771C interrupt latency and tone timing.')
+    ap.add_argument('trace', help='interrupt trace (scv_tb.int)')
+    ap.add_argument('-o', '--output', help='write JSON report')
+    ap.add_argument('-n', '--mismatches', type=int, default=20,
+                    help='period mismatches to list (default: 20)')
+    args = ap.parse_args()
+
+    an = Analyzer(max(args.mismatches, 1000))
+    if os.path.getsize(args.trace) >= REC.itemsize:
+        t = np.memmap(args.trace, dtype=REC, mode='r')
+        for i in range(0, len(t), CHUNK):
+            an.add(np.asarray(t[i:i + CHUNK]))
+    rep = an.report()
+
+    print(f"{rep['records']} records")
+    for i, name in enumerate(NAMES):
+        if name not in rep['interrupts']:
+            continue
+        r = rep['interrupts'][name]
+        print(f"\n{name}: {r['triggers']} triggers, {r['enabled']} enabled, "
+              f"{r['vectors']} vectors, {r['coalesced']} coalesced, "
+              f"{r['dropped']} dropped")
+        print('  trigger -> vector, PHI2 cycles:')
+        print('\n'.join(hist_lines(an.latency[i])))
+        print('  vector -> RETI, PHI2 cycles:')
+        print('\n'.join(hist_lines(an.service[i])))
+        print('  trigger periods:')
+        for s, p in r['periods'].items():
+            exp = p['expected']
+            tot = sum(p['measured'].values())
+            ok = p['measured'].get(exp, 0)
+            # The trigger rate, not the tone's pitch: that's up to the
+            # ROM's handler.
+            rate = f'{PHI2_HZ / exp:9.1f} trig/s' if exp else ' ' * 16
+            print(f"    {setting_name(i, s):14} expected {exp or '-':>5} {rate}"
+                  f"  {ok}/{tot} ok"
+                  + ''.join(f'  {dt}x{c}' for dt, c in p['measured'].items()
+                            if dt != exp))
+
+    if rep['mismatches']:
+        print(f"\n{rep['mismatches']} period mismatches:")
+        for m in rep['mismatch_list'][:args.mismatches]:
+            print(f"  cycle {m['cycle']:10}  {m['int']:5} "
+                  f"{setting_name(NAMES.index(m['int']), m['setting']):14} "
+                  f"{m['period']:6} (expected {m['expected']})")
+        if rep['mismatches'] > args.mismatches:
+            print('  ...')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rep, f, indent=1)
+    sys.exit(1 if rep['mismatches'] else 0)
+
+
+if __name__ == '__main__':
+    main()
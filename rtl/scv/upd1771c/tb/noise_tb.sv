@@ -92,6 +92,8 @@ end
 
 // To play the file:
 //   play -b 16 -r 750000 -c 1 -B -e signed-integer noise.raw
+// or convert it to WAV:
+//   python3 raw2wav.py noise.raw noise.wav
 
 integer faud;
 wire [15:0] aud_out = {pcm_out, 7'b0};
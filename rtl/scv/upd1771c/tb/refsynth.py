@@ -0,0 +1,147 @@
+# NEC uPD1771C reference synthesizer: tone counter and noise LFSRs
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Models the hardware timing sources of upd1771c.sv, not the -017 ROM
+# program that shapes samples from them:
+#
+# . Tone: NC reloads from N every N cycles (256 if N=0). NUC counts
+#   reloads, and the tone interrupt fires on the falling edge of a NUC
+#   bit chosen by N's range. The output toggles on every tone
+#   interrupt, giving a square wave at CLK / (2 * N * k).
+#
+# . Noise: the NS interrupt fires on the falling edge of the TC bit
+#   selected by MD[9:8]. Each NS interrupt advances PNC1 (7-bit LFSR)
+#   and PNC2 (NS). The output follows PNC1[6], or NS with --ns.
+#
+# Whole blocks of chip cycles are rendered at once, then box-filtered
+# down to the output sample rate.
+
+import argparse
+import wave
+
+import numpy as np
+
+# 1 cycle = 8 * CLK; CLK = 6 MHz
+CYCLE_HZ = 6_000_000 // 8
+
+# Tone interrupt: reloads per interrupt, by N range
+NUC_RANGES = [
+    (0x08, 0),                  # 00-07: no interrupt
+    (0x10, 8),                  # 08-0F: NUC[2] negedge
+    (0x20, 4),                  # 10-1F: NUC[1] negedge
+    (0x40, 2),                  # 20-3F: NUC[0] negedge
+    (0x100, 1),                 # 40-FF: every reload
+]
+
+# NS interrupt period, by MD[9:8] (falling edge of TC[8], [7], [5], [4])
+NS_PERIODS = [512, 256, 64, 32]
+
+
+def tone_period(n):
+    """Tone interrupt period in cycles for N, or 0 for none."""
+    for lim, k in NUC_RANGES:
+        if n < lim:
+            return (n or 256) * k
+    raise ValueError(n)
+
+
+def pnc1_seq():
+    """PNC1 states, starting from reset, over its full period."""
+    pnc1 = 0
+    seq = []
+    while True:
+        seq.append(pnc1)
+        b0 = ~((pnc1 >> 5) ^ (pnc1 >> 6)) & 1
+        pnc1 = ((pnc1 << 1) | b0) & 0x7f
+        if pnc1 == 0:
+            return np.array(seq, dtype=np.uint8)
+
+
+def ns_seq(nss):
+    """NS states, starting from reset, over PNC2's full period."""
+    pnc2 = 0
+    seen = {}
+    seq = []
+    while pnc2 not in seen:
+        seen[pnc2] = len(seq)
+        ns = nss & (pnc2 >> 2)
+        seq.append(ns)
+        b0 = ~((pnc2 & 1) if nss else ((pnc2 >> 1) ^ ns)) & 1
+        pnc2 = ((pnc2 << 1) | b0) & 7
+    # Drop any lead-in before the loop.
+    return np.array(seq[seen[pnc2]:], dtype=np.int8), seen[pnc2]
+
+
+class Synth:
+    def __init__(self, n=None, md98=None, ns=False, nss=1):
+        self.tone_t = tone_period(n) if n is not None else 0
+        self.noise_t = NS_PERIODS[md98] if md98 is not None else 0
+        if ns:
+            self.nseq, self.nlead = ns_seq(nss)
+        else:
+            self.nseq = (pnc1_seq() >> 6).astype(np.int8)
+            self.nlead = 0
+        self.voices = (self.tone_t > 0) + (self.noise_t > 0)
+
+    def render(self, c0, c1):
+        """Render cycles [c0, c1) as floats in -1..1."""
+        c = np.arange(c0, c1, dtype=np.int64)
+        out = np.zeros(len(c), dtype=np.float32)
+        if self.tone_t:
+            out += 1 - 2 * ((c // self.tone_t) & 1)
+        if self.noise_t:
+            j = c // self.noise_t
+            j = np.where(j < self.nlead, 0, (j - self.nlead) % len(self.nseq))
+            out += 2 * self.nseq[j] - 1
+        return out / max(self.voices, 1)
+
+
+def write_wav(fn, synth, seconds, rate, volume, block=1 << 14):
+    nsamples = int(seconds * rate)
+    with wave.open(fn, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        for s0 in range(0, nsamples, block):
+            s = np.arange(s0, min(s0 + block, nsamples) + 1, dtype=np.int64)
+            edges = s * CYCLE_HZ // rate
+            x = synth.render(edges[0], edges[-1])
+            # Box filter: average the cycles that fall in each sample.
+            y = np.add.reduceat(x, edges[:-1] - edges[0]) / np.diff(edges)
+            w.writeframes((y * volume * 32767).astype('<i2').tobytes())
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Render uPD1771C tone/noise to WAV.')
+    ap.add_argument('wav', help='output WAV file')
+    ap.add_argument('-n', '--tone', type=lambda s: int(s, 0), metavar='N',
+                    help='tone counter reload value N (0-255)')
+    ap.add_argument('-m', '--noise', type=int, choices=range(4), metavar='MD98',
+                    help='noise rate select MD[9:8] (0-3)')
+    ap.add_argument('--ns', action='store_true',
+                    help='noise output follows NS instead of PNC1[6]')
+    ap.add_argument('--nss', type=int, choices=(0, 1), default=1,
+                    help='MD[3] (NSS) for --ns (default: 1)')
+    ap.add_argument('-t', '--seconds', type=float, default=1.0)
+    ap.add_argument('-r', '--rate', type=int, default=48000)
+    ap.add_argument('-v', '--volume', type=float, default=0.5)
+    args = ap.parse_args()
+
+    if args.tone is None and args.noise is None:
+        ap.error('need --tone and/or --noise')
+
+    synth = Synth(args.tone, args.noise, args.ns, args.nss)
+    if args.tone is not None:
+        t = synth.tone_t
+        print(f'tone: N={args.tone:#04x} int. period {t} cycles, '
+              + (f'{CYCLE_HZ / (2 * t):.2f} Hz' if t else 'silent'))
+    if args.noise is not None:
+        print(f'noise: NS int. period {synth.noise_t} cycles')
+    write_wav(args.wav, synth, args.seconds, args.rate, args.volume)
+
+
+if __name__ == '__main__':
+    main()
@@ -84,6 +84,11 @@ always @(posedge clk) begin
     cycle += 1;
 end
 
+// +inttrace writes tone_tb.int, for intlat.py.
+`define INT_TRACE_DUT dut
+`define INT_TRACE_FILE "tone_tb.int"
+`include "int_trace.svh"
+
 initial #0 begin
   res = 1;
   clk = 1;
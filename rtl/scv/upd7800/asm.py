@@ -0,0 +1,465 @@
+# uPD7801 assembler, and random CPU stress program generator
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# The opcode table is the microcode generator's own: each table line of
+# gen-ucode.py gives the opcode(s) and the syntax,
+#
+#   logic_imm([0x508, 0x50f], 11, 'AND', 'RF_IR210',  asm='ANI r, byte')
+#
+# and its ird row in ucode-gen.yaml carries them, with the cycles and
+# operand byte count. Later rows override earlier ones, as in
+# uc-ird.svh. In the syntax, lowercase words are fields:
+#   - in the opcode: r r1 r2 (V..L by IR[2:0]), sr sr2 (special
+#     register), rpa rpa1, irf (INTF0..INTFS, or F0..FS), bit, and JR's
+#     jdisp1 and CALT's ta
+#   - in operand bytes: byte, wa, word, and CALF's fa and JRE's jdisp
+#     (partly in the opcode)
+#
+# Source: one instruction per line, "label:", "; comment", ORG, DB and
+# DW. Numbers are 0x12, 12h (f9h too, unless that's a symbol), $12 or
+# decimal, $ or . alone is the current address; + - * / & | << >> ~ and () work on them. Where the same
+# instruction has two encodings (ADI A, byte), the shorter is used.
+#
+# Output is a $readmemh image, with the source as a listing (like
+# tb/timer.hex), or with a .bin output name, raw bytes from the first
+# address (cputest_cart.bin).
+#
+#   python3 asm.py -l                               # opcode table
+#   python3 asm.py prog.s prog.hex
+#   python3 asm.py -r 5000 -s 1 -S stress.s stress.hex
+#
+# -r N generates a straight-line mix of N instructions drawn evenly
+# from the table lines, and prints the cycles from reset to its final
+# JR $. upd7800.sv runs a skipped instruction's full microcode, so the
+# count doesn't depend on the data. Left out: control flow, BLOCK, EI
+# and STM, anything that writes V or SP or a special register. V stays
+# $FF, so wa, and every pointer (reloaded before each use) and word
+# address, stay in internal RAM ($FF80-$FFEF); PUSH / POP are balanced
+# below a stack at $FFF0-$FFFF. The program is followed by 256 zero
+# bytes for TABLE to read.
+
+import argparse
+import os
+import random
+import re
+import sys
+
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+UCODE_GEN = os.path.join(HERE, 'ucode-gen.yaml')
+UCODE_FIXED = os.path.join(HERE, 'ucode-fixed.yaml')
+
+# upd7800.sv of_prefix: IR[10:8] -> prefix opcode
+PREFIX = {1: 0x48, 2: 0x4c, 3: 0x4d, 4: 0x60, 5: 0x64, 6: 0x70, 7: 0x74}
+
+RPA = [None, 'B', 'D', 'H', 'D+', 'H+', 'D-', 'H-']
+IRF = ['INTF0', 'INTFT', 'INTF1', 'INTF2', 'INTFS']    # upd7800.sv II_*
+ALIASES = {f[3:]: f for f in IRF}
+BITS = [str(b) for b in range(8)]
+
+# Operand bytes of each immediate field
+IMM = {'byte': 1, 'wa': 1, 'word': 2, 'fa': 1, 'jdisp': 1, 'jdisp1': 0, 'ta': 0}
+OPCODE_IMM = ('jdisp1', 'ta', 'fa', 'jdisp')  # fill the low bits of a range
+
+RE_TOKEN = re.compile(r'\s*(?:(0x[0-9a-f]+|\$[0-9a-f]+|[0-9][0-9a-f]*h|\d+)'
+                      r'|([a-z_.][\w.]*)|(\$)|(<<|>>|[-+*/&|~()]))', re.I)
+RE_HEX_H = re.compile(r'[0-9a-f]+h', re.I)
+RE_LABEL = re.compile(r'^\s*([a-z_.][\w.]*):', re.I)
+
+
+class AsmError(Exception):
+    pass
+
+
+class Op:
+    """One opcode, or a run of them with a field in the opcode (JR)."""
+    def __init__(self, ir, ir1, cls, mnem, tmpl, args, cycles, noper):
+        self.ir = ir
+        self.ir1 = ir1          # last of the run
+        self.cls = cls          # gen-ucode.py function: math_imm, jr, ...
+        self.mnem = mnem
+        self.tmpl = tmpl        # operands as in the syntax
+        self.args = args        # fixed operand text, or an IMM field
+        self.cycles = cycles
+        self.noper = noper
+        self.length = (2 if ir >> 8 else 1) + noper
+
+    def opcode(self, low=0):
+        ir = self.ir | low
+        return bytes([PREFIX[ir >> 8], ir & 0xff] if ir >> 8 else [ir])
+
+    def syntax(self):
+        return ' '.join([self.mnem] + ([', '.join(self.args)] if self.args else []))
+
+
+def load_table():
+    """Returns [[Op]], one list per ird row (gen-ucode.py table line)."""
+    with open(UCODE_FIXED) as f:
+        fixed = {t['name']: t.get('values') for t in yaml.safe_load(f)['types']
+                 if t['type'] == 'enum'}
+    with open(UCODE_GEN) as f:
+        ird = yaml.safe_load(f)['ird']['rows']
+    fields = {
+        'r': (fixed['e_urfs'][:8], 7), 'r1': (fixed['e_urfs'][:8], 7),
+        'r2': (fixed['e_urfs'][:8], 7),
+        'sr': (fixed['e_spr'], 15), 'sr2': (fixed['e_spr'], 7),
+        'rpa': (RPA, 7), 'rpa1': (RPA, 7), 'irf': (IRF, 7), 'bit': (BITS, 7),
+    }
+
+    defs = []
+    by_ir = {}
+    for row in ird:
+        where = f"{os.path.basename(UCODE_GEN)}: ird {row['_at']}"
+        if 'asm' not in row:
+            sys.exit(f'{where}: no syntax; run make')
+        at, cls, syntax = row['at'], row['fn'], row['asm']
+        mnem, _, rest = syntax.partition(' ')
+        tmpl = [a.strip() for a in rest.split(',')] if rest else []
+        nbytes = sum(IMM.get(a, 0) for a in tmpl)
+        if nbytes != row['noper']:
+            sys.exit(f'{where}: "{syntax}" has {nbytes} operand bytes, '
+                     f'microcode reads {row["noper"]}')
+        ir0, ir1 = at if isinstance(at, list) else (at, at)
+        run = any(a in OPCODE_IMM for a in tmpl)   # one Op, field in low bits
+        last = defs[-1][-1] if defs and defs[-1] else None
+        if run and last and (last.mnem, last.tmpl, last.cycles, last.ir1 + 1) \
+           == (mnem.upper(), tmpl, row['cycles'], ir0):
+            last.ir1 = ir1      # JRE: one row per sign
+            continue
+        irs = [ir0] if run else range(ir0, ir1 + 1)
+        ops = []
+        for ir in irs:
+            args = []
+            for a in tmpl:
+                if a in fields:
+                    names, mask = fields[a]
+                    a = names[ir & mask] if (ir & mask) < len(names) else None
+                    if a is None:
+                        sys.exit(f'{where}: no {syntax} for {ir:#05x}')
+                args.append(a)
+            op = Op(ir, ir1 if run else ir, cls, mnem.upper(), tmpl, args,
+                    row['cycles'], row['noper'])
+            if ir in by_ir:
+                by_ir[ir][0].remove(by_ir[ir][1])
+            by_ir[ir] = (ops, op)
+            ops.append(op)
+        defs.append(ops)
+    return [ops for ops in defs if ops]
+
+
+def reg(a):
+    a = a.upper().replace(' ', '')
+    return ALIASES.get(a, a)
+
+
+class Assembler:
+    def __init__(self, defs):
+        self.by_mnem = {}
+        self.reserved = set()
+        for ops in defs:
+            for op in ops:
+                self.by_mnem.setdefault(op.mnem, []).append(op)
+                self.reserved.update(a.upper() for a in op.args
+                                     if a not in IMM and a not in BITS)
+        self.reserved.update(ALIASES)
+        for ops in self.by_mnem.values():
+            ops.sort(key=lambda op: (op.length, op.ir))
+        self.symbols = {}
+
+    def match(self, mnem, args):
+        for op in self.by_mnem.get(mnem, []):
+            if len(op.args) != len(args):
+                continue
+            if all(reg(a) == f if f not in IMM
+                   else a.upper() not in self.reserved
+                   for a, f in zip(args, op.args)):
+                return op
+        if mnem not in self.by_mnem:
+            raise AsmError(f'unknown instruction {mnem}')
+        raise AsmError(f'bad operands for {mnem}: {", ".join(args)}')
+
+    def value(self, expr, pc, final):
+        py = []
+        pos = 0
+        expr = expr.strip()
+        while pos < len(expr):
+            m = RE_TOKEN.match(expr, pos)
+            if not m or m.end() == pos:
+                raise AsmError(f'bad expression {expr!r}')
+            num, name, here, opr = m.groups()
+            if num:
+                n = num.lower()
+                py.append(str(int(n[2:], 16) if n.startswith('0x') else
+                              int(n[1:], 16) if n.startswith('$') else
+                              int(n[:-1], 16) if n.endswith('h') else int(n)))
+            elif name == '.':
+                py.append(str(pc))
+            elif name and name not in self.symbols and RE_HEX_H.fullmatch(name):
+                py.append(str(int(name[:-1], 16)))
+            elif name:
+                if name not in self.symbols and final:
+                    raise AsmError(f'undefined symbol {name}')
+                py.append(str(self.symbols.get(name, 0)))
+            elif here:
+                py.append(str(pc))
+            else:
+                py.append('//' if opr == '/' else opr)
+            pos = m.end()
+        try:
+            return int(eval(' '.join(py), {'__builtins__': {}}))
+        except Exception:
+            raise AsmError(f'bad expression {expr!r}')
+
+    def encode(self, op, args, pc, final):
+        low = 0
+        out = b''
+        for a, f in zip(args, op.args):
+            if f not in IMM:
+                continue
+            v = self.value(a, pc, final)
+            if f == 'jdisp1':
+                v -= pc + op.length
+                if final and not -32 <= v < 32:
+                    raise AsmError(f'JR out of range ({v})')
+                low = v & 0x3f
+            elif f == 'jdisp':
+                v -= pc + op.length
+                if final and not -256 <= v < 256:
+                    raise AsmError(f'JRE out of range ({v})')
+                low = 1 if v < 0 else 0
+                out += bytes([v & 0xff])
+            elif f == 'ta':
+                if final and (v & 1 or not 0x80 <= v < 0x100):
+                    raise AsmError(f'CALT table address {v:#x} not in $80-$FE, even')
+                low = (v >> 1) & 0x3f
+            elif f == 'fa':
+                if final and not 0x800 <= v < 0x1000:
+                    raise AsmError(f'CALF address {v:#x} not in $800-$FFF')
+                low = (v >> 8) & 7
+                out += bytes([v & 0xff])
+            elif f == 'word':
+                if final and not -0x8000 <= v < 0x10000:
+                    raise AsmError(f'{a} out of range')
+                out += bytes([v & 0xff, (v >> 8) & 0xff])
+            else:
+                if final and not -0x80 <= v < 0x100:
+                    raise AsmError(f'{a} out of range')
+                out += bytes([v & 0xff])
+        return op.opcode(low) + out       # JRE: 0x4E, sign in IR[0]
+
+    def assemble(self, lines):
+        """Returns {address: (bytes, source line, Op or None)}."""
+        for final in (False, True):
+            pc = 0
+            out = {}
+            for ln, text in enumerate(lines, 1):
+                try:
+                    pc = self.statement(text, pc, out, final)
+                except AsmError as e:
+                    raise AsmError(f'{ln}: {e}')
+        return out
+
+    def statement(self, text, pc, out, final):
+        text = text.split(';', 1)[0].rstrip()
+        m = RE_LABEL.match(text)
+        if m:
+            if not final and m[1] in self.symbols:
+                raise AsmError(f'{m[1]} redefined')
+            if final and self.symbols[m[1]] != pc:
+                raise AsmError(f'{m[1]} moved')
+            self.symbols[m[1]] = pc
+            text = text[m.end():]
+        words = text.split(None, 1)
+        if not words:
+            return pc
+        mnem = words[0].upper()
+        args = [a.strip() for a in words[1].split(',')] if len(words) > 1 else []
+        src = ' '.join(text.split())
+        if mnem == 'ORG':
+            return self.value(args[0], pc, True)
+        if mnem in ('DB', 'DW'):
+            w = 1 if mnem == 'DB' else 2
+            data = b''.join((self.value(a, pc, final) & (0xffff >> (16 - 8 * w)))
+                            .to_bytes(w, 'little') for a in args)
+            out[pc] = (data, src, None)
+            return pc + len(data)
+        op = self.match(mnem, args)
+        out[pc] = (self.encode(op, args, pc, final), src, op)
+        return pc + op.length
+
+
+def write_hex(f, image):
+    nxt = 0                     # $readmemh starts at 0
+    for pc, (data, src, _) in sorted(image.items()):
+        if pc != nxt:
+            f.write(f'@{pc:04x}\n')
+        for i, b in enumerate(data):
+            f.write(f'{b:02x}' + (f' // {src.lower()}' if i == 0 else '') + '\n')
+        nxt = pc + len(data)
+
+
+def write_bin(f, image):
+    base = min(image)
+    data = bytearray()
+    for pc, (d, _, _) in sorted(image.items()):
+        data.extend(b'\xff' * (pc - base - len(data)))
+        data[pc - base:pc - base + len(d)] = d
+    f.write(data)
+
+
+######################################################################
+# Random programs
+
+RAM = (0xff80, 0xffef)
+STACK_DEPTH = 8
+NO_RANDOM = {'JR', 'JRE', 'JMP', 'JB', 'CALL', 'CALB', 'CALF', 'CALT',
+             'SOFTI', 'RET', 'RETS', 'RETI', 'BLOCK', 'EI', 'STM', 'LSPD'}
+RE_TEST = re.compile(r'^(GT|LT|ON|OFF|NE|EQ)')
+
+
+def random_ok(op, spr):
+    if op.mnem in NO_RANDOM:
+        return False
+    if any(a in ('V', 'SP') for a in op.args):
+        return False
+    if any(a in spr for a in op.args) and not RE_TEST.match(op.mnem):
+        return False
+    return True
+
+
+def pointer(op):
+    """Register pair an instruction accesses memory through, if any."""
+    if op.mnem in ('RLD', 'RRD'):
+        return 'H'
+    for t, a in zip(op.tmpl, op.args):
+        if t in ('rpa', 'rpa1'):
+            return a[0]
+    return None
+
+
+def random_program(defs, n, rng, org):
+    with open(UCODE_FIXED) as f:
+        spr = next(t['values'] for t in yaml.safe_load(f)['types']
+                   if t['name'] == 'e_spr')
+    pool = [[op for op in ops if random_ok(op, spr)] for ops in defs]
+    pool = [ops for ops in pool if ops]
+
+    def ram(size=1):
+        return rng.randint(RAM[0], RAM[1] + 1 - size)
+
+    src = [f'\torg 0x{org:04x}', 'start:', '\tdi', '\tlxi sp, 0x0000',
+           '\tmvi v, 0xff', '\tex', '\tmvi v, 0xff', '\tex']
+    src += [f'\tmvi {r}, 0x{rng.randrange(256):02x}' for r in 'abcdehl']
+    src.append('\tclc')
+    depth = 0
+    for _ in range(n):
+        op = rng.choice(rng.choice(pool))
+        if op.mnem == 'PUSH' and depth == STACK_DEPTH or \
+           op.mnem == 'POP' and depth == 0:
+            op = next(o for ops in pool for o in ops if o.mnem == 'NOP')
+        depth += {'PUSH': 1, 'POP': -1}.get(op.mnem, 0)
+
+        # A NOP before anything that mustn't be skipped: it takes the
+        # skip, or clears L0 (so LXI H isn't skipped either).
+        rp = pointer(op)
+        if rp or op.mnem in ('PUSH', 'POP'):
+            src.append('\tnop')
+        if rp:
+            src.append(f'\tlxi {rp.lower()}, 0x{ram(2):04x}')
+
+        args = []
+        for a in op.args:
+            if a == 'wa':
+                a = f'0x{ram() & 0xff:02x}'
+            elif a == 'word':
+                a = f'0x{rng.randrange(0x10000) if op.mnem == "LXI" else ram(2):04x}'
+            elif a == 'byte':
+                a = f'0x{rng.randrange(256):02x}'
+            args.append(a.lower())
+        src.append(f'\t{op.mnem.lower()} {", ".join(args)}'.rstrip())
+    src += ['\tnop', 'done:', '\tjr $', '\tdb ' + ', '.join(['0'] * 16)]
+    src += ['\tdb ' + ', '.join(['0'] * 16)] * 15
+    return src
+
+
+def predicted_cycles(image):
+    """Cycles from the start to the first JR $, straight through."""
+    total = 0
+    for pc, (data, _, op) in sorted(image.items()):
+        if op is None:
+            continue
+        if op.mnem == 'JR' and data == op.opcode(0x3f):
+            return total, pc
+        total += op.cycles
+    return total, None
+
+
+def print_table(defs):
+    for op in sorted((op for ops in defs for op in ops), key=lambda op: op.ir):
+        hx = op.opcode().hex(' ') + ('+' if set(op.args) & set(OPCODE_IMM) else '')
+        print(f'{hx:6} {op.length} {op.cycles:3}  {op.syntax()}')
+
+
+def main():
+    ap = argparse.ArgumentParser(description='uPD7801 assembler.')
+    ap.add_argument('input', nargs='?', help='source (not with -r)')
+    ap.add_argument('output', nargs='?',
+                    help='image: .bin for raw bytes, else $readmemh hex')
+    ap.add_argument('-l', '--list', action='store_true', help='print the opcode table')
+    ap.add_argument('-r', '--random', type=int, metavar='N',
+                    help='generate a random program of N instructions')
+    ap.add_argument('-s', '--seed', type=int, default=0, help='random seed (default: 0)')
+    ap.add_argument('-S', '--source', help='with -r, also write the source')
+    ap.add_argument('--org', type=lambda s: int(s, 0), default=0,
+                    help='with -r, start address (default: 0)')
+    args = ap.parse_args()
+
+    defs = load_table()
+    if args.list:
+        print_table(defs)
+        return
+
+    if args.random is not None:
+        if args.input and args.output:
+            ap.error('-r takes only an output file')
+        out = args.output or args.input
+        lines = random_program(defs, args.random, random.Random(args.seed), args.org)
+        name = f'random (seed {args.seed})'
+    else:
+        if not args.input:
+            ap.error('no input')
+        out = args.output or args.input.rsplit('.', 1)[0] + '.hex'
+        with open(args.input) as f:
+            lines = f.read().splitlines()
+        name = args.input
+
+    try:
+        image = Assembler(defs).assemble(lines)
+    except AsmError as e:
+        sys.exit(f'{name}:{e}')
+    if not image:
+        sys.exit(f'{name}: no code')
+
+    cycles, end = predicted_cycles(image)
+    size = sum(len(d) for d, _, _ in image.values())
+    print(f'{out or name}: {size} bytes' +
+          (f', {cycles} cycles to JR $ at 0x{end:04x}' if end is not None else ''))
+    if args.source:
+        with open(args.source, 'w') as f:
+            f.write(f'; {name}: {cycles} cycles to done\n')
+            f.write('\n'.join(lines) + '\n')
+    if out:
+        if out.endswith('.bin'):
+            with open(out, 'wb') as f:
+                write_bin(f, image)
+        else:
+            with open(out, 'w') as f:
+                write_hex(f, image)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,10 +9,19 @@
 
 import yaml
 
+import prof
+
+pf = prof.from_argv('gen-ucode')
+
 
 ird_rows = []
 uc_rows = []
 nc_rows = []
+uc_seqs = {}                    # committed sequence rows: uaddr
+uc_aliases = {}                 # name: (uaddr it shares, rows saved)
+
+# upd7800.sv compares uptr with these; they must keep their own rows.
+uc_no_alias = {'STM'}
 
 
 def uc_row(row):
@@ -41,12 +50,14 @@ class ucode_seq():
         self.steps.append(nc)
 
     def commit(self, nsteps):
+        """Append the sequence's urom rows, and return its uaddr. If an
+        identical sequence (steps, m1 and bm) is already committed,
+        return that one's uaddr instead (see uc_no_alias)."""
         steps_len = len(self.steps)
+        ucrows = []
         for i in range(steps_len):
             ucrow = {}
             nc = self.steps[i]
-            if i == 0:
-                ucrow['uaddr'] = self.name
             nsteps = nsteps - 1
             if nsteps == 0:
                 ucrow['m1'] = 1
@@ -59,7 +70,19 @@ class ucode_seq():
             if 'pswsk' in nc:
                 assert(ucrow['bm'] == 'END')
 
+            ucrows.append(ucrow)
+
+        key = tuple(tuple(r.items()) for r in ucrows)
+        if self.name not in uc_no_alias:
+            if key in uc_seqs:
+                if self.name != uc_seqs[key]:
+                    uc_aliases[self.name] = (uc_seqs[key], steps_len)
+                return uc_seqs[key]
+            uc_seqs[key] = self.name
+        ucrows[0] = {'uaddr': self.name} | ucrows[0]
+        for ucrow in ucrows:
             uc_row(ucrow)
+        return self.name
 
 
 def ird_row(ir, nsteps, noper, ucs, no_skip=False):
@@ -70,12 +93,13 @@ def ird_row(ir, nsteps, noper, ucs, no_skip=False):
         ir0 = ir
         ats = f'0x{ir:02x}'
 
-    nsteps -= 8 if ir0 >= 0x100 else 4
+    # cycles and noper (and fn and asm; see op) aren't s_ird columns;
+    # asm.py reads them.
+    irdrow = {'_at': ats, 'at': ir, 'cycles': nsteps, 'noper': noper}
 
-    ucname = ucs.name
-    ucs.commit(nsteps)
+    nsteps -= 8 if ir0 >= 0x100 else 4
 
-    irdrow = {'_at': ats, 'at': ir, 'uaddr': ucname}
+    irdrow['uaddr'] = ucs.commit(nsteps)
     if nsteps == 0:
         irdrow['m1_overlap'] = 1
     if no_skip:
@@ -85,9 +109,24 @@ def ird_row(ir, nsteps, noper, ucs, no_skip=False):
     ird_rows.append(irdrow)
 
 
+def op(fn, name=None):
+    """Make fn a table function. Its asm= argument, the instruction's
+    syntax (see asm.py), goes in the ird row(s) it adds, with the
+    function's name."""
+    def table_fn(*args, asm=None, **kwargs):
+        n = len(ird_rows)
+        fn(*args, **kwargs)
+        if asm is not None:
+            for irdrow in ird_rows[n:]:
+                irdrow['fn'] = name or fn.__name__
+                irdrow['asm'] = asm
+    return table_fn
+
+
 ######################################################################
 # Instruction base
 
+@op
 def ins(ir, nsteps, ucname, noper, ncs):
     assert(isinstance(ncs, list))
     ucs = ucode_seq(ucname)
@@ -150,6 +189,7 @@ nc_row(nc_store)
 ######################################################################
 # Move / load / store data
 
+@op
 def move(ir, nsteps, dst, src, str_effect=''):
     imm = src == 'IMM'
     noper = 1 if imm else 0
@@ -165,6 +205,7 @@ def move(ir, nsteps, dst, src, str_effect=''):
 
     ird_row(ir, nsteps, noper, ucs)
 
+@op
 def load_wa(ir, nsteps, dst):
     ucs = ucode_seq(f'LD_{dst}_WA')
     ucs.step(nc_pc_out_inc)
@@ -184,6 +225,7 @@ def rpa_to_reglh(rpa):
     }[rpa]
     return regl, regh
 
+@op
 def load_imm16(ir, nsteps, reg, str_effect=''):
     regl, regh = rpa_to_reglh(reg)
 
@@ -196,6 +238,7 @@ def load_imm16(ir, nsteps, reg, str_effect=''):
     ucs.step({'idbs': 'DB', 'rfts': regh, 'lts': 'RF'})
     ird_row(ir, nsteps, 2, ucs)
 
+@op
 def loadx(ir, nsteps):
     ucs = ucode_seq(f'LDAX')
 
@@ -205,6 +248,7 @@ def loadx(ir, nsteps):
 
     ird_row(ir, nsteps, 0, ucs)
 
+@op
 def load_abs(ir, nsteps):
     ucs = ucode_seq(f'LD_IR210_ABS')
     ucs.step(nc_pc_out_inc)     # Fetch word lo
@@ -220,6 +264,7 @@ def load_abs(ir, nsteps):
     ucs.step(idb_rd('DB') | idb_wr('RF_IR210'))
     ird_row(ir, nsteps, 2, ucs)
 
+@op
 def load_ind(ir, nsteps, reg):
     regl, regh = rpa_to_reglh(reg)
 
@@ -244,6 +289,7 @@ def load_ind(ir, nsteps, reg):
     ucs.step(idb_rd('DB') | idb_wr(regh))
     ird_row(ir, nsteps, 2, ucs)
 
+@op
 def storex(ir, nsteps, src):
     imm = src == 'IMM'
     if imm:
@@ -264,6 +310,7 @@ def storex(ir, nsteps, src):
 
     ird_row(ir, nsteps, noper, ucs)
 
+@op
 def storew(ir, nsteps, src):
     imm = src == 'IMM'
     noper = 2 if imm else 1
@@ -290,6 +337,7 @@ def storew(ir, nsteps, src):
 
     ird_row(ir, nsteps, noper, ucs)
 
+@op
 def store_abs(ir, nsteps):
     ucs = ucode_seq(f'ST_IR210_ABS')
     # r2 -> idb -> dor
@@ -305,6 +353,7 @@ def store_abs(ir, nsteps):
     ucs.step(nc_idle)
     ird_row(ir, nsteps, 2, ucs)
 
+@op
 def store_ind(ir, nsteps, reg):
     regl, regh = rpa_to_reglh(reg)
 
@@ -330,6 +379,7 @@ def store_ind(ir, nsteps, reg):
     ird_row(ir, nsteps, 2, ucs)
 
 # TABLE: C <- (PC+2+A), B <- (PC+2+A+1)
+@op
 def table(ir, nsteps):
     ucs = ucode_seq('TABLE')
     # {CO, W} <- PC + A + 1
@@ -356,6 +406,7 @@ def table(ir, nsteps):
     ird_row(ir, nsteps, 0, ucs)
 
 # BLOCK: (DE)+ <- (HL)+, C <- C - 1, repeat until borrow
+@op
 def block(ir, nsteps):
     ucs = ucode_seq('BLOCK')
     # HL -> ab -> aor
@@ -378,12 +429,14 @@ def block(ir, nsteps):
     ird_row(ir, nsteps, 0, ucs, no_skip=True)
 
 # EX: Exchange V, A and V', A'
+@op
 def ex(ir, nsteps):
     ucs = ucode_seq('EX')
     ucs.step({'lts': 'SEC', 'rfts': 'V'})
     ird_row(ir, nsteps, 0, ucs)
 
 # EXX: Exchange register sets (B,C,D,E,H,L)
+@op
 def exx(ir, nsteps):
     ucs = ucode_seq('EXX')
     ucs.step({'lts': 'SEC', 'rfts': 'B'})
@@ -497,9 +550,10 @@ def math_logic_test(ir, nsteps, op, dst, src, skip=''):
             ucs.step({'idbs': 'CO'} | idb_wr(dst) | ncpsw | ncsk)
     ird_row(ir, nsteps, noper, ucs)
 
-math = math_logic_test
-logic = math_logic_test
+math = op(math_logic_test, 'math')
+logic = op(math_logic_test, 'logic')
 
+@op
 def test(ir, nsteps, op, dst, src):
     mtl_op, skip = {
         'EQ':  ('CMP', 'Z'),
@@ -511,24 +565,31 @@ def test(ir, nsteps, op, dst, src):
     }[op]
     math_logic_test(ir, nsteps, mtl_op, dst, src, skip)
 
+@op
 def math_imm(ir, nsteps, op, reg, skip=''):
     math(ir, nsteps, op, reg, 'IMM', skip)
 
+@op
 def mathx(ir, nsteps, op, skip=''):
     math(ir, nsteps, op, 'A', 'IND', skip)
 
+@op
 def logic_imm(ir, nsteps, op, reg):
     logic(ir, nsteps, op, reg, 'IMM')
 
+@op
 def logicx(ir, nsteps, op):
     logic(ir, nsteps, op, 'A', 'IND')
 
+@op
 def test_imm(ir, nsteps, op, reg):
     test(ir, nsteps, op, reg, 'IMM')
 
+@op
 def testx(ir, nsteps, op):
     test(ir, nsteps, op, 'A', 'IND')
 
+@op
 def incdec(ir, nsteps, op, reg):
     wa = reg == 'WA'
     noper = 0 + wa
@@ -560,6 +621,7 @@ def incdec(ir, nsteps, op, reg):
 
     ird_row(ir, nsteps, noper, ucs)
 
+@op
 def incdecx(ir, nsteps, op, rp):
     abid = 'ab_inc' if op == 'INC' else 'ab_dec'
 
@@ -570,6 +632,7 @@ def incdecx(ir, nsteps, op, rp):
     ird_row(ir, nsteps, 0, ucs)
 
 # DAA: Decimal Adjust A
+@op
 def daa(ir, nsteps):
     ucs = ucode_seq('DAA')
     ucs.step(idb_rd('A') | idb_wr('AI') | {'daa': 1, 'aluop': 'SUM'})
@@ -577,6 +640,7 @@ def daa(ir, nsteps):
     ird_row(ir, nsteps, 0, ucs)
 
 # RLD: A[3:0] <- (HL)[7:4] <- (HL)[3:0] <- A[3:0]
+@op
 def rld(ir, nsteps, ucname):
     ucs = ucode_seq(ucname)
     ucs.step(aor_wr('HL'))
@@ -592,6 +656,7 @@ def rld(ir, nsteps, ucname):
     ird_row(ir, nsteps, 0, ucs)
 
 # RRD: A[3:0] -> (HL)[7:4] -> (HL)[3:0] -> A[3:0]
+@op
 def rrd(ir, nsteps, ucname):
     ucs = ucode_seq(ucname)
     ucs.step(aor_wr('HL'))
@@ -609,6 +674,7 @@ def rrd(ir, nsteps, ucname):
 ######################################################################
 # Jump / call / return
 
+@op
 def jr(ir, nsteps):
     ucs = ucode_seq('JR')
     # PCL -> idb -> AI
@@ -630,6 +696,7 @@ def jr(ir, nsteps):
     ucs.step(nc_idle)
     ird_row(ir, nsteps, 0, ucs)
 
+@op
 def jre(ir, nsteps, sign):
     ucs = ucode_seq(f'JRE_{sign}')
     ucs.step(nc_pc_out_inc)
@@ -649,6 +716,7 @@ def jre(ir, nsteps, sign):
     ucs.step(nc_idle)
     ird_row(ir, nsteps, 1, ucs)
 
+@op
 def jmp(ir, nsteps):
     ucs = ucode_seq('JMP')
     ucs.step(nc_pc_out_inc)                       # Fetch word lo
@@ -661,6 +729,7 @@ def jmp(ir, nsteps):
     ucs.step({'idbs': 'DB'} | idb_wr('RF_PCH'))
     ird_row(ir, nsteps, 2, ucs)
 
+@op
 def jb(ir, nsteps):
     ucs = ucode_seq('JB')
     ucs.step(aor_wr('BC') | {'abits': 'PC', 'ab_inc': 1, 'ab_dec': 1})
@@ -668,6 +737,7 @@ def jb(ir, nsteps):
     #ucs.step(idb_rd('C') | idb_wr('PCL'))
     ird_row(ir, nsteps, 0, ucs)
 
+@op
 def call(ir, nsteps):
     ucs = ucode_seq('CALL')
     # Fetch new PCL to W, PC <- PC+1
@@ -688,6 +758,7 @@ def call(ir, nsteps):
     ucs.step(idb_rd('CO') | idb_wr('RF_PCH'))
     ird_row(ir, nsteps, 2, ucs)
 
+@op
 def calb(ir, nsteps):
     ucs = ucode_seq('CALB')
     # SP <- SP-1
@@ -704,6 +775,7 @@ def calb(ir, nsteps):
     ucs.step(nc_idle)
     ird_row(ir, nsteps, 0, ucs)
 
+@op
 def calf(ir, nsteps):
     ucs = ucode_seq('CALF')
     # SP <- SP-1, PC <- PC+1 (next ins.)
@@ -725,6 +797,7 @@ def calf(ir, nsteps):
 
     ird_row(ir, nsteps, 1, ucs)
 
+@op
 def calt(ir, nsteps):
     ucs = ucode_seq('CALT')
     # SP <- SP-1
@@ -753,6 +826,7 @@ def calt(ir, nsteps):
     ird_row(ir, nsteps, 0, ucs)
 
 # SOFTI/INT (Software/Hardware Interrupt) [19 states]
+@op
 def softi(ir, nsteps):
     ucs = ucode_seq('INT')
     # SP <- SP-1
@@ -779,6 +853,7 @@ def softi(ir, nsteps):
     ird_row(ir, nsteps, 0, ucs, no_skip=True)
 
 # RET / RETI (Return from Subroutine / Interrupt)
+@op
 def ret(ir, nsteps, ucname):
     ncsk = {'pswsk': 1} if ucname == 'RETS' else {}
     ucs = ucode_seq(ucname)
@@ -801,6 +876,7 @@ def ret(ir, nsteps, ucname):
 # Stack
 
 # PUSH (Push Register Pair on Stack)
+@op
 def push16(ir, nsteps, rp):
     ucs = ucode_seq(f'PUSH_{rp}')
     # SP <- SP-1
@@ -818,6 +894,7 @@ def push16(ir, nsteps, rp):
     ird_row(ir, nsteps, 0, ucs)
 
 # POP (Pop Register Pair from Stack)
+@op
 def pop16(ir, nsteps, rp):
     ucs = ucode_seq(f'POP_{rp}')
     # rph <- (SP), SP <- SP+1
@@ -834,11 +911,13 @@ def pop16(ir, nsteps, rp):
 ######################################################################
 # Skip
 
+@op
 def skip(ir, nsteps, sk):
     ucs = ucode_seq(f'SKIP_{sk}')
     ucs.step({'pswsk': sk})
     ird_row(ir, nsteps, 0, ucs)
 
+@op
 def bit(ir, nsteps):
     ucs = ucode_seq(f'BIT')
     # Operand is wa
@@ -856,281 +935,292 @@ def bit(ir, nsteps):
 ######################################################################
 # Pre-populate urom rows
 
+pf.begin('tables')
+
 uc_row({'uaddr': 'IDLE', 'naddr': nc_row(nc_idle), 'bm': 'END'})
 
 ######################################################################
 # no prefix opcode
 
-move([0x0a, 0x0f], 4, 'A', 'RF_IR210')            # MOV A, r1
-move([0x1a, 0x1f], 4, 'RF_IR210', 'A')            # MOV r1, A
-move([0x68, 0x6e], 7, 'RF_IR210', 'IMM')          # MVI r, byte
-move(0x69, 7, 'RF_IR210', 'IMM', str_effect='L1') # MVI A, byte
-move(0x6f, 7, 'RF_IR210', 'IMM', str_effect='L0') # MVI L, byte
-
-load_wa(0x28, 10, 'A')                            # LDAW wa
-
-load_imm16(0x04, 10, 'SP')                        # LXI SP, bbaa
-load_imm16(0x14, 10, 'BC')                        # LXI BC, bbaa
-load_imm16(0x24, 10, 'DE')                        # LXI DE, bbaa
-load_imm16(0x34, 10, 'HL', str_effect='L0')       # LXI HL, bbaa
-
-loadx([0x29, 0x2f], 7)                            # LDAX rpa
-
-storex([0x39, 0x3f], 7, 'A')                      # STAX rpa
-storex([0x49, 0x4b], 10, 'IMM')                   # MVIX rpa1, byte
-
-storew(0x38, 10, 'A')                             # STAW wa
-storew(0x71, 13, 'IMM')                           # MVIW wa, byte
-
-table(0x21, 19)                                   # TABLE
-block(0x31, 13)                                   # BLOCK
-
-ex(0x10, 4)                                       # EX
-exx(0x11, 4)                                      # EXX
-
-logic_imm(0x05, 16, 'AND', 'WA')                  # ANIW wa, byte
-logic_imm(0x15, 16, 'OR', 'WA')                   # ORIW wa, byte
-
-logic_imm(0x07, 7, 'AND', 'A')                    # ANI A, byte
-logic_imm(0x16, 7, 'XOR', 'A')                    # XRI A, byte
-logic_imm(0x17, 7, 'OR', 'A')                     # ORI A, byte
-
-test_imm(0x25, 13, 'GT', 'WA')                    # GTIW wa, byte
-test_imm(0x35, 13, 'LT', 'WA')                    # LTIW wa, byte
-test_imm(0x45, 13, 'ON', 'WA')                    # ONIW wa, byte
-test_imm(0x55, 13, 'OFF', 'WA')                   # OFFIW wa, byte
-test_imm(0x65, 13, 'NEQ', 'WA')                   # NEIW wa, byte
-test_imm(0x75, 13, 'EQ', 'WA')                    # EQIW wa, byte
-
-test_imm(0x27, 7, 'GT', 'A')                      # GTI A, byte
-test_imm(0x37, 7, 'LT', 'A')                      # LTI A, byte
-test_imm(0x47, 7, 'ON', 'A')                      # ONI A, byte
-test_imm(0x57, 7, 'OFF', 'A')                     # OFFI A, byte
-test_imm(0x67, 7, 'NEQ', 'A')                     # NEI A, byte
-test_imm(0x77, 7, 'EQ', 'A')                      # EQI A, byte
-
-math_imm(0x26, 7, 'ADD', 'A', 'NC')               # ADINC A, byte
-math_imm(0x36, 7, 'SUB', 'A', 'NB')               # SUINB A, byte
-math_imm(0x46, 7, 'ADD', 'A')                     # ADI A, byte
-math_imm(0x56, 7, 'ADC', 'A')                     # ACI A, byte
-math_imm(0x66, 7, 'SUB', 'A')                     # SUI A, byte
-math_imm(0x76, 7, 'SBB', 'A')                     # SBI A, byte
-
-incdec(0x20, 13, 'INC', 'WA')                     # INRW wa
-incdec(0x30, 13, 'DEC', 'WA')                     # DCRW wa
-
-incdec([0x41, 0x43], 4, 'INC', 'RF_IR210')        # INR r2
-incdec([0x51, 0x53], 4, 'DEC', 'RF_IR210')        # DCR r2
-
-incdecx(0x02, 7, 'INC', 'SP')                     # INX SP
-incdecx(0x12, 7, 'INC', 'BC')                     # INX BC
-incdecx(0x22, 7, 'INC', 'DE')                     # INX D
-incdecx(0x32, 7, 'INC', 'HL')                     # INX H
-incdecx(0x03, 7, 'DEC', 'SP')                     # DCX SP
-incdecx(0x13, 7, 'DEC', 'BC')                     # DCX BC
-incdecx(0x23, 7, 'DEC', 'DE')                     # DCX D
-incdecx(0x33, 7, 'DEC', 'HL')                     # DCX H
-
-daa(0x61, 4)                                      # DAA
-
-jr([0xc0, 0xff], 13)                              # JR
-jre(0x4e, 13, '+')                                # JRE (+jdisp)
-jre(0x4f, 13, '-')                                # JRE (-jdisp)
-jmp(0x54, 10)                                     # JMP word
-jb(0x73, 4)                                       # JB
-call(0x44, 16)                                    # CALL word
-calb(0x63, 13)                                    # CALB
-calf([0x78, 0x7f], 16)                            # CALF word
-calt([0x80, 0xbf], 19)                            # CALT
-softi(0x72, 19)                                   # SOFTI / INT
+move([0x0a, 0x0f], 4, 'A', 'RF_IR210',            asm='MOV A, r1')
+move([0x1a, 0x1f], 4, 'RF_IR210', 'A',            asm='MOV r1, A')
+move([0x68, 0x6e], 7, 'RF_IR210', 'IMM',          asm='MVI r, byte')
+move(0x69, 7, 'RF_IR210', 'IMM', str_effect='L1', asm='MVI A, byte')
+move(0x6f, 7, 'RF_IR210', 'IMM', str_effect='L0', asm='MVI L, byte')
+
+load_wa(0x28, 10, 'A',                            asm='LDAW wa')
+
+load_imm16(0x04, 10, 'SP',                        asm='LXI SP, word')
+load_imm16(0x14, 10, 'BC',                        asm='LXI B, word')
+load_imm16(0x24, 10, 'DE',                        asm='LXI D, word')
+load_imm16(0x34, 10, 'HL', str_effect='L0',       asm='LXI H, word')
+
+loadx([0x29, 0x2f], 7,                            asm='LDAX rpa')
+
+storex([0x39, 0x3f], 7, 'A',                      asm='STAX rpa')
+storex([0x49, 0x4b], 10, 'IMM',                   asm='MVIX rpa1, byte')
+
+storew(0x38, 10, 'A',                             asm='STAW wa')
+storew(0x71, 13, 'IMM',                           asm='MVIW wa, byte')
+
+table(0x21, 19,                                   asm='TABLE')
+block(0x31, 13,                                   asm='BLOCK')
+
+ex(0x10, 4,                                       asm='EX')
+exx(0x11, 4,                                      asm='EXX')
+
+logic_imm(0x05, 16, 'AND', 'WA',                  asm='ANIW wa, byte')
+logic_imm(0x15, 16, 'OR', 'WA',                   asm='ORIW wa, byte')
+
+logic_imm(0x07, 7, 'AND', 'A',                    asm='ANI A, byte')
+logic_imm(0x16, 7, 'XOR', 'A',                    asm='XRI A, byte')
+logic_imm(0x17, 7, 'OR', 'A',                     asm='ORI A, byte')
+
+test_imm(0x25, 13, 'GT', 'WA',                    asm='GTIW wa, byte')
+test_imm(0x35, 13, 'LT', 'WA',                    asm='LTIW wa, byte')
+test_imm(0x45, 13, 'ON', 'WA',                    asm='ONIW wa, byte')
+test_imm(0x55, 13, 'OFF', 'WA',                   asm='OFFIW wa, byte')
+test_imm(0x65, 13, 'NEQ', 'WA',                   asm='NEIW wa, byte')
+test_imm(0x75, 13, 'EQ', 'WA',                    asm='EQIW wa, byte')
+
+test_imm(0x27, 7, 'GT', 'A',                      asm='GTI A, byte')
+test_imm(0x37, 7, 'LT', 'A',                      asm='LTI A, byte')
+test_imm(0x47, 7, 'ON', 'A',                      asm='ONI A, byte')
+test_imm(0x57, 7, 'OFF', 'A',                     asm='OFFI A, byte')
+test_imm(0x67, 7, 'NEQ', 'A',                     asm='NEI A, byte')
+test_imm(0x77, 7, 'EQ', 'A',                      asm='EQI A, byte')
+
+math_imm(0x26, 7, 'ADD', 'A', 'NC',               asm='ADINC A, byte')
+math_imm(0x36, 7, 'SUB', 'A', 'NB',               asm='SUINB A, byte')
+math_imm(0x46, 7, 'ADD', 'A',                     asm='ADI A, byte')
+math_imm(0x56, 7, 'ADC', 'A',                     asm='ACI A, byte')
+math_imm(0x66, 7, 'SUB', 'A',                     asm='SUI A, byte')
+math_imm(0x76, 7, 'SBB', 'A',                     asm='SBI A, byte')
+
+incdec(0x20, 13, 'INC', 'WA',                     asm='INRW wa')
+incdec(0x30, 13, 'DEC', 'WA',                     asm='DCRW wa')
+
+incdec([0x41, 0x43], 4, 'INC', 'RF_IR210',        asm='INR r2')
+incdec([0x51, 0x53], 4, 'DEC', 'RF_IR210',        asm='DCR r2')
+
+incdecx(0x02, 7, 'INC', 'SP',                     asm='INX SP')
+incdecx(0x12, 7, 'INC', 'BC',                     asm='INX B')
+incdecx(0x22, 7, 'INC', 'DE',                     asm='INX D')
+incdecx(0x32, 7, 'INC', 'HL',                     asm='INX H')
+incdecx(0x03, 7, 'DEC', 'SP',                     asm='DCX SP')
+incdecx(0x13, 7, 'DEC', 'BC',                     asm='DCX B')
+incdecx(0x23, 7, 'DEC', 'DE',                     asm='DCX D')
+incdecx(0x33, 7, 'DEC', 'HL',                     asm='DCX H')
+
+daa(0x61, 4,                                      asm='DAA')
+
+jr([0xc0, 0xff], 13,                              asm='JR jdisp1')
+jre(0x4e, 13, '+',                                asm='JRE jdisp')
+jre(0x4f, 13, '-',                                asm='JRE jdisp')
+jmp(0x54, 10,                                     asm='JMP word')
+jb(0x73, 4,                                       asm='JB')
+call(0x44, 16,                                    asm='CALL word')
+calb(0x63, 13,                                    asm='CALB')
+calf([0x78, 0x7f], 16,                            asm='CALF fa')
+calt([0x80, 0xbf], 19,                            asm='CALT ta')
+softi(0x72, 19,                                   asm='SOFTI')
 # Note: Data sheet says 15 cycles, but I think that's a typo.
-ret(0x08, 10, 'RET')                              # RET
-ret(0x18, 10, 'RETS')                             # RETS
-ret(0x62, 13, 'RETI')                             # RETI
+ret(0x08, 10, 'RET',                              asm='RET')
+ret(0x18, 10, 'RETS',                             asm='RETS')
+ret(0x62, 13, 'RETI',                             asm='RETI')
 
-bit([0x58, 0x5f], 10)                             # BIT (bit), wa
+bit([0x58, 0x5f], 10,                             asm='BIT bit, wa')
 
-ins(0x00, 4, 'NOP', 0, [{}])                      # NOP
-ins(0x19, 4, 'STM', 0, [{}])                      # STM
+ins(0x00, 4, 'NOP', 0, [{}],                      asm='NOP')
+ins(0x19, 4, 'STM', 0, [{}],                      asm='STM')
 
 ######################################################################
 # 0x1xx: prefix 0x48
 
-logic(0x130, 8, 'RLL', 'A', '')                   # RLL A
-logic(0x131, 8, 'RLR', 'A', '')                   # RLR A
-logic(0x132, 8, 'RLL', 'C', '')                   # RLL C
-logic(0x133, 8, 'RLR', 'C', '')                   # RLR C
-logic(0x134, 8, 'SLL', 'A', '')                   # SLL A
-logic(0x135, 8, 'SLR', 'A', '')                   # SLR A
-logic(0x136, 8, 'SLL', 'C', '')                   # SLL C
-logic(0x137, 8, 'SLR', 'C', '')                   # SLR C
-
-push16(0x10e, 17, 'VA')                           # PUSH V
-pop16(0x10f, 14, 'VA')                            # POP V
-push16(0x11e, 17, 'BC')                           # PUSH B
-pop16(0x11f, 14, 'BC')                            # POP B
-push16(0x12e, 17, 'DE')                           # PUSH D
-pop16(0x12f, 14, 'DE')                            # POP D
-push16(0x13e, 17, 'HL')                           # PUSH H
-pop16(0x13f, 14, 'HL')                            # POP H
-
-skip([0x100, 0x104], 8, 'I')                      # SKIT irf
-skip(0x10a, 8, 'PSW_C')                           # SKCY
-skip(0x10c, 8, 'PSW_Z')                           # SKZ
-skip([0x110, 0x114], 8, 'NI')                     # SKNIT irf
-skip(0x11a, 8, 'PSW_NC')                          # SKNCY
-skip(0x11c, 8, 'PSW_NZ')                          # SKNZ
-
-ins(0x120, 8, 'EI', 0, [{'idx': 1, 'lts': 'IE'}]) # EI
-ins(0x124, 8, 'DI', 0, [{'idx': 0, 'lts': 'IE'}]) # DI
-ins(0x12A, 8, 'CLC', 0, [{'idx': 0, 'lts': 'PSW_CY'}]) # CLC
-ins(0x12B, 8, 'STC', 0, [{'idx': 1, 'lts': 'PSW_CY'}]) # STC
-
-rld(0x138, 17, 'RLD')                             # RLD
-rrd(0x139, 17, 'RRD')                             # RRD
+logic(0x130, 8, 'RLL', 'A', '',                   asm='RLL A')
+logic(0x131, 8, 'RLR', 'A', '',                   asm='RLR A')
+logic(0x132, 8, 'RLL', 'C', '',                   asm='RLL C')
+logic(0x133, 8, 'RLR', 'C', '',                   asm='RLR C')
+logic(0x134, 8, 'SLL', 'A', '',                   asm='SLL A')
+logic(0x135, 8, 'SLR', 'A', '',                   asm='SLR A')
+logic(0x136, 8, 'SLL', 'C', '',                   asm='SLL C')
+logic(0x137, 8, 'SLR', 'C', '',                   asm='SLR C')
+
+push16(0x10e, 17, 'VA',                           asm='PUSH V')
+pop16(0x10f, 14, 'VA',                            asm='POP V')
+push16(0x11e, 17, 'BC',                           asm='PUSH B')
+pop16(0x11f, 14, 'BC',                            asm='POP B')
+push16(0x12e, 17, 'DE',                           asm='PUSH D')
+pop16(0x12f, 14, 'DE',                            asm='POP D')
+push16(0x13e, 17, 'HL',                           asm='PUSH H')
+pop16(0x13f, 14, 'HL',                            asm='POP H')
+
+skip([0x100, 0x104], 8, 'I',                      asm='SKIT irf')
+skip(0x10a, 8, 'PSW_C',                           asm='SKCY')
+skip(0x10c, 8, 'PSW_Z',                           asm='SKZ')
+skip([0x110, 0x114], 8, 'NI',                     asm='SKNIT irf')
+skip(0x11a, 8, 'PSW_NC',                          asm='SKNCY')
+skip(0x11c, 8, 'PSW_NZ',                          asm='SKNZ')
+
+ins(0x120, 8, 'EI', 0, [{'idx': 1, 'lts': 'IE'}], asm='EI')
+ins(0x124, 8, 'DI', 0, [{'idx': 0, 'lts': 'IE'}], asm='DI')
+ins(0x12A, 8, 'CLC', 0, [{'idx': 0, 'lts': 'PSW_CY'}], asm='CLC')
+ins(0x12B, 8, 'STC', 0, [{'idx': 1, 'lts': 'PSW_CY'}], asm='STC')
+
+rld(0x138, 17, 'RLD',                             asm='RLD')
+rrd(0x139, 17, 'RRD',                             asm='RRD')
 
 ######################################################################
 # 0x2xx: prefix 0x4C
 
-move([0x2c0, 0x2c9], 8, 'A', 'SPR_IR3')           # MOV A, sr
+move([0x2c0, 0x2c9], 8, 'A', 'SPR_IR3',           asm='MOV A, sr')
 
 ######################################################################
 # 0x3xx: prefix 0x4D
 
-move([0x3c0, 0x3c9], 8, 'SPR_IR3', 'A')           # MOV sr, A
+move([0x3c0, 0x3c9], 8, 'SPR_IR3', 'A',           asm='MOV sr, A')
 
 ######################################################################
 # 0x4xx: prefix 0x60
 
-math([0x420, 0x427], 8, 'ADD', 'RF_IR210', 'A', 'NC')
-math([0x430, 0x437], 8, 'SUB', 'RF_IR210', 'A', 'NB')
-math([0x440, 0x447], 8, 'ADD', 'RF_IR210', 'A')
-math([0x450, 0x457], 8, 'ADC', 'RF_IR210', 'A')
-math([0x460, 0x467], 8, 'SUB', 'RF_IR210', 'A')
-math([0x470, 0x477], 8, 'SBB', 'RF_IR210', 'A')
-math([0x4a0, 0x4a7], 8, 'ADD', 'A', 'RF_IR210', 'NC')
-math([0x4b0, 0x4b7], 8, 'SUB', 'A', 'RF_IR210', 'NB')
-math([0x4c0, 0x4c7], 8, 'ADD', 'A', 'RF_IR210')
-math([0x4d0, 0x4d7], 8, 'ADC', 'A', 'RF_IR210')
-math([0x4e0, 0x4e7], 8, 'SUB', 'A', 'RF_IR210')
-math([0x4f0, 0x4f7], 8, 'SBB', 'A', 'RF_IR210')
-
-logic([0x408, 0x40f], 8, 'AND', 'RF_IR210', 'A')  # ANA r, A
-logic([0x410, 0x417], 8, 'XOR', 'RF_IR210', 'A')  # XRA r, A
-logic([0x418, 0x41f], 8, 'OR',  'RF_IR210', 'A')  # ORA r, A
-logic([0x488, 0x48f], 8, 'AND', 'A', 'RF_IR210')  # ANA A, r
-logic([0x490, 0x497], 8, 'XOR', 'A', 'RF_IR210')  # XRA A, r
-logic([0x498, 0x49f], 8, 'OR',  'A', 'RF_IR210')  # ORA A, r
-
-test([0x428, 0x42f], 8, 'GT',  'RF_IR210', 'A')   # GTA r, A
-test([0x438, 0x43f], 8, 'LT',  'RF_IR210', 'A')   # LTA r, A
-test([0x468, 0x46f], 8, 'NEQ', 'RF_IR210', 'A')   # NEA r, A
-test([0x478, 0x47f], 8, 'EQ',  'RF_IR210', 'A')   # EQA r, A
-test([0x4a8, 0x4af], 8, 'GT',  'A', 'RF_IR210')   # GTA A, r
-test([0x4b8, 0x4bf], 8, 'LT',  'A', 'RF_IR210')   # LTA A, r
-test([0x4c8, 0x4cf], 8, 'ON',  'A', 'RF_IR210')   # ONA A, r
-test([0x4d8, 0x4df], 8, 'OFF', 'A', 'RF_IR210')   # OFFA A, r
-test([0x4e8, 0x4ef], 8, 'NEQ', 'A', 'RF_IR210')   # NEA A, r
-test([0x4f8, 0x4ff], 8, 'EQ',  'A', 'RF_IR210')   # EQA A, r
+math([0x420, 0x427], 8, 'ADD', 'RF_IR210', 'A', 'NC', asm='ADDNC r, A')
+math([0x430, 0x437], 8, 'SUB', 'RF_IR210', 'A', 'NB', asm='SUBNB r, A')
+math([0x440, 0x447], 8, 'ADD', 'RF_IR210', 'A',   asm='ADD r, A')
+math([0x450, 0x457], 8, 'ADC', 'RF_IR210', 'A',   asm='ADC r, A')
+math([0x460, 0x467], 8, 'SUB', 'RF_IR210', 'A',   asm='SUB r, A')
+math([0x470, 0x477], 8, 'SBB', 'RF_IR210', 'A',   asm='SBB r, A')
+math([0x4a0, 0x4a7], 8, 'ADD', 'A', 'RF_IR210', 'NC', asm='ADDNC A, r')
+math([0x4b0, 0x4b7], 8, 'SUB', 'A', 'RF_IR210', 'NB', asm='SUBNB A, r')
+math([0x4c0, 0x4c7], 8, 'ADD', 'A', 'RF_IR210',   asm='ADD A, r')
+math([0x4d0, 0x4d7], 8, 'ADC', 'A', 'RF_IR210',   asm='ADC A, r')
+math([0x4e0, 0x4e7], 8, 'SUB', 'A', 'RF_IR210',   asm='SUB A, r')
+math([0x4f0, 0x4f7], 8, 'SBB', 'A', 'RF_IR210',   asm='SBB A, r')
+
+logic([0x408, 0x40f], 8, 'AND', 'RF_IR210', 'A',  asm='ANA r, A')
+logic([0x410, 0x417], 8, 'XOR', 'RF_IR210', 'A',  asm='XRA r, A')
+logic([0x418, 0x41f], 8, 'OR',  'RF_IR210', 'A',  asm='ORA r, A')
+logic([0x488, 0x48f], 8, 'AND', 'A', 'RF_IR210',  asm='ANA A, r')
+logic([0x490, 0x497], 8, 'XOR', 'A', 'RF_IR210',  asm='XRA A, r')
+logic([0x498, 0x49f], 8, 'OR',  'A', 'RF_IR210',  asm='ORA A, r')
+
+test([0x428, 0x42f], 8, 'GT',  'RF_IR210', 'A',   asm='GTA r, A')
+test([0x438, 0x43f], 8, 'LT',  'RF_IR210', 'A',   asm='LTA r, A')
+test([0x468, 0x46f], 8, 'NEQ', 'RF_IR210', 'A',   asm='NEA r, A')
+test([0x478, 0x47f], 8, 'EQ',  'RF_IR210', 'A',   asm='EQA r, A')
+test([0x4a8, 0x4af], 8, 'GT',  'A', 'RF_IR210',   asm='GTA A, r')
+test([0x4b8, 0x4bf], 8, 'LT',  'A', 'RF_IR210',   asm='LTA A, r')
+test([0x4c8, 0x4cf], 8, 'ON',  'A', 'RF_IR210',   asm='ONA A, r')
+test([0x4d8, 0x4df], 8, 'OFF', 'A', 'RF_IR210',   asm='OFFA A, r')
+test([0x4e8, 0x4ef], 8, 'NEQ', 'A', 'RF_IR210',   asm='NEA A, r')
+test([0x4f8, 0x4ff], 8, 'EQ',  'A', 'RF_IR210',   asm='EQA A, r')
 
 ######################################################################
 # 0x5xx: prefix 0x64
 
-# ADI(NC)/SUI(NB) r, byte
-math_imm([0x520, 0x527], 11, 'ADD', 'RF_IR210', 'NC')
-math_imm([0x530, 0x537], 11, 'SUB', 'RF_IR210', 'NB')
-math_imm([0x540, 0x547], 11, 'ADD', 'RF_IR210')
-math_imm([0x550, 0x557], 11, 'ADC', 'RF_IR210')
-math_imm([0x560, 0x567], 11, 'SUB', 'RF_IR210')
-math_imm([0x570, 0x577], 11, 'SBB', 'RF_IR210')
-
-logic_imm([0x508, 0x50f], 11, 'AND', 'RF_IR210')  # ANI r, byte
-logic_imm([0x510, 0x517], 11, 'XOR', 'RF_IR210')  # XRI r, byte
-logic_imm([0x518, 0x51f], 11, 'OR',  'RF_IR210')  # ORI r, byte
-
-math_imm([0x5a0, 0x5a3], 17, 'ADD', 'SPR_IR2', 'NC') # ADINC sr2, byte
-math_imm([0x5b0, 0x5b3], 17, 'SUB', 'SPR_IR2', 'NB') # SUINB sr2, byte
-math_imm([0x5c0, 0x5c3], 17, 'ADD', 'SPR_IR2')       # ADI sr2, byte
-math_imm([0x5d0, 0x5d3], 17, 'ADC', 'SPR_IR2')       # ACI sr2, byte
-math_imm([0x5e0, 0x5e3], 17, 'SUB', 'SPR_IR2')       # SUI sr2, byte
-math_imm([0x5f0, 0x5f3], 17, 'SBB', 'SPR_IR2')       # SBI sr2, byte
-
-logic_imm([0x588, 0x58b], 17, 'AND', 'SPR_IR2')   # ANI sr2, byte
-logic_imm([0x590, 0x593], 17, 'XOR', 'SPR_IR2')   # XRI sr2, byte
-logic_imm([0x598, 0x59b], 17, 'OR',  'SPR_IR2')   # ORI sr2, byte
-
-test_imm([0x528, 0x52f], 11, 'GT',  'RF_IR210')   # GTI r, byte
-test_imm([0x538, 0x53f], 11, 'LT',  'RF_IR210')   # LTI r, byte
-test_imm([0x548, 0x54f], 11, 'ON',  'RF_IR210')   # ONI r, byte
-test_imm([0x558, 0x55f], 11, 'OFF', 'RF_IR210')   # OFFI r, byte
-test_imm([0x568, 0x56f], 11, 'NEQ', 'RF_IR210')   # NEI r, byte
-test_imm([0x578, 0x57f], 11, 'EQ',  'RF_IR210')   # EQI r, byte
-
-test_imm([0x5a8, 0x5ab], 14, 'GT',  'SPR_IR2')    # GTI sr2, byte
-test_imm([0x5b8, 0x5bb], 14, 'LT',  'SPR_IR2')    # LTI sr2, byte
-test_imm([0x5c8, 0x5cb], 14, 'ON',  'SPR_IR2')    # ONI sr2, byte
-test_imm([0x5d8, 0x5db], 14, 'OFF', 'SPR_IR2')    # OFFI sr2, byte
-test_imm([0x5e8, 0x5eb], 14, 'NEQ', 'SPR_IR2')    # NEI sr2, byte
-test_imm([0x5f8, 0x5fb], 14, 'EQ',  'SPR_IR2')    # EQI sr2, byte
+math_imm([0x520, 0x527], 11, 'ADD', 'RF_IR210', 'NC', asm='ADINC r, byte')
+math_imm([0x530, 0x537], 11, 'SUB', 'RF_IR210', 'NB', asm='SUINB r, byte')
+math_imm([0x540, 0x547], 11, 'ADD', 'RF_IR210',   asm='ADI r, byte')
+math_imm([0x550, 0x557], 11, 'ADC', 'RF_IR210',   asm='ACI r, byte')
+math_imm([0x560, 0x567], 11, 'SUB', 'RF_IR210',   asm='SUI r, byte')
+math_imm([0x570, 0x577], 11, 'SBB', 'RF_IR210',   asm='SBI r, byte')
+
+logic_imm([0x508, 0x50f], 11, 'AND', 'RF_IR210',  asm='ANI r, byte')
+logic_imm([0x510, 0x517], 11, 'XOR', 'RF_IR210',  asm='XRI r, byte')
+logic_imm([0x518, 0x51f], 11, 'OR',  'RF_IR210',  asm='ORI r, byte')
+
+math_imm([0x5a0, 0x5a3], 17, 'ADD', 'SPR_IR2', 'NC', asm='ADINC sr2, byte')
+math_imm([0x5b0, 0x5b3], 17, 'SUB', 'SPR_IR2', 'NB', asm='SUINB sr2, byte')
+math_imm([0x5c0, 0x5c3], 17, 'ADD', 'SPR_IR2',    asm='ADI sr2, byte')
+math_imm([0x5d0, 0x5d3], 17, 'ADC', 'SPR_IR2',    asm='ACI sr2, byte')
+math_imm([0x5e0, 0x5e3], 17, 'SUB', 'SPR_IR2',    asm='SUI sr2, byte')
+math_imm([0x5f0, 0x5f3], 17, 'SBB', 'SPR_IR2',    asm='SBI sr2, byte')
+
+logic_imm([0x588, 0x58b], 17, 'AND', 'SPR_IR2',   asm='ANI sr2, byte')
+logic_imm([0x590, 0x593], 17, 'XOR', 'SPR_IR2',   asm='XRI sr2, byte')
+logic_imm([0x598, 0x59b], 17, 'OR',  'SPR_IR2',   asm='ORI sr2, byte')
+
+test_imm([0x528, 0x52f], 11, 'GT',  'RF_IR210',   asm='GTI r, byte')
+test_imm([0x538, 0x53f], 11, 'LT',  'RF_IR210',   asm='LTI r, byte')
+test_imm([0x548, 0x54f], 11, 'ON',  'RF_IR210',   asm='ONI r, byte')
+test_imm([0x558, 0x55f], 11, 'OFF', 'RF_IR210',   asm='OFFI r, byte')
+test_imm([0x568, 0x56f], 11, 'NEQ', 'RF_IR210',   asm='NEI r, byte')
+test_imm([0x578, 0x57f], 11, 'EQ',  'RF_IR210',   asm='EQI r, byte')
+
+test_imm([0x5a8, 0x5ab], 14, 'GT',  'SPR_IR2',    asm='GTI sr2, byte')
+test_imm([0x5b8, 0x5bb], 14, 'LT',  'SPR_IR2',    asm='LTI sr2, byte')
+test_imm([0x5c8, 0x5cb], 14, 'ON',  'SPR_IR2',    asm='ONI sr2, byte')
+test_imm([0x5d8, 0x5db], 14, 'OFF', 'SPR_IR2',    asm='OFFI sr2, byte')
+test_imm([0x5e8, 0x5eb], 14, 'NEQ', 'SPR_IR2',    asm='NEI sr2, byte')
+test_imm([0x5f8, 0x5fb], 14, 'EQ',  'SPR_IR2',    asm='EQI sr2, byte')
 
 ######################################################################
 # 0x6xx: prefix 0x70
 
-load_abs([0x668, 0x66f], 17)                      # MOV r, word
+load_abs([0x668, 0x66f], 17,                      asm='MOV r, word')
 
-load_ind(0x60F, 20, 'SP')                         # LSPD word
-load_ind(0x61F, 20, 'BC')                         # LBCD word
-load_ind(0x62F, 20, 'DE')                         # LDED word
-load_ind(0x63F, 20, 'HL')                         # LHLD word
+load_ind(0x60F, 20, 'SP',                         asm='LSPD word')
+load_ind(0x61F, 20, 'BC',                         asm='LBCD word')
+load_ind(0x62F, 20, 'DE',                         asm='LDED word')
+load_ind(0x63F, 20, 'HL',                         asm='LHLD word')
 
-store_abs([0x678, 0x67f], 17)                     # MOV word, r
+store_abs([0x678, 0x67f], 17,                     asm='MOV word, r')
 
-store_ind(0x60E, 20, 'SP')                        # SSPD word
-store_ind(0x61E, 20, 'BC')                        # SBCD word
-store_ind(0x62E, 20, 'DE')                        # SDED word
-store_ind(0x63E, 20, 'HL')                        # SHLD word
+store_ind(0x60E, 20, 'SP',                        asm='SSPD word')
+store_ind(0x61E, 20, 'BC',                        asm='SBCD word')
+store_ind(0x62E, 20, 'DE',                        asm='SDED word')
+store_ind(0x63E, 20, 'HL',                        asm='SHLD word')
 
-mathx([0x6a1, 0x6a7], 11, 'ADD', 'NC')            # ADDNCX rpa
-mathx([0x6b1, 0x6b7], 11, 'SUB', 'NB')            # SUBNBX rpa
-mathx([0x6c1, 0x6c7], 11, 'ADD')                  # ADDX rpa
-mathx([0x6d1, 0x6d7], 11, 'ADC')                  # ADCX rpa
-mathx([0x6e1, 0x6e7], 11, 'SUB')                  # SUBX rpa
-mathx([0x6f1, 0x6f7], 11, 'SBB')                  # SBBX rpa
+mathx([0x6a1, 0x6a7], 11, 'ADD', 'NC',            asm='ADDNCX rpa')
+mathx([0x6b1, 0x6b7], 11, 'SUB', 'NB',            asm='SUBNBX rpa')
+mathx([0x6c1, 0x6c7], 11, 'ADD',                  asm='ADDX rpa')
+mathx([0x6d1, 0x6d7], 11, 'ADC',                  asm='ADCX rpa')
+mathx([0x6e1, 0x6e7], 11, 'SUB',                  asm='SUBX rpa')
+mathx([0x6f1, 0x6f7], 11, 'SBB',                  asm='SBBX rpa')
 
-logicx([0x689, 0x68f], 11, 'AND')                 # ANAX rpa
-logicx([0x691, 0x697], 11, 'XOR')                 # XRAX rpa
-logicx([0x699, 0x69f], 11, 'OR')                  # ORAX rpa
+logicx([0x689, 0x68f], 11, 'AND',                 asm='ANAX rpa')
+logicx([0x691, 0x697], 11, 'XOR',                 asm='XRAX rpa')
+logicx([0x699, 0x69f], 11, 'OR',                  asm='ORAX rpa')
 
-testx([0x6a9, 0x6af], 11, 'GT')                   # GTAX rpa
-testx([0x6b9, 0x6bf], 11, 'LT')                   # LTAX rpa
-testx([0x6c9, 0x6cf], 11, 'ON')                   # ONAX rpa
-testx([0x6d9, 0x6df], 11, 'OFF')                  # OFFAX rpa
-testx([0x6e9, 0x6ef], 11, 'NEQ')                  # NEAX rpa
-testx([0x6f9, 0x6ff], 11, 'EQ')                   # EQAX rpa
+testx([0x6a9, 0x6af], 11, 'GT',                   asm='GTAX rpa')
+testx([0x6b9, 0x6bf], 11, 'LT',                   asm='LTAX rpa')
+testx([0x6c9, 0x6cf], 11, 'ON',                   asm='ONAX rpa')
+testx([0x6d9, 0x6df], 11, 'OFF',                  asm='OFFAX rpa')
+testx([0x6e9, 0x6ef], 11, 'NEQ',                  asm='NEAX rpa')
+testx([0x6f9, 0x6ff], 11, 'EQ',                   asm='EQAX rpa')
 
 ######################################################################
 # 0x7xx: prefix 0x74
 
-math(0x7a0, 14, 'ADD', 'A', 'WA', 'NC')           # ADDNCW wa
-math(0x7b0, 14, 'SUB', 'A', 'WA', 'NB')           # SUBNBW wa
-math(0x7c0, 14, 'ADD', 'A', 'WA')                 # ADDW wa
-math(0x7d0, 14, 'ADC', 'A', 'WA')                 # ADCW wa
-math(0x7e0, 14, 'SUB', 'A', 'WA')                 # SUBW wa
-math(0x7f0, 14, 'SBB', 'A', 'WA')                 # SBBW wa
-
-logic(0x788, 14, 'AND', 'A', 'WA')                # ANAW wa
-logic(0x790, 14, 'XOR', 'A', 'WA')                # XRAW wa
-logic(0x798, 14, 'OR', 'A', 'WA')                 # ORAW wa
-
-test(0x7a8, 14, 'GT', 'A', 'WA')                  # GTAW wa
-test(0x7b8, 14, 'LT', 'A', 'WA')                  # LTAW wa
-test(0x7c8, 14, 'ON', 'A', 'WA')                  # ONAW wa
-test(0x7d8, 14, 'OFF', 'A', 'WA')                 # OFFAW wa
-test(0x7e8, 14, 'NEQ', 'A', 'WA')                 # NEAW wa
-test(0x7f8, 14, 'EQ', 'A', 'WA')                  # EQAW wa
+math(0x7a0, 14, 'ADD', 'A', 'WA', 'NC',           asm='ADDNCW wa')
+math(0x7b0, 14, 'SUB', 'A', 'WA', 'NB',           asm='SUBNBW wa')
+math(0x7c0, 14, 'ADD', 'A', 'WA',                 asm='ADDW wa')
+math(0x7d0, 14, 'ADC', 'A', 'WA',                 asm='ADCW wa')
+math(0x7e0, 14, 'SUB', 'A', 'WA',                 asm='SUBW wa')
+math(0x7f0, 14, 'SBB', 'A', 'WA',                 asm='SBBW wa')
+
+logic(0x788, 14, 'AND', 'A', 'WA',                asm='ANAW wa')
+logic(0x790, 14, 'XOR', 'A', 'WA',                asm='XRAW wa')
+logic(0x798, 14, 'OR', 'A', 'WA',                 asm='ORAW wa')
+
+test(0x7a8, 14, 'GT', 'A', 'WA',                  asm='GTAW wa')
+test(0x7b8, 14, 'LT', 'A', 'WA',                  asm='LTAW wa')
+test(0x7c8, 14, 'ON', 'A', 'WA',                  asm='ONAW wa')
+test(0x7d8, 14, 'OFF', 'A', 'WA',                 asm='OFFAW wa')
+test(0x7e8, 14, 'NEQ', 'A', 'WA',                 asm='NEAW wa')
+test(0x7f8, 14, 'EQ', 'A', 'WA',                  asm='EQAW wa')
+
+assert all('asm' in r for r in ird_rows)
+pf.end(rows=len(uc_rows))
+
+print(f'{len(uc_rows)} urom rows; '
+      f'{sum(n for _, n in uc_aliases.values())} saved by aliasing '
+      f'{len(uc_aliases)} identical sequences')
+for name, (uaddr, n) in uc_aliases.items():
+    print(f'  {name} -> {uaddr} ({n} rows)')
 
 ######################################################################
 
+pf.begin('write')
 for i in range(len(nc_rows)):
     nc_rows[i] = {'naddr': i} | nc_rows[i] # debugging aid
 
@@ -1138,3 +1228,5 @@ with open('ucode-gen.yaml', 'w') as f:
     yaml.safe_dump({'ird': {'rows': ird_rows}}, f, sort_keys=False)
     yaml.safe_dump({'urom': {'rows': uc_rows}}, f, sort_keys=False)
     yaml.safe_dump({'nrom': {'rows': nc_rows}}, f, sort_keys=False)
+pf.end(rows=len(ird_rows) + len(uc_rows) + len(nc_rows), out='ucode-gen.yaml')
+pf.finish()
@@ -6,18 +6,25 @@
 
 import yaml
 
+import prof
 
+pf = prof.from_argv('gen-urom')
+
+pf.begin('load')
 with open('ucode-fixed.yaml') as f:
     doc_fixed = yaml.load(f, Loader=yaml.Loader)
 with open('ucode-gen.yaml') as f:
     doc_gen = yaml.load(f, Loader=yaml.Loader)
+pf.end()
 
 # Merge them
+pf.begin('merge')
 doc = {}
 for tbl in doc_fixed:
     doc[tbl] = doc_fixed[tbl]
     if tbl in doc_gen:
         doc[tbl] |= doc_gen[tbl]
+pf.end(rows=sum(len(doc[t].get('rows', [])) for t in doc if t != 'types'))
 
 
 def get_type(name):
@@ -61,7 +68,9 @@ def get_all_addresses(tbl, col):
 
 
 # Fill in values of enums e_uaddr
+pf.begin('addresses')
 get_type('e_uaddr')['values'] = get_all_addresses(doc['urom'], 'uaddr')
+pf.end(rows=len(doc['urom']['rows']))
 
 
 def gen_struct(f, stname, tbl):
@@ -84,6 +93,7 @@ def gen_struct(f, stname, tbl):
     return stw
 
 
+pf.begin('uc-types')
 with open('uc-types.svh', 'w') as f:
     for t in doc['types']:
         f.write('typedef ')
@@ -105,8 +115,10 @@ with open('uc-types.svh', 'w') as f:
     gen_struct(f, 's_ird', doc['ird'])
     urom_w = gen_struct(f, 's_uc', doc['urom'])
     nrom_w = gen_struct(f, 's_nc', doc['nrom'])
+pf.end(rows=len(doc['types']), out='uc-types.svh')
 
 
+pf.begin('uc-ird')
 with open('uc-ird.svh', 'w') as f:
     for r in doc['ird']['rows']:
         at = r['at']
@@ -127,6 +139,7 @@ with open('uc-ird.svh', 'w') as f:
                 st.append(v)
             v = '{' + ', '.join(st) + '}'
             f.write(f"    ird_lut['h{a:03x}] = {v};\n")
+pf.end(rows=len(doc['ird']['rows']), out='uc-ird.svh')
 
 
 def gen_rom(f, tbl, stname, ident, rom_w):
@@ -161,9 +174,15 @@ def gen_rom(f, tbl, stname, ident, rom_w):
     f.write("end\n")
 
 
+pf.begin('urom')
 with open('urom.svh', 'w') as f:
     gen_rom(f, doc['urom'], 's_uc', 'urom', urom_w)
+pf.end(rows=len(doc['urom']['rows']), out='urom.svh')
 
 
+pf.begin('nrom')
 with open('nrom.svh', 'w') as f:
     gen_rom(f, doc['nrom'], 's_nc', 'nrom', nrom_w)
+pf.end(rows=len(doc['nrom']['rows']), out='nrom.svh')
+
+pf.finish()
@@ -0,0 +1,91 @@
+# Phase timing / profiling for the code generators
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Usage, in a generator:
+#
+#   pf = prof.from_argv('gen-urom')
+#   pf.begin('load')
+#   ...
+#   pf.end(rows=len(rows))
+#   pf.begin('write')
+#   ...
+#   pf.end(out='urom.svh')
+#   pf.finish()
+#
+# Does nothing unless the script is run with --profile FILE.json.
+# --cprofile PREFIX also runs each phase under cProfile, dumping stats
+# to PREFIX-<phase>.prof (view with python3 -m pstats).
+
+import argparse
+import json
+import os
+import sys
+import time
+
+
+class Profiler:
+    def __init__(self, tool, out=None, cprofile=None):
+        self.tool = tool
+        self.out = out
+        self.cprofile = cprofile
+        self.phases = []
+        self.cur = None
+        self.t0 = time.perf_counter()
+
+    def begin(self, name):
+        if not self.out:
+            return
+        self.cur = {'name': name, 'start': time.perf_counter()}
+        if self.cprofile:
+            import cProfile
+            self.cur['pr'] = cProfile.Profile()
+            self.cur['pr'].enable()
+
+    def end(self, rows=None, out=None):
+        """End the current phase. out: file(s) written, for byte counts."""
+        if not self.out:
+            return
+        ph, self.cur = self.cur, None
+        t = time.perf_counter() - ph.pop('start')
+        pr = ph.pop('pr', None)
+        if pr:
+            pr.disable()
+            fn = f"{self.cprofile}-{ph['name']}.prof"
+            pr.dump_stats(fn)
+            ph['cprofile'] = fn
+        ph['time'] = round(t, 6)
+        if rows is not None:
+            ph['rows'] = rows
+        if out:
+            outs = [out] if isinstance(out, str) else out
+            ph['bytes'] = sum(os.path.getsize(o) for o in outs)
+        self.phases.append(ph)
+
+    def finish(self):
+        if not self.out:
+            return
+        doc = {
+            'tool': self.tool,
+            'time': round(time.perf_counter() - self.t0, 6),
+            'phases': self.phases,
+        }
+        with open(self.out, 'w') as f:
+            json.dump(doc, f, indent=2)
+        for ph in self.phases:
+            extra = ''.join(f' {ph[k]:7} {k}' for k in ('rows', 'bytes')
+                            if k in ph)
+            print(f"{self.tool}: {ph['name']:12} {ph['time']:8.4f} s{extra}",
+                  file=sys.stderr)
+
+
+def from_argv(tool):
+    ap = argparse.ArgumentParser(prog=tool)
+    ap.add_argument('--profile', metavar='FILE',
+                    help='write per-phase timing as JSON to FILE')
+    ap.add_argument('--cprofile', metavar='PREFIX',
+                    help='with --profile, also dump cProfile stats per phase')
+    args = ap.parse_args()
+    return Profiler(tool, args.profile, args.cprofile)
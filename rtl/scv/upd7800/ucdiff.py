@@ -0,0 +1,283 @@
+# Semantic diff of two microcode ROM builds
+#
+# Copyright (c) 2024 David Hunter
+#
+# This program is GPL licensed. See COPYING for the full license.
+
+# Decodes the generated uc-types.svh, uc-ird.svh, urom.svh and nrom.svh
+# of two builds back to symbolic rows, using each build's own s_uc /
+# s_nc / s_ird layouts, and reports what actually changed:
+#   - microcode sequences (named e_uaddr entries) added, removed or
+#     changed, with per-step nanocode field differences
+#   - opcodes whose s_ird entry changed, or whose sequence changed
+# Sequences are compared by content, so row renumbering, and aliasing
+# identical sequences to one name (gen-ucode.py), produce no output.
+# --self-test checks the latter on a build.
+#
+# A build is a directory, or a git revision (of this directory):
+#
+#   python3 ucdiff.py                  # HEAD vs. working tree
+#   python3 ucdiff.py HEAD~3           # HEAD~3 vs. working tree
+#   python3 ucdiff.py v1 v2            # two revisions
+#   python3 ucdiff.py old/ .           # two directories
+#   python3 ucdiff.py --self-test [BUILD]
+
+import argparse
+import copy
+import os
+import re
+import subprocess
+import sys
+
+FILES = ('uc-types.svh', 'uc-ird.svh', 'urom.svh', 'nrom.svh')
+
+RE_ENUM = re.compile(r'typedef enum reg \[(\d+):0\]\s*\{([^}]*)\}\s*(\w+);')
+RE_INT = re.compile(r'typedef reg \[(\d+):0\] (\w+);')
+RE_STRUCT = re.compile(r'typedef struct packed\s*\{([^}]*)\}\s*(\w+);')
+RE_FIELD = re.compile(r'^\s*(?:reg \[(\d+):0\]|(\w+)) (\w+);', re.M)
+RE_ROM = re.compile(r"^\s*\w+\[\s*(\d+)\] = (\d+)'b([01]+);", re.M)
+RE_IRD = re.compile(r"^\s*ird_lut\['h([0-9a-f]+)\] = \{(.*)\};", re.M)
+RE_ANON = re.compile(r'^UA__[0-9A-F]+$')
+
+
+class Build:
+    def __init__(self, text):
+        self.enums = {}       # name: [value names]
+        self.widths = {}      # type name: width
+        for m in RE_ENUM.finditer(text['uc-types.svh']):
+            w, body, name = m.groups()
+            self.enums[name] = [v.strip() for v in body.split(',')]
+            self.widths[name] = int(w) + 1
+        for m in RE_INT.finditer(text['uc-types.svh']):
+            self.widths[m[2]] = int(m[1]) + 1
+        self.structs = {}     # name: [(field, type or None, width)]
+        for m in RE_STRUCT.finditer(text['uc-types.svh']):
+            fields = []
+            for fm in RE_FIELD.finditer(m[1]):
+                msb, typ, name = fm.groups()
+                w = int(msb) + 1 if msb else self.widths[typ]
+                fields.append((name, typ, w))
+            self.structs[m[2]] = fields
+
+        self.urom = [self.decode('s_uc', b)
+                     for b in self.rom(text['urom.svh'])]
+        self.nrom = [self.decode('s_nc', b)
+                     for b in self.rom(text['nrom.svh'])]
+        self.ird = {int(a, 16): tuple(v.strip() for v in vals.split(','))
+                    for a, vals in RE_IRD.findall(text['uc-ird.svh'])}
+        self.uaddr = self.enums['e_uaddr']
+
+    @staticmethod
+    def rom(text):
+        rows = RE_ROM.findall(text)
+        return [b for _, _, b in sorted(rows, key=lambda r: int(r[0]))]
+
+    def decode(self, stname, bits):
+        """Bit string (MSB first, as written by gen-urom) -> field dict.
+        Zero fields are left out."""
+        ret = {}
+        pos = 0
+        for name, typ, w in self.structs[stname]:
+            v = int(bits[pos:pos + w], 2)
+            pos += w
+            if v:
+                ret[name] = self.enums[typ][v] if typ in self.enums else v
+        return ret
+
+    def step(self, row):
+        """A urom row, with its nanocode row inlined."""
+        ret = {k: v for k, v in row.items() if k != 'naddr'}
+        nc = self.nrom[row.get('naddr', 0)]
+        ret.update(nc)
+        return ret
+
+    def sequences(self):
+        """Named entry -> tuple of steps, up to the next named entry."""
+        seqs = {}
+        cur = None
+        for name, row in zip(self.uaddr, self.urom):
+            if not RE_ANON.match(name):
+                cur = seqs.setdefault(name, [])
+            if cur is not None:
+                cur.append(self.step(row))
+        return {k: tuple(hashable(s) for s in v) for k, v in seqs.items()}
+
+
+def hashable(step):
+    return tuple(sorted(step.items()))
+
+
+def read_dir(d):
+    text = {}
+    for fn in FILES:
+        with open(os.path.join(d, fn)) as f:
+            text[fn] = f.read()
+    return text
+
+
+def read_rev(rev):
+    here = os.path.dirname(os.path.abspath(__file__))
+    text = {}
+    for fn in FILES:
+        p = subprocess.run(['git', 'show', f'{rev}:./{fn}'], cwd=here,
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                           text=True)
+        if p.returncode:
+            sys.exit(f'{rev}: {p.stderr.strip()}')
+        text[fn] = p.stdout
+    return text
+
+
+def load(spec):
+    return Build(read_dir(spec) if os.path.isdir(spec) else read_rev(spec))
+
+
+def fmt_step(s):
+    return ' '.join(f'{k}={v}' if v != 1 or k == 'idx' else k for k, v in s)
+
+
+def diff_steps(a, b):
+    """Per-field differences between two steps."""
+    da, db = dict(a), dict(b)
+    ret = []
+    for k in list(da) + [k for k in db if k not in da]:
+        va, vb = da.get(k, 0), db.get(k, 0)
+        if va != vb:
+            ret.append(f'{k}: {va} -> {vb}')
+    return '; '.join(ret)
+
+
+def diff_seq(a, b, out):
+    n = max(len(a), len(b))
+    for i in range(n):
+        if i >= len(a):
+            out.append(f'    +{i}: {fmt_step(b[i])}')
+        elif i >= len(b):
+            out.append(f'    -{i}: {fmt_step(a[i])}')
+        elif a[i] != b[i]:
+            out.append(f'    {i}: {diff_steps(a[i], b[i])}')
+
+
+def ranges(addrs):
+    """Sorted opcodes -> 'h0a-'h0f style ranges."""
+    ret = []
+    for a in addrs:
+        if ret and ret[-1][1] == a - 1:
+            ret[-1][1] = a
+        else:
+            ret.append([a, a])
+    return ', '.join(f"'h{s:03x}" + (f"-'h{e:03x}" if e != s else '')
+                     for s, e in ret)
+
+
+def diff(old, new):
+    """Returns (sequence lines, {change: [opcode]})."""
+    sa, sb = old.sequences(), new.sequences()
+    # Entries are matched by content, so an alias (one name for what
+    # were two identical sequences) or a rename isn't a change.
+    ca, cb = set(sa.values()), set(sb.values())
+
+    changed = set()
+    out = []
+    for name in sa:
+        if name not in sb:
+            if sa[name] not in cb:
+                out.append(f'- {name} ({len(sa[name])} steps)')
+        elif sa[name] != sb[name]:
+            out.append(f'~ {name}')
+            diff_seq(sa[name], sb[name], out)
+            changed.add(name)
+    for name in sb:
+        if name not in sa and sb[name] not in ca:
+            out.append(f'+ {name} ({len(sb[name])} steps)')
+            for i, s in enumerate(sb[name]):
+                out.append(f'    {i}: {fmt_step(s)}')
+
+    # Group opcodes by what changed, so a range of opcodes sharing an
+    # entry point prints once. An entry's sequence is compared by its
+    # steps, the other s_ird fields literally.
+    groups = {}
+    for op in sorted(set(old.ird) | set(new.ird)):
+        ea, eb = old.ird.get(op), new.ird.get(op)
+        if ea and eb and ea[1:] == eb[1:] and \
+           sa.get(ea[0], ea[0]) == sb.get(eb[0], eb[0]):
+            continue
+        if ea == eb:
+            key = f'{ea[0]}: sequence changed'
+        else:
+            key = f'{", ".join(ea) if ea else "(none)"} -> ' \
+                  f'{", ".join(eb) if eb else "(none)"}'
+        groups.setdefault(key, []).append(op)
+    return out, groups
+
+
+def unaliased(b):
+    """b with a private copy of its sequence for every opcode, as if
+    gen-ucode.py didn't alias identical sequences."""
+    u = copy.copy(b)
+    u.urom, u.uaddr, u.ird = list(b.urom), list(b.uaddr), dict(b.ird)
+    start = {name: i for i, name in enumerate(b.uaddr)}
+    seqs = b.sequences()
+    for op, e in sorted(b.ird.items()):
+        if e[0] not in seqs:
+            continue
+        i, n = start[e[0]], len(seqs[e[0]])
+        name = f'{e[0]}_{op:03X}'
+        u.uaddr += [name] + [f'UA__{len(u.uaddr) + k:X}' for k in range(1, n)]
+        u.urom += b.urom[i:i + n]
+        u.ird[op] = (name,) + e[1:]
+    return u
+
+
+def self_test(spec):
+    b = load(spec)
+    u = unaliased(b)
+    for old, new in ((u, b), (b, u)):
+        out, groups = diff(old, new)
+        if out or groups:
+            print('\n'.join(out + [f'  {ranges(ops)}: {k}'
+                                   for k, ops in groups.items()]))
+            sys.exit(f'{spec}: self-test failed: aliasing shows as a change')
+    print(f'{spec}: self-test ok ({len(u.urom) - len(b.urom)} rows un-aliased)')
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Semantic diff of microcode ROM builds.')
+    ap.add_argument('old', nargs='?', default='HEAD',
+                    help='directory or git revision (default: HEAD)')
+    ap.add_argument('new', nargs='?', default=os.curdir,
+                    help='directory or git revision (default: .)')
+    ap.add_argument('--self-test', nargs='?', const=os.curdir, metavar='BUILD',
+                    help='check that un-aliasing every sequence of BUILD '
+                    '(default: .) diffs as no semantic changes')
+    args = ap.parse_args()
+
+    if args.self_test:
+        self_test(args.self_test)
+        return
+
+    old, new = load(args.old), load(args.new)
+    print(f'urom: {len(old.urom)} -> {len(new.urom)} rows, '
+          f'nrom: {len(old.nrom)} -> {len(new.nrom)} rows')
+    for st in ('s_ird', 's_uc', 's_nc'):
+        fa = [f for f, _, _ in old.structs[st]]
+        fb = [f for f, _, _ in new.structs[st]]
+        if fa != fb:
+            print(f'{st}: fields {" ".join(fa)} -> {" ".join(fb)}')
+
+    out, groups = diff(old, new)
+    if out:
+        print('sequences:')
+        print('\n'.join(out))
+    if groups:
+        print('opcodes:')
+        for key, ops in groups.items():
+            print(f'  {ranges(ops)}: {key}')
+
+    if not (out or groups):
+        print('no semantic changes')
+    sys.exit(1 if out or groups else 0)
+
+
+if __name__ == '__main__':
+    main()